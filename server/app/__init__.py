@@ -5,21 +5,30 @@ from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 from flask_socketio import SocketIO
+from app.utils.db_routing import RoutingSession
 
 # Initialize extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 jwt = JWTManager()
 socketio = SocketIO()
 
-def create_app():
-    """Application factory pattern"""
+def create_app(socket_server=True, repository_backend=None):
+    """Application factory pattern
+
+    With socket_server=False only the HTTP side is built (no Flask-SocketIO,
+    socket handlers or background tasks), for CLI scripts and for the asyncio
+    mode, which serves sockets itself (see app/async_app.py).
+
+    repository_backend ('sqlalchemy' or 'memory') overrides REPOSITORY_BACKEND
+    for the games and users behind the handlers and routes, e.g. to run tests
+    and socket benchmarks without a database.
+    """
     app = Flask(__name__)
-    app.config.from_object("config.Config")    # Configure logging
-    if not app.debug:
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
-        )
+    app.config.from_object("config.Config")
+
+    # Configure non-blocking, queue-based logging
+    from app.utils.logging_config import configure_logging
+    configure_logging(app)
     
     app.logger.info('Tic Tac Toe App startup')
     
@@ -40,6 +49,12 @@ def create_app():
     
     # Initialize extensions with app
     db.init_app(app)
+    from app.utils.sqlite_backend import init_sqlite
+    init_sqlite(app, db)
+    from app.utils.db_routing import replica_router
+    replica_router.init_app(app, db)
+    from app.services.repositories import repositories
+    repositories.init_app(app, repository_backend)
     jwt.init_app(app)    # Configure CORS with flexible origin handling
     import re
     
@@ -84,22 +99,44 @@ def create_app():
          supports_credentials=True)
     
     # Configure SocketIO with more permissive settings for development/testing
-    socketio.init_app(
-        app, 
-        cors_allowed_origins="*",  # Allow all origins during testing
-        logger=True,  # Always log for better debugging
-        engineio_logger=True,  # Always log engine IO for better debugging
-        ping_timeout=20,  # Longer ping timeout
-        ping_interval=25,  # More frequent pings
-        async_mode='eventlet'  # Explicitly set async mode
-    )
+    if socket_server:
+        socketio.init_app(
+            app, 
+            cors_allowed_origins="*",  # Allow all origins during testing
+            logger=logging.getLogger('socketio.server'),  # Level set via SOCKETIO_LOG_LEVEL
+            engineio_logger=logging.getLogger('engineio.server'),  # Level set via ENGINEIO_LOG_LEVEL
+            ping_timeout=20,  # Longer ping timeout
+            ping_interval=25,  # More frequent pings
+            async_mode='eventlet',  # Explicitly set async mode
+            message_queue=app.config.get('SOCKETIO_MESSAGE_QUEUE'),  # Cross-worker broadcasts when sharded
+            http_compression=app.config.get('COMPRESSION_ENABLED', True),  # Long-polling payloads
+            compression_threshold=app.config.get('COMPRESSION_MIN_SIZE', 1024)
+        )
+
+    # Compress HTTP responses; optionally refuse permessage-deflate on websockets
+    from app.utils.compression import WebSocketCompressionMiddleware, init_compression
+    init_compression(app)
+    if socket_server:
+        app.wsgi_app = WebSocketCompressionMiddleware(app.wsgi_app, app.config.get('WEBSOCKET_COMPRESSION', True))
 
     # Import models to register them with SQLAlchemy
-    from app.models import user, game    # Register blueprints
+    from app.models import user, game, chat_message, shard_worker, user_stats, position_stat, tournament
+
+    # Register blueprints
     from app.routes.auth import bp as auth_bp
     from app.routes.game import bp as game_bp
+    from app.routes.user import bp as user_bp
+    from app.routes.leaderboard import bp as leaderboard_bp
+    from app.routes.stats import bp as stats_bp
+    from app.routes.tournament import bp as tournament_bp
     app.register_blueprint(auth_bp)
-    app.register_blueprint(game_bp)    # Add health check endpoint for Render
+    app.register_blueprint(game_bp)
+    app.register_blueprint(user_bp)
+    app.register_blueprint(leaderboard_bp)
+    app.register_blueprint(stats_bp)
+    app.register_blueprint(tournament_bp)
+
+    # Add health check endpoint for Render
     @app.route('/')
     @app.route('/health')
     def health_check():
@@ -120,6 +157,18 @@ def create_app():
             'supabase': 'configured' if app.config.get('SUPABASE_URL') else 'not configured'
         }, 200
 
+    # Socket traffic counters
+    @app.route('/metrics')
+    def get_metrics():
+        from app.utils import metrics
+        return {'counters': metrics.snapshot()}, 200
+
+    # Size of the in-memory room registry
+    @app.route('/metrics/rooms')
+    def get_room_metrics():
+        from app.services.rooms import game_rooms
+        return game_rooms.memory_report(), 200
+
     # Add database connection test endpoint
     @app.route('/api/test-db')
     def test_database():
@@ -129,7 +178,7 @@ def create_app():
             version = result.fetchone()[0] if result else 'Unknown'
             
             # Test table creation
-            db.create_all()
+            db.create_all(bind_key=None)
             
             return {
                 'status': 'success',
@@ -143,14 +192,80 @@ def create_app():
                 'status': 'error',
                 'message': 'Database connection failed',
                 'error': str(e)
-            }, 500    # Register socket handlers
-    from app.sockets import handlers
-    handlers.register_socket_handlers(socketio)
+            }, 500
+
+    # Register socket handlers (rate limited per connection and per user)
+    from app.utils.rate_limit import rate_limiter
+    rate_limiter.init_app(app)
+    if socket_server:
+        from app.sockets import handlers
+        handlers.register_socket_handlers(socketio)
+    background_tasks = []
+
+    # Committed game state is snapshotted in memory for resumes and conditional GETs
+    from app.services.game_cache import game_cache
+    game_cache.init_app(app)
+
+    # Chat history is cached in memory and persisted in batches
+    from app.services.chat_history import chat_history
+    chat_history.init_app(app)
+    background_tasks.append(chat_history.run_flusher)
+
+    # Typing indicators are coalesced per room and expired by a background tick
+    from app.services.typing_indicators import typing_indicators
+    typing_indicators.init_app(app, socketio)
+    background_tasks.append(typing_indicators.run)
+
+    # Spectators are served from their own room by a throttled fan-out tick
+    from app.services.spectators import spectator_fanout
+    spectator_fanout.init_app(app, socketio)
+    background_tasks.append(spectator_fanout.run)
+
+    # Elo ratings are kept in a sorted in-memory leaderboard, reloaded periodically when sharded
+    from app.services.ratings import leaderboard
+    leaderboard.init_app(app)
+    background_tasks.append(leaderboard.run_refresher)
+
+    # Quick-play matchmaking queue, retried with widening bands by a background tick
+    from app.services.matchmaking import matchmaker
+    matchmaker.init_app(app, socketio)
+    background_tasks.append(matchmaker.run)
+
+    # Invites, rematch requests and presence entries expire on a timing wheel
+    from app.services.expirations import expirations
+    expirations.init_app(app, socketio)
+    background_tasks.append(expirations.run)
+
+    # Timed games' clocks are timers on the same wheel
+    from app.services.clocks import game_clocks
+    game_clocks.init_app(app)
+
+    # Mid-game moves from concurrent events share commits
+    from app.services.group_commit import group_commit
+    group_commit.init_app(app, socketio)
+    background_tasks.append(group_commit.run)
+
+    # Socket room state is bounded by count and idle time
+    from app.services.rooms import game_rooms
+    game_rooms.init_app(app, socketio)
+    background_tasks.append(game_rooms.run)
+
+    # Tournament rounds are scheduled in bulk and advanced as their games finish
+    from app.services.tournaments import tournaments
+    tournaments.init_app(app, socketio if socket_server else None)
+
+    if socket_server:
+        for task in background_tasks:
+            socketio.start_background_task(task)
+
+        # Games are pinned to one worker process when running several shards
+        from app.services.sharding import shard_router
+        shard_router.init_app(app, socketio)
 
-    # Create database tables
+    # Create database tables (on the primary only; replica binds are read-only)
     with app.app_context():
         try:
-            db.create_all()
+            db.create_all(bind_key=None)
             app.logger.info("Database tables created successfully")
         except Exception as e:
             app.logger.error(f"Error creating database tables: {e}")
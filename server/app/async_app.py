@@ -0,0 +1,135 @@
+"""
+Asyncio server mode: python-socketio's AsyncServer under ASGI.
+
+Sockets are served natively on the event loop by app/sockets/async_handlers.py
+with an async SQLAlchemy engine (asyncpg for Postgres, aiosqlite for SQLite).
+The Flask HTTP API is mounted unchanged through uvicorn's WSGI middleware, so
+its routes run in a thread pool. Run with `uvicorn asgi:app`.
+"""
+import asyncio
+import logging
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import socketio
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from uvicorn.middleware.wsgi import WSGIMiddleware
+
+from app import create_app
+from app.sockets.async_handlers import AsyncGameHandlers
+from app.utils.sqlite_backend import configure_engine
+
+logger = logging.getLogger(__name__)
+
+# libpq query parameters asyncpg does not accept in the URL
+_PG_CONNECT_ARGS = ('sslmode', 'application_name', 'connect_timeout', 'target_session_attrs')
+
+
+def async_database_url(url):
+    """
+    Translate a sync database URL into (async_url, connect_args).
+
+    postgresql:// becomes postgresql+asyncpg:// with the libpq-only query
+    parameters moved into asyncpg connect arguments; sqlite:// becomes
+    sqlite+aiosqlite://.
+    """
+    if url.startswith('postgres://'):
+        url = url.replace('postgres://', 'postgresql://', 1)
+    if url.startswith('sqlite'):
+        return 'sqlite+aiosqlite' + url[url.index(':'):], {}
+    scheme, netloc, path, query, fragment = urlsplit(url)
+    if not scheme.startswith('postgresql'):
+        raise ValueError(f"No async driver configured for {scheme}")
+
+    params = parse_qsl(query)
+    kept = [(key, value) for key, value in params if key not in _PG_CONNECT_ARGS]
+    moved = {key: value for key, value in params if key in _PG_CONNECT_ARGS}
+    connect_args = {}
+    if moved.get('sslmode') in ('require', 'verify-ca', 'verify-full'):
+        connect_args['ssl'] = moved['sslmode']
+    if 'application_name' in moved:
+        connect_args['server_settings'] = {'application_name': moved['application_name']}
+    if 'connect_timeout' in moved:
+        connect_args['timeout'] = float(moved['connect_timeout'])
+    return urlunsplit(('postgresql+asyncpg', netloc, path, urlencode(kept), fragment)), connect_args
+
+
+def create_async_db_engine(config):
+    url = config.get('ASYNC_DATABASE_URL')
+    connect_args = {}
+    if not url:
+        url, connect_args = async_database_url(config['SQLALCHEMY_DATABASE_URI'])
+    if url.startswith('sqlite'):
+        # SQLite has a single writer; queue transactions on one connection instead of busy-waiting on locks
+        options = {'poolclass': AsyncAdaptedQueuePool, 'pool_size': 1, 'max_overflow': 0}
+    else:
+        options = {'pool_size': config.get('ASYNC_POOL_SIZE', 10), 'max_overflow': 2,
+                   'pool_recycle': 3600, 'pool_pre_ping': True}
+    engine = create_async_engine(url, connect_args=connect_args, **options)
+    if url.startswith('sqlite'):
+        # Same WAL pragmas as the sync engine; the one-connection pool already serializes writers
+        configure_engine(engine.sync_engine, config, writer_lock=False)
+    return engine
+
+
+def _periodic(flask_app, interval, fn):
+    """Run a synchronous flush in a worker thread every `interval` seconds"""
+    def call():
+        with flask_app.app_context():
+            fn()
+
+    async def loop():
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(call)
+            except Exception as e:
+                logger.error(f"Periodic {fn.__qualname__} failed: {e}")
+    return loop
+
+
+def create_asgi_app():
+    """Build the ASGI application serving Socket.IO natively and Flask over WSGI"""
+    flask_app = create_app(socket_server=False)
+    config = flask_app.config
+    engine = create_async_db_engine(config)
+
+    sio = socketio.AsyncServer(
+        async_mode='asgi',
+        cors_allowed_origins='*',
+        logger=logging.getLogger('socketio.server'),
+        engineio_logger=logging.getLogger('engineio.server'),
+        ping_timeout=20,
+        ping_interval=25,
+        http_compression=config.get('COMPRESSION_ENABLED', True),
+        compression_threshold=config.get('COMPRESSION_MIN_SIZE', 1024)
+    )
+    handlers = AsyncGameHandlers(sio, engine, flask_app)
+    handlers.register()
+
+    from app.services.chat_history import chat_history
+    from app.services.ratings import leaderboard
+    from app.services.rooms import game_rooms
+    background_loops = [
+        _periodic(flask_app, config.get('CHAT_FLUSH_INTERVAL', 2.0), chat_history.flush),
+        _periodic(flask_app, game_rooms.sweep_interval, game_rooms.sweep),
+        handlers.run_clocks,
+    ]
+    if leaderboard.refresh_interval:
+        background_loops.append(_periodic(flask_app, leaderboard.refresh_interval, leaderboard.refresh))
+    tasks = []
+
+    async def on_startup():
+        tasks.extend(asyncio.create_task(loop()) for loop in background_loops)
+
+    async def on_shutdown():
+        for task in tasks:
+            task.cancel()
+        await engine.dispose()
+
+    return socketio.ASGIApp(
+        sio,
+        other_asgi_app=WSGIMiddleware(flask_app, workers=config.get('ASYNC_HTTP_WORKERS', 10)),
+        on_startup=on_startup,
+        on_shutdown=on_shutdown
+    )
@@ -0,0 +1,28 @@
+from app import db
+from sqlalchemy import BigInteger, DateTime, Integer, String, Text
+
+
+class ChatMessage(db.Model):
+    __tablename__ = 'chat_messages'
+
+    # Ids are assigned by the chat history service so messages can be
+    # broadcast (and paged) before their batch is written
+    id = db.Column(BigInteger, primary_key=True, autoincrement=False)
+    game_id = db.Column(Integer, nullable=False)
+    sender = db.Column(String(80), nullable=False)
+    text = db.Column(Text, nullable=False)
+    created_at = db.Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        # Keyset paging: WHERE game_id = ? AND id < ? ORDER BY id DESC
+        db.Index('ix_chat_messages_game_id_id', 'game_id', 'id'),
+    )
+
+    def to_dict(self):
+        return {
+            'message_id': self.id,
+            'game_id': self.game_id,
+            'sender': self.sender,
+            'text': self.text,
+            'timestamp': self.created_at.isoformat() if self.created_at else None
+        }
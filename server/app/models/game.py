@@ -1,8 +1,13 @@
 from app import db
-from sqlalchemy import Text, DateTime, Integer, String, Boolean
+from app.utils.logging_config import SampledLogger
+from sqlalchemy import Text, DateTime, Integer, String, Boolean, Float
 import json
+import logging
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+debug_log = SampledLogger(logger)
+
 class Game(db.Model):
     __tablename__ = 'game'
     
@@ -15,8 +20,25 @@ class Game(db.Model):
     winner = db.Column(String(1), nullable=True)
     is_draw = db.Column(Boolean, default=False, nullable=False)
     winning_line = db.Column(Text, nullable=True)  # Store winning line indices as JSON
+    move_count = db.Column(Integer, default=0, server_default='0', nullable=False)
+    # Cell indices in play order, e.g. "40812"; feeds position statistics
+    moves = db.Column(String(9), default='', server_default='', nullable=False)
+    # Time control in seconds (NULL = no limit) and each side's remaining total as of its last move
+    time_total = db.Column(Float, nullable=True)
+    time_per_move = db.Column(Float, nullable=True)
+    clock_x = db.Column(Float, nullable=True)
+    clock_o = db.Column(Float, nullable=True)
     # Use timezone-aware timestamp for PostgreSQL
     created_at = db.Column(DateTime(timezone=True), default=db.func.now(), nullable=False)
+
+    __table_args__ = (
+        # Covering indexes for per-user history: keyset range on (player, created_at, id),
+        # with the listed columns stored in the index so pages are served index-only
+        db.Index('ix_game_player_x_history', 'player_x', 'created_at', 'id',
+                 postgresql_include=['player_o', 'winner', 'is_draw', 'move_count']),
+        db.Index('ix_game_player_o_history', 'player_o', 'created_at', 'id',
+                 postgresql_include=['player_x', 'winner', 'is_draw', 'move_count']),
+    )
     
     def __init__(self, **kwargs):
         super(Game, self).__init__(**kwargs)
@@ -73,16 +95,13 @@ class Game(db.Model):
             # Handle case where winning_line column doesn't exist yet
             winning_line = None
             
-        print(f"🔍 to_dict() Debug - Game {self.id}:")
-        print(f"  - self.winner: {self.winner}")
-        print(f"  - self.winning_line (raw): {self.winning_line}")
-        print(f"  - winning_line_data: {winning_line}")
+        debug_log.debug("to_dict() game=%s winner=%s winning_line=%s",
+                        self.id, self.winner, winning_line)
             
         # TEMPORARY: For testing, return a hardcoded winning line if game is won
         if self.winner and not winning_line:
             # Determine winning line based on board state (simplified for testing)
             board = self.board_data
-            print(f"  - board: {board}")
             # Check top row
             if board[0] == board[1] == board[2] == self.winner:
                 winning_line = [0, 1, 2]
@@ -108,7 +127,7 @@ class Game(db.Model):
             elif board[2] == board[4] == board[6] == self.winner:
                 winning_line = [2, 4, 6]
                 
-            print(f"  - calculated winning_line: {winning_line}")
+            debug_log.debug("to_dict() game=%s calculated winning_line=%s", self.id, winning_line)
         
         result = {
             'id': self.id,
@@ -119,10 +138,13 @@ class Game(db.Model):
             'winner': self.winner,
             'is_draw': self.is_draw,
             'winning_line': winning_line,
+            'move_count': self.move_count or 0,
+            'moves': self.moves or '',
+            'time_total': self.time_total,
+            'time_per_move': self.time_per_move,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
         
-        print(f"  - final result winning_line: {result['winning_line']}")
         return result
     
     def is_player_turn(self, username):
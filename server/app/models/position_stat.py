@@ -0,0 +1,24 @@
+from app import db
+from sqlalchemy import Integer, SmallInteger
+
+
+class PositionStat(db.Model):
+    __tablename__ = 'position_stats'
+
+    # Base-3 code of the symmetry-canonical board (0..19682), see services/positions.py
+    position = db.Column(Integer, primary_key=True, autoincrement=False)
+    ply = db.Column(SmallInteger, nullable=False, index=True)
+    games = db.Column(Integer, default=0, nullable=False)
+    x_wins = db.Column(Integer, default=0, nullable=False)
+    o_wins = db.Column(Integer, default=0, nullable=False)
+    draws = db.Column(Integer, default=0, nullable=False)
+
+    def to_dict(self):
+        return {
+            'position': self.position,
+            'ply': self.ply,
+            'games': self.games,
+            'x_wins': self.x_wins,
+            'o_wins': self.o_wins,
+            'draws': self.draws
+        }
@@ -0,0 +1,18 @@
+from app import db
+from sqlalchemy import DateTime, String
+
+
+class ShardWorker(db.Model):
+    __tablename__ = 'shard_workers'
+
+    # One row per running worker process; rows with a stale heartbeat are ignored
+    worker_id = db.Column(String(120), primary_key=True)
+    url = db.Column(String(255), nullable=True)
+    heartbeat_at = db.Column(DateTime(timezone=True), nullable=False, index=True)
+
+    def to_dict(self):
+        return {
+            'worker_id': self.worker_id,
+            'url': self.url,
+            'heartbeat_at': self.heartbeat_at.isoformat() if self.heartbeat_at else None
+        }
@@ -0,0 +1,82 @@
+from app import db
+from sqlalchemy import DateTime, Integer, String
+
+
+class Tournament(db.Model):
+    __tablename__ = 'tournaments'
+
+    id = db.Column(Integer, primary_key=True, autoincrement=True)
+    name = db.Column(String(120), nullable=False)
+    format = db.Column(String(20), nullable=False)  # 'round_robin' | 'single_elimination'
+    status = db.Column(String(20), default='registration', nullable=False)  # registration | in_progress | completed
+    created_by = db.Column(String(80), nullable=False)
+    current_round = db.Column(Integer, default=0, nullable=False)
+    # Unfinished games in the current round; decremented atomically as games end
+    pending_games = db.Column(Integer, default=0, nullable=False)
+    winner = db.Column(String(80), nullable=True)
+    created_at = db.Column(DateTime(timezone=True), default=db.func.now(), nullable=False)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'format': self.format,
+            'status': self.status,
+            'created_by': self.created_by,
+            'current_round': self.current_round,
+            'pending_games': self.pending_games,
+            'winner': self.winner,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class TournamentPlayer(db.Model):
+    __tablename__ = 'tournament_players'
+
+    tournament_id = db.Column(Integer, primary_key=True)
+    username = db.Column(String(80), primary_key=True)
+    seed = db.Column(Integer, nullable=True)
+    # Half-points: 2 for a win, 1 for a draw, so scores stay integers
+    points = db.Column(Integer, default=0, nullable=False)
+    wins = db.Column(Integer, default=0, nullable=False)
+    draws = db.Column(Integer, default=0, nullable=False)
+    losses = db.Column(Integer, default=0, nullable=False)
+    eliminated = db.Column(db.Boolean, default=False, nullable=False)
+
+    def to_dict(self):
+        return {
+            'username': self.username,
+            'seed': self.seed,
+            'points': self.points / 2,
+            'wins': self.wins,
+            'draws': self.draws,
+            'losses': self.losses,
+            'eliminated': self.eliminated
+        }
+
+
+class TournamentMatch(db.Model):
+    __tablename__ = 'tournament_matches'
+
+    tournament_id = db.Column(Integer, primary_key=True)
+    round = db.Column(Integer, primary_key=True)
+    slot = db.Column(Integer, primary_key=True)
+    # NULL for a bye
+    game_id = db.Column(Integer, nullable=True, unique=True, index=True)
+    player_x = db.Column(String(80), nullable=True)
+    player_o = db.Column(String(80), nullable=True)
+    # Username of the winner (the advancing player in elimination), NULL for a draw or unfinished
+    winner = db.Column(String(80), nullable=True)
+    finished = db.Column(db.Boolean, default=False, nullable=False)
+
+    def to_dict(self):
+        return {
+            'round': self.round,
+            'slot': self.slot,
+            'game_id': self.game_id,
+            'player_x': self.player_x,
+            'player_o': self.player_o,
+            'winner': self.winner,
+            'finished': self.finished,
+            'bye': self.game_id is None
+        }
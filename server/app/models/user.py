@@ -1,18 +1,20 @@
 from app import db
 from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy import BigInteger
+from sqlalchemy import BigInteger, Integer
 from datetime import datetime
 
 class User(db.Model):
     __tablename__ = 'users'
     
-    # Use BIGSERIAL for PostgreSQL auto-increment
-    id = db.Column(BigInteger, primary_key=True, autoincrement=True)
+    # Use BIGSERIAL for PostgreSQL auto-increment; SQLite only autoincrements INTEGER PRIMARY KEY
+    id = db.Column(BigInteger().with_variant(Integer, 'sqlite'), primary_key=True, autoincrement=True)
     username = db.Column(db.String(80), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(255), nullable=False)
       # Use timezone-aware timestamp for PostgreSQL
     created_at = db.Column(db.DateTime(timezone=True), default=db.func.now(), nullable=False)
     last_login = db.Column(db.DateTime, nullable=True)
+    # Elo rating; kept in memory by the leaderboard service and written back in batches
+    rating = db.Column(db.Integer, default=1200, server_default='1200', nullable=False)
 
     # Note: Relationships removed to avoid foreign key conflicts
     # Games use username strings instead of foreign keys for simplicity
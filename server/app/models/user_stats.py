@@ -0,0 +1,27 @@
+from app import db
+from sqlalchemy import DateTime, Integer, String
+
+
+class UserStats(db.Model):
+    __tablename__ = 'user_stats'
+
+    # Keyed by username like the game table, so game end needs no user lookup
+    username = db.Column(String(80), primary_key=True)
+    games_played = db.Column(Integer, default=0, nullable=False)
+    wins = db.Column(Integer, default=0, nullable=False)
+    losses = db.Column(Integer, default=0, nullable=False)
+    draws = db.Column(Integer, default=0, nullable=False)
+    # Positive for a run of wins, negative for a run of losses, 0 after a draw
+    current_streak = db.Column(Integer, default=0, nullable=False)
+    best_win_streak = db.Column(Integer, default=0, nullable=False)
+    updated_at = db.Column(DateTime(timezone=True), default=db.func.now(), onupdate=db.func.now(), nullable=False)
+
+    def to_dict(self):
+        return {
+            'total_games': self.games_played,
+            'wins': self.wins,
+            'losses': self.losses,
+            'draws': self.draws,
+            'current_streak': self.current_streak,
+            'best_win_streak': self.best_win_streak
+        }
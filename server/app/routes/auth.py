@@ -1,6 +1,6 @@
 from datetime import datetime
 from flask import Blueprint, request, jsonify, current_app
-from app.models.user import User
+from app.services.repositories import repositories
 from app import db
 from flask_jwt_extended import create_access_token
 from sqlalchemy import text
@@ -23,23 +23,19 @@ def register():
             return jsonify({'msg': 'Username and password required'}), 400
         
         # Check if user exists
-        existing_user = User.query.filter_by(username=data['username']).first()
+        existing_user = repositories.users.get_by_username(data['username'])
         if existing_user:
             return jsonify({'msg': 'User already exists'}), 400
                 
         # Create new user
-        user = User(username=data['username'])
-        user.set_password(data['password'])
-        
-        db.session.add(user)
-        db.session.commit()
+        repositories.users.create(data['username'], data['password'])
 
         return jsonify({'msg': 'User registered'}), 201
         
     except Exception as e:
         current_app.logger.error(f"Registration failed: {str(e)}")
         current_app.logger.error(f"Traceback: {traceback.format_exc()}")
-        db.session.rollback()
+        repositories.users.discard()
         return jsonify({'msg': 'Registration failed', 'error': str(e)}), 500
 
 @bp.route('/login', methods=['POST'])
@@ -51,7 +47,7 @@ def login():
             current_app.logger.warning("Missing username or password in login request")
             return jsonify({'msg': 'Username and password required'}), 400
                 
-        user = User.query.filter_by(username=data['username']).first()
+        user = repositories.users.get_by_username(data['username'])
         
         if not user or not user.check_password(data['password']):
             current_app.logger.warning(f"Invalid login attempt for user: {data['username']}")
@@ -60,10 +56,10 @@ def login():
         # Update last login timestamp
         user.last_login = datetime.datetime.utcnow()
         try:
-            db.session.commit()
+            repositories.users.save(user)
         except SQLAlchemyError as e:
             logger.warning(f"Failed to update last_login timestamp: {e}")
-            db.session.rollback()
+            repositories.users.discard()
 
         token = create_access_token(identity=user.username, expires_delta=datetime.timedelta(days=1))
         return jsonify({'token': token})
@@ -1,45 +1,103 @@
-from flask import Blueprint, request, jsonify
+import hashlib
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models.game import Game
 from app.models.user import User
-from app import db
+from app.services.chat_history import chat_history
+from app.services.clocks import game_clocks
+from app.services.game_cache import game_cache
+from app.services.repositories import repositories
+from app.services.game_export import batched, export_chunks, gzip_chunks, parse_datetime
+from app.services.sharding import shard_router
+from app.utils.db_routing import primary, replica_reads
 
 bp = Blueprint('game', __name__, url_prefix='/api/game')
 
+# Clients must revalidate every time, so polls are answered with 304 while nothing changes
+CACHE_CONTROL = 'private, no-cache'
+
+_lobby_cache = {'etag': None, 'body': None}
+
+
+def _content_etag(data):
+    """ETag from the response body, for when the version cache cannot vouch for it"""
+    return hashlib.blake2b(data, digest_size=12).hexdigest()
+
+
+def _not_modified(etag):
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response
+
+
+def _json_response(data, etag):
+    response = current_app.response_class(data, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response
+
+
+def _lobby_games():
+    # Get ALL games, ordered by newest first
+    games = repositories.games.newest_first()
+    
+    game_list = []
+    for game in games:
+        # Determine game status
+        if game.winner or game.is_draw:
+            status = 'completed'
+            playerCount = 2 if game.player_o else 1
+        elif game.player_o:
+            status = 'in_progress'
+            playerCount = 2
+        else:
+            status = 'waiting'
+            playerCount = 1
+        
+        game_data = {
+            'id': game.id,
+            'host': game.player_x,
+            'player_o': game.player_o,
+            'createdAt': game.created_at.isoformat() if game.created_at else None,
+            'playerCount': playerCount,
+            'status': status,
+            'winner': game.winner,
+            'is_draw': game.is_draw,
+            'current_turn': game.current_turn
+        }
+        game_list.append(game_data)
+    return game_list
+
+
 @bp.route('/active', methods=['GET'])
 @jwt_required() 
+@replica_reads
 def get_active_games():
     try:
-        # Get ALL games from the database, ordered by newest first
-        games = Game.query.order_by(Game.created_at.desc()).all()
-        
-        game_list = []
-        for game in games:
-            # Determine game status
-            if game.winner or game.is_draw:
-                status = 'completed'
-                playerCount = 2 if game.player_o else 1
-            elif game.player_o:
-                status = 'in_progress'
-                playerCount = 2
-            else:
-                status = 'waiting'
-                playerCount = 1
-            
-            game_data = {
-                'id': game.id,
-                'host': game.player_x,
-                'player_o': game.player_o,
-                'createdAt': game.created_at.isoformat() if game.created_at else None,
-                'playerCount': playerCount,
-                'status': status,
-                'winner': game.winner,
-                'is_draw': game.is_draw,
-                'current_turn': game.current_turn
-            }
-            game_list.append(game_data)
-            
-        return jsonify(game_list)
+        # With one process the lobby version covers every game write; across shards it
+        # does not, so fall back to an ETag of the body
+        versioned = not shard_router.enabled
+        if versioned:
+            lobby_version = game_cache.lobby_version
+            etag = game_cache.etag('lobby', lobby_version)
+            if etag in request.if_none_match:
+                return _not_modified(etag)
+            if _lobby_cache['etag'] == etag:
+                return _json_response(_lobby_cache['body'], etag)
+
+        if versioned:
+            # The body is cached under the lobby version, so it must not be read from a stale replica
+            with primary():
+                body = jsonify(_lobby_games()).get_data()
+        else:
+            body = jsonify(_lobby_games()).get_data()
+        if not versioned:
+            etag = _content_etag(body)
+            if etag in request.if_none_match:
+                return _not_modified(etag)
+        elif game_cache.lobby_version == lobby_version:
+            _lobby_cache.update(etag=etag, body=body)
+        return _json_response(body, etag)
     except Exception as e:
         print(f"Error fetching active games: {str(e)}")
         return jsonify({'msg': 'Failed to fetch games', 'error': str(e)}), 500
@@ -49,47 +107,59 @@ def get_active_games():
 def create_game():
     try:
         username = get_jwt_identity()
-        game = Game(player_x=username)
-        db.session.add(game)
-        db.session.commit()
+        data = request.get_json(silent=True) or {}
+        try:
+            time_control = game_clocks.time_control(data.get('time_total'), data.get('time_per_move'))
+        except (TypeError, ValueError):
+            return jsonify({'msg': 'time_total and time_per_move must be non-negative numbers of seconds'}), 400
+        game = repositories.games.create(player_x=username, **time_control)
         
         return jsonify({
             'gameId': game.id,
             'msg': 'Game created successfully'
         }), 201
     except Exception as e:
-        db.session.rollback()
         return jsonify({'msg': 'Failed to create game', 'error': str(e)}), 500
 
 @bp.route('/<int:game_id>', methods=['GET'])
 @jwt_required()
+@replica_reads
 def get_game(game_id):
     try:
-        game = Game.query.get(game_id)
-        if not game:
+        # Only the owning worker sees every write to a game, so only it trusts its versions
+        versioned = shard_router.owns(game_id)
+        if versioned:
+            version = game_cache.version(game_id)
+            if version is not None:
+                etag = game_cache.etag('game', game_id, version)
+                if etag in request.if_none_match:
+                    return _not_modified(etag)
+            with primary():
+                entry = game_cache.fetch(game_id)
+        else:
+            game = repositories.games.get(game_id)
+            entry = (None, game.to_dict()) if game else None
+
+        if not entry:
             return jsonify({
                 'msg': f'Game with ID {game_id} not found',
-                'available_games': [g.id for g in Game.query.all()]
+                'available_games': [g.id for g in repositories.games.newest_first()]
             }), 404
-            
-        # Ensure board is properly formatted
-        board = game.board if hasattr(game, 'board') and game.board else [""] * 9
-        if isinstance(board, str):
-            try:
-                import json
-                board = json.loads(board)
-            except:
-                board = [""] * 9
-        
-        return jsonify({
-            'id': game.id,
-            'player_x': game.player_x,
-            'player_o': game.player_o,
-            'board': board,
-            'current_turn': game.current_turn,
-            'winner': game.winner,
-            'is_draw': game.is_draw
-        })
+
+        version, game = entry
+        body = jsonify({
+            'id': game['id'],
+            'player_x': game['player_x'],
+            'player_o': game['player_o'],
+            'board': game['board'],
+            'current_turn': game['current_turn'],
+            'winner': game['winner'],
+            'is_draw': game['is_draw']
+        }).get_data()
+        etag = game_cache.etag('game', game_id, version) if versioned else _content_etag(body)
+        if etag in request.if_none_match:
+            return _not_modified(etag)
+        return _json_response(body, etag)
     except Exception as e:
         print(f"Error fetching game {game_id}: {str(e)}")
         return jsonify({
@@ -97,3 +167,59 @@ def get_game(game_id):
             'error': str(e),
             'game_id': game_id
         }), 500
+
+
+@bp.route('/<int:game_id>/messages', methods=['GET'])
+@jwt_required()
+def get_game_messages(game_id):
+    """Page backwards through a game's chat (?before=<message_id>&limit=<n>)"""
+    try:
+        page_size = current_app.config['CHAT_PAGE_SIZE']
+        before_id = request.args.get('before', type=int)
+        limit = min(request.args.get('limit', page_size, type=int), page_size)
+
+        # Only the owning worker's buffer sees new messages; elsewhere read the database
+        messages, has_more = chat_history.page(game_id, before_id, limit, cached=shard_router.owns(game_id))
+        return jsonify({
+            'game_id': game_id,
+            'messages': messages,
+            'has_more': has_more,
+            'next_cursor': messages[0]['message_id'] if messages and has_more else None
+        })
+    except Exception as e:
+        current_app.logger.error(f"Error fetching messages for game {game_id}: {e}")
+        return jsonify({'msg': 'Failed to fetch messages', 'error': str(e)}), 500
+
+
+@bp.route('/<int:game_id>/shard', methods=['GET'])
+@jwt_required()
+def get_game_shard(game_id):
+    """Tell the client which worker owns a game so it can connect there"""
+    payload = shard_router.redirect_payload(game_id)
+    payload['local'] = shard_router.owns(game_id)
+    return jsonify(payload)
+
+
+@bp.route('/export', methods=['GET'])
+@jwt_required()
+@replica_reads
+def export_games():
+    """Stream games as NDJSON or CSV (?format=&status=&since=&until=&gzip=1)"""
+    fmt = request.args.get('format', 'ndjson')
+    try:
+        chunks = export_chunks(
+            fmt,
+            since=parse_datetime(request.args.get('since')),
+            until=parse_datetime(request.args.get('until')),
+            status=request.args.get('status')
+        )
+    except ValueError as e:
+        return jsonify({'msg': str(e)}), 400
+
+    mimetype = 'application/x-ndjson' if fmt == 'ndjson' else 'text/csv'
+    body = batched(chunks)
+    headers = {'Content-Disposition': f'attachment; filename=games.{fmt}'}
+    if request.args.get('gzip') in ('1', 'true'):
+        body = gzip_chunks(body)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(stream_with_context(body), mimetype=mimetype, headers=headers)
@@ -0,0 +1,36 @@
+import logging
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.services.ratings import leaderboard
+
+logger = logging.getLogger(__name__)
+
+bp = Blueprint('leaderboard', __name__, url_prefix='/api/leaderboard')
+
+MAX_LIMIT = 100
+
+
+@bp.route('', methods=['GET'])
+@jwt_required()
+def get_leaderboard():
+    """Top rated players and the current user's rank, served from memory"""
+    try:
+        limit = min(max(request.args.get('limit', 10, type=int), 1), MAX_LIMIT)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        username = get_jwt_identity()
+
+        return jsonify({
+            'top': leaderboard.top(limit, offset),
+            'total_players': len(leaderboard),
+            'me': {
+                'username': username,
+                'rank': leaderboard.rank(username),
+                'rating': leaderboard.rating(username)
+            }
+        }), 200
+    except Exception as e:
+        logger.error(f"Unexpected error in leaderboard endpoint: {e}")
+        return jsonify({
+            'message': 'An unexpected error occurred',
+            'error': str(e)
+        }), 500
@@ -0,0 +1,49 @@
+import logging
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required
+from app.services.positions import openings, position_stats
+from app.utils.db_routing import replica_reads
+
+logger = logging.getLogger(__name__)
+
+bp = Blueprint('stats', __name__, url_prefix='/api/stats')
+
+MAX_LIMIT = 200
+
+
+@bp.route('/openings', methods=['GET'])
+@jwt_required()
+@replica_reads
+def get_openings():
+    """Outcome counts for canonical positions at a ply (?ply=1 gives first moves)"""
+    try:
+        ply = min(max(request.args.get('ply', 1, type=int), 1), 9)
+        limit = min(max(request.args.get('limit', 50, type=int), 1), MAX_LIMIT)
+        return jsonify({'ply': ply, 'positions': openings(ply, limit)}), 200
+    except Exception as e:
+        logger.error(f"Unexpected error in openings endpoint: {e}")
+        return jsonify({
+            'message': 'An unexpected error occurred',
+            'error': str(e)
+        }), 500
+
+
+@bp.route('/position', methods=['GET'])
+@jwt_required()
+@replica_reads
+def get_position():
+    """Outcome counts for one board (?board=X...O.... with '.' for empty cells)"""
+    board = request.args.get('board', '')
+    if len(board) != 9 or any(cell not in 'XO.' for cell in board):
+        return jsonify({'message': "board must be 9 characters of 'X', 'O' or '.'"}), 400
+    try:
+        stats = position_stats(['' if cell == '.' else cell for cell in board])
+        if stats is None:
+            return jsonify({'message': 'Position has not been reached in any finished game'}), 404
+        return jsonify(stats), 200
+    except Exception as e:
+        logger.error(f"Unexpected error in position endpoint: {e}")
+        return jsonify({
+            'message': 'An unexpected error occurred',
+            'error': str(e)
+        }), 500
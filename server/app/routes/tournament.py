@@ -0,0 +1,64 @@
+import logging
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app import db
+from app.services.tournaments import TournamentError, tournaments
+
+logger = logging.getLogger(__name__)
+
+bp = Blueprint('tournament', __name__, url_prefix='/api/tournament')
+
+
+def _error_response(e, action):
+    db.session.rollback()
+    if isinstance(e, TournamentError):
+        return jsonify({'message': str(e)}), 400
+    logger.error(f"Failed to {action}: {e}")
+    return jsonify({
+        'message': 'An unexpected error occurred',
+        'error': str(e)
+    }), 500
+
+
+@bp.route('', methods=['POST'])
+@jwt_required()
+def create_tournament():
+    """Create a tournament ({name, format: round_robin | single_elimination}); the creator is registered"""
+    try:
+        data = request.get_json() or {}
+        tournament = tournaments.create(data.get('name', '').strip(), data.get('format'), get_jwt_identity())
+        return jsonify(tournament.to_dict()), 201
+    except Exception as e:
+        return _error_response(e, 'create tournament')
+
+
+@bp.route('/<int:tournament_id>', methods=['GET'])
+@jwt_required()
+def get_tournament(tournament_id):
+    try:
+        return jsonify(tournaments.state(tournament_id)), 200
+    except TournamentError as e:
+        return jsonify({'message': str(e)}), 404
+    except Exception as e:
+        return _error_response(e, f'fetch tournament {tournament_id}')
+
+
+@bp.route('/<int:tournament_id>/join', methods=['POST'])
+@jwt_required()
+def join_tournament(tournament_id):
+    try:
+        tournaments.join(tournament_id, get_jwt_identity())
+        return jsonify({'message': 'Joined tournament'}), 200
+    except Exception as e:
+        return _error_response(e, f'join tournament {tournament_id}')
+
+
+@bp.route('/<int:tournament_id>/start', methods=['POST'])
+@jwt_required()
+def start_tournament(tournament_id):
+    """Seed by rating and schedule round 1 (organiser only)"""
+    try:
+        tournament = tournaments.start(tournament_id, get_jwt_identity())
+        return jsonify(tournaments.state(tournament.id)), 200
+    except Exception as e:
+        return _error_response(e, f'start tournament {tournament_id}')
@@ -3,9 +3,10 @@ from datetime import datetime
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy.exc import SQLAlchemyError
-from app.models.user import User
-from app.models.game import Game
-from app import db
+from app.services.repositories import repositories
+from app.services.user_stats import get_user_stats
+from app.services.game_history import get_user_games, InvalidCursor
+from app.utils.db_routing import replica_reads
 
 logger = logging.getLogger(__name__)
 
@@ -13,20 +14,16 @@ bp = Blueprint('user', __name__, url_prefix='/api/user')
 
 @bp.route('/profile', methods=['GET'])
 @jwt_required()
+@replica_reads
 def get_profile():
     """Get the current user's profile"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        username = get_jwt_identity()
+        user = repositories.users.get_by_username(username)
 
         if not user:
             return jsonify({'message': 'User not found'}), 404
 
-        # Count the user's games
-        games_as_player1 = Game.query.filter_by(player1_id=user.id).count()
-        games_as_player2 = Game.query.filter_by(player2_id=user.id).count()
-        total_games = games_as_player1 + games_as_player2
-
         # Format timestamps
         created_at = user.created_at.isoformat() if user.created_at else None
         last_login = user.last_login.isoformat() if user.last_login else None
@@ -36,9 +33,7 @@ def get_profile():
             'username': user.username,
             'created_at': created_at,
             'last_login': last_login,
-            'stats': {
-                'total_games': total_games
-            }
+            'stats': get_user_stats(user.username)
         }), 200
     except SQLAlchemyError as e:
         logger.error(f"Database error in profile endpoint: {e}")
@@ -58,8 +53,8 @@ def get_profile():
 def update_profile():
     """Update the current user's profile"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        username = get_jwt_identity()
+        user = repositories.users.get_by_username(username)
 
         if not user:
             return jsonify({'message': 'User not found'}), 404
@@ -69,7 +64,7 @@ def update_profile():
         # Only allow updating certain fields
         if 'username' in data and data['username'] != user.username:
             # Check if username is already taken
-            existing_user = User.query.filter_by(username=data['username']).first()
+            existing_user = repositories.users.get_by_username(data['username'])
             if existing_user and existing_user.id != user.id:
                 return jsonify({'message': 'Username already taken'}), 409
 
@@ -80,7 +75,7 @@ def update_profile():
             from werkzeug.security import generate_password_hash
             user.password_hash = generate_password_hash(data['password'])
 
-        db.session.commit()
+        repositories.users.save(user)
 
         return jsonify({
             'message': 'Profile updated successfully',
@@ -92,16 +87,45 @@ def update_profile():
             }
         }), 200
     except SQLAlchemyError as e:
-        db.session.rollback()
+        repositories.users.discard()
         logger.error(f"Database error in update profile endpoint: {e}")
         return jsonify({
             'message': 'Database error',
             'error': str(e)
         }), 500
     except Exception as e:
-        db.session.rollback()
+        repositories.users.discard()
         logger.error(f"Unexpected error in update profile endpoint: {e}")
         return jsonify({
             'message': 'An unexpected error occurred',
             'error': str(e)
         }), 500
+
+@bp.route('/games', methods=['GET'])
+@jwt_required()
+@replica_reads
+def get_games():
+    """Get the current user's games, newest first (?cursor=<next_cursor>&limit=<n>)"""
+    try:
+        username = get_jwt_identity()
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+        games, next_cursor = get_user_games(username, request.args.get('cursor'), limit)
+
+        return jsonify({
+            'games': games,
+            'next_cursor': next_cursor
+        }), 200
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
+    except SQLAlchemyError as e:
+        logger.error(f"Database error in games endpoint: {e}")
+        return jsonify({
+            'message': 'Database error',
+            'error': str(e)
+        }), 500
+    except Exception as e:
+        logger.error(f"Unexpected error in games endpoint: {e}")
+        return jsonify({
+            'message': 'An unexpected error occurred',
+            'error': str(e)
+        }), 500
@@ -0,0 +1,270 @@
+"""
+Per-room chat history.
+
+Recent messages for each game live in a bounded ring buffer so reconnecting
+clients can be served without touching the database. New messages are
+written to the `chat_messages` table in batches; older pages are read with
+a keyset query on (game_id, id).
+
+Ids are assigned here, before the write, and are time ordered: milliseconds
+since `ID_EPOCH_MS`, then this process's `WORKER_NUMBER` (random if unset),
+then a per-millisecond sequence, so workers never hand out the same id.
+
+If a batch cannot be written, its rows are retried one at a time. A row
+whose id is taken anyway (two workers given the same number) is kept under a
+new id; rows with data the database rejects are logged and dropped; the rest
+are re-queued for at most `CHAT_FLUSH_MAX_RETRIES` flushes, so one bad row
+or a long outage never blocks or grows the queue without bound.
+"""
+import logging
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+
+from app import db
+from app.models.chat_message import ChatMessage
+
+logger = logging.getLogger(__name__)
+
+SENDER_MAX_LENGTH = 80  # chat_messages.sender column
+
+# Message id layout: 41 bits of milliseconds since 2020-01-01 (above the older
+# `timestamp << 12` ids), 10 bits of worker number, 12 bits of sequence
+ID_EPOCH_MS = 1577836800000
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+
+
+class ChatHistory:
+    """Ring-buffer cache in front of the chat_messages table"""
+
+    def __init__(self, buffer_size=50, batch_size=20, flush_interval=2.0, max_length=2000, max_retries=5):
+        self.buffer_size = buffer_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_length = max_length
+        self.max_retries = max_retries
+        self.app = None
+        self._rooms = {}  # {game_id: deque of message dicts, oldest first}
+        self._complete = {}  # {game_id: True if the buffer holds the room's full history}
+        self._pending = []  # rows waiting to be written
+        self._failures = {}  # {message id: failed flushes} for re-queued rows
+        self._lock = threading.Lock()
+        self.worker_number = random.getrandbits(WORKER_BITS)
+        self._last_ms = 0
+        self._sequence = 0
+        self._last_flush = time.monotonic()
+
+    def init_app(self, app):
+        """Read settings from the app config"""
+        self.app = app
+        self.buffer_size = app.config.get('CHAT_HISTORY_SIZE', self.buffer_size)
+        self.batch_size = app.config.get('CHAT_FLUSH_BATCH_SIZE', self.batch_size)
+        self.flush_interval = app.config.get('CHAT_FLUSH_INTERVAL', self.flush_interval)
+        self.max_length = app.config.get('CHAT_MESSAGE_MAX_LENGTH', self.max_length)
+        self.max_retries = app.config.get('CHAT_FLUSH_MAX_RETRIES', self.max_retries)
+        if app.config.get('WORKER_NUMBER') is not None:
+            worker_number = int(app.config['WORKER_NUMBER'])
+            if not 0 <= worker_number < 1 << WORKER_BITS:
+                raise ValueError(f"WORKER_NUMBER must be between 0 and {(1 << WORKER_BITS) - 1}")
+            self.worker_number = worker_number
+
+    def _next_id(self):
+        """Time-ordered id unique to this worker (caller holds the lock)"""
+        now = int(time.time() * 1000) - ID_EPOCH_MS
+        if now > self._last_ms:
+            self._last_ms, self._sequence = now, 0
+        else:
+            self._sequence += 1
+            if self._sequence >> SEQUENCE_BITS:
+                # Sequence used up within one millisecond (or the clock stepped back): borrow the next one
+                self._last_ms, self._sequence = self._last_ms + 1, 0
+        return ((self._last_ms << (WORKER_BITS + SEQUENCE_BITS))
+                | (self.worker_number << SEQUENCE_BITS) | self._sequence)
+
+    def _buffer(self, game_id):
+        """Get the ring buffer for a room, warming it from the DB on first use"""
+        buffer = self._rooms.get(game_id)
+        if buffer is not None:
+            return buffer
+
+        rows = (ChatMessage.query
+                .filter_by(game_id=game_id)
+                .order_by(ChatMessage.id.desc())
+                .limit(self.buffer_size)
+                .all())
+        buffer = deque((row.to_dict() for row in reversed(rows)), maxlen=self.buffer_size)
+        self._rooms[game_id] = buffer
+        self._complete[game_id] = len(rows) < self.buffer_size
+        return buffer
+
+    def record(self, game_id, sender, text):
+        """Store a new message and return it in broadcast format (sender and text are truncated to fit)"""
+        if not isinstance(sender, str) or not sender.strip() or not isinstance(text, str):
+            raise ValueError("Chat messages need a sender and text")
+        sender = sender[:SENDER_MAX_LENGTH]
+        text = text[:self.max_length]
+        now = datetime.utcnow()
+        with self._lock:
+            buffer = self._buffer(game_id)
+            message = {
+                'message_id': self._next_id(),
+                'game_id': game_id,
+                'sender': sender,
+                'text': text,
+                'timestamp': now.isoformat()
+            }
+            if len(buffer) == buffer.maxlen:
+                self._complete[game_id] = False
+            buffer.append(message)
+            self._pending.append({
+                'id': message['message_id'],
+                'game_id': game_id,
+                'sender': sender,
+                'text': text,
+                'created_at': now
+            })
+            should_flush = (len(self._pending) >= self.batch_size or
+                            time.monotonic() - self._last_flush >= self.flush_interval)
+
+        if should_flush:
+            self.flush()
+        return message
+
+    def page(self, game_id, before_id=None, limit=50, cached=True):
+        """
+        Get up to `limit` messages older than `before_id`, oldest first.
+
+        Returns (messages, has_more). Served from the ring buffer when it
+        covers the requested range, otherwise from the database. Pass
+        cached=False when another worker owns the game: this process never
+        sees its new messages, so it reads the database (which trails the
+        owner by at most one flush) and keeps no buffer for it.
+        """
+        limit = max(1, limit)
+        if cached:
+            with self._lock:
+                buffer = self._buffer(game_id)
+                complete = self._complete.get(game_id, False)
+                if buffer and (before_id is None or before_id > buffer[0]['message_id']):
+                    candidates = [m for m in buffer if before_id is None or m['message_id'] < before_id]
+                    if len(candidates) >= limit:
+                        return candidates[-limit:], len(candidates) > limit or not complete
+                    if complete:
+                        return candidates, False
+                elif complete:
+                    return [], False
+
+        # Older than anything cached: make sure pending rows are visible first
+        self.flush()
+        query = ChatMessage.query.filter_by(game_id=game_id)
+        if before_id is not None:
+            query = query.filter(ChatMessage.id < before_id)
+        rows = query.order_by(ChatMessage.id.desc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        return [row.to_dict() for row in reversed(rows[:limit])], has_more
+
+    def flush(self):
+        """Write pending messages in a single multi-row insert"""
+        with self._lock:
+            rows, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+        if not rows:
+            return 0
+
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(insert(ChatMessage.__table__), rows)
+            self._clear_failures(rows)
+            return len(rows)
+        except Exception as e:
+            logger.error(f"Failed to persist {len(rows)} chat messages, retrying one at a time: {e}")
+        return self._flush_rows(rows)
+
+    def _flush_rows(self, rows):
+        """Write rows one transaction each after a failed batch; re-id taken ids, drop bad data, re-queue the rest"""
+        written = 0
+        done = []
+        retry = []
+        for position, row in enumerate(rows):
+            try:
+                with db.engine.begin() as connection:
+                    connection.execute(insert(ChatMessage.__table__), [row])
+                written += 1
+                done.append(row)
+            except IntegrityError as e:
+                # The id is already stored (another worker has our WORKER_NUMBER): keep the message under a new id
+                logger.warning(f"Chat message id {row['id']} for game {row['game_id']} is taken, "
+                               f"re-queuing it under a new id: {e}")
+                self._clear_failures([row])
+                self._reassign(row)
+                retry.append(row)
+            except DataError as e:
+                logger.error(f"Dropping chat message {row['id']} for game {row['game_id']}: {e}")
+                done.append(row)
+            except Exception as e:
+                # Not this row's fault (e.g. the database is unreachable): keep it and the rest for later
+                logger.error(f"Failed to persist chat messages: {e}")
+                retry.extend(rows[position:])
+                break
+        self._clear_failures(done)
+
+        kept = []
+        with self._lock:
+            for row in retry:
+                failures = self._failures.pop(row['id'], 0) + 1
+                if failures > self.max_retries:
+                    logger.error(f"Dropping chat message {row['id']} for game {row['game_id']} "
+                                 f"after {self.max_retries} failed flushes")
+                    continue
+                self._failures[row['id']] = failures
+                kept.append(row)
+            self._pending[:0] = kept
+        return written
+
+    def _reassign(self, row):
+        """Give a pending row (and its buffered copy) a fresh id"""
+        with self._lock:
+            old_id, row['id'] = row['id'], self._next_id()
+            for message in self._rooms.get(row['game_id'], ()):
+                if message['message_id'] == old_id:
+                    message['message_id'] = row['id']
+                    break
+
+    def _clear_failures(self, rows):
+        if self._failures:
+            with self._lock:
+                for row in rows:
+                    self._failures.pop(row['id'], None)
+
+    def forget(self, game_id, delete_persisted=False):
+        """Drop a room's cached history; with delete_persisted also its pending and stored messages"""
+        with self._lock:
+            self._rooms.pop(game_id, None)
+            self._complete.pop(game_id, None)
+            if delete_persisted:
+                self._pending = [row for row in self._pending if row['game_id'] != game_id]
+                pending_ids = {row['id'] for row in self._pending}
+                self._failures = {message_id: failures for message_id, failures in self._failures.items()
+                                  if message_id in pending_ids}
+        if delete_persisted:
+            ChatMessage.query.filter_by(game_id=game_id).delete()
+
+    def run_flusher(self):
+        """Background task: flush pending messages every `flush_interval` seconds"""
+        from app import socketio
+        while True:
+            socketio.sleep(self.flush_interval)
+            try:
+                with self.app.app_context():
+                    self.flush()
+            except Exception as e:
+                logger.error(f"Chat history flusher error: {e}")
+
+
+chat_history = ChatHistory()
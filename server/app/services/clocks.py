@@ -0,0 +1,144 @@
+"""
+Game clocks for timed games.
+
+A timed game has a total budget per player (`time_total`, like a chess
+clock) and/or a limit per move (`time_per_move`); either may be unset. The
+side to move is charged from the moment its turn starts, and its turn
+expires at whichever limit comes first.
+
+Clocks do not run on their own threads: each running turn is one timer on
+the shared `expirations` timing wheel (kind `clock`, keyed by game id), so
+tens of thousands of games cost one dict entry each. Starting a turn
+replaces the game's timer, and the expiry callback registered by the socket
+handlers forfeits the side that ran out. Remaining totals are stored on the
+game row (`clock_x`, `clock_o`) with every move; turn start times are
+process-local, so after a restart a turn is re-armed from its stored
+remaining time when a player rejoins.
+"""
+import logging
+import threading
+import time
+
+from app.services.expirations import expirations
+
+logger = logging.getLogger(__name__)
+
+
+class GameClocks:
+    """Running turns of timed games, expired through the shared timing wheel"""
+
+    def __init__(self, default_total=0.0, default_per_move=0.0):
+        self.default_total = default_total
+        self.default_per_move = default_per_move
+        self._turns = {}  # {game_id: (side, started at (monotonic), move_count)}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Read settings from the app config"""
+        self.default_total = app.config.get('GAME_TIME_TOTAL', self.default_total)
+        self.default_per_move = app.config.get('GAME_TIME_PER_MOVE', self.default_per_move)
+
+    def time_control(self, total=None, per_move=None):
+        """Column values for a new game; the configured defaults fill in what is not given (0 = untimed)"""
+        total = float(self.default_total if total is None else total)
+        per_move = float(self.default_per_move if per_move is None else per_move)
+        if total < 0 or per_move < 0:
+            raise ValueError("Time limits cannot be negative")
+        total = total or None
+        return {
+            'time_total': total,
+            'time_per_move': per_move or None,
+            'clock_x': total,
+            'clock_o': total
+        }
+
+    @staticmethod
+    def is_timed(game):
+        return bool(game.time_total or game.time_per_move)
+
+    @staticmethod
+    def _stored(game, side):
+        return game.clock_x if side == 'X' else game.clock_o
+
+    def _budget(self, game, side):
+        limits = [limit for limit in (game.time_per_move, self._stored(game, side)) if limit is not None]
+        return max(0.0, min(limits)) if limits else None
+
+    def _running(self, game, side):
+        with self._lock:
+            turn = self._turns.get(game.id)
+        if turn is None or turn[0] != side:
+            return None
+        return time.monotonic() - turn[1]
+
+    def start(self, game):
+        """Start the clock of the side to move, unless it is already running (caller has committed)"""
+        if not self.is_timed(game) or game.winner or game.is_draw or not game.player_o:
+            return
+        side = game.current_turn
+        with self._lock:
+            turn = self._turns.get(game.id)
+            if turn is not None and turn[0] == side and turn[2] == game.move_count:
+                return
+            self._turns[game.id] = (side, time.monotonic(), game.move_count)
+        expirations.schedule('clock', game.id, self._budget(game, side), (side, game.move_count))
+
+    def charge(self, game, side):
+        """Deduct the running turn from `side`'s total and stop its clock (caller commits)"""
+        elapsed = self._running(game, side)
+        if elapsed is None:
+            return None
+        self.stop(game.id)
+        if game.time_total is None:
+            return elapsed
+        remaining = max(0.0, (self._stored(game, side) or 0.0) - elapsed)
+        if side == 'X':
+            game.clock_x = remaining
+        else:
+            game.clock_o = remaining
+        return elapsed
+
+    def flagged(self, game, side):
+        """True if `side` has used up its move or total time, even if the timer has not fired yet"""
+        elapsed = self._running(game, side)
+        budget = self._budget(game, side)
+        return elapsed is not None and budget is not None and elapsed >= budget
+
+    def reset(self, game):
+        """Give both sides their full totals back, e.g. for a restart or rematch (caller commits)"""
+        self.stop(game.id)
+        game.clock_x = game.clock_o = game.time_total
+
+    def stop(self, game_id):
+        with self._lock:
+            self._turns.pop(game_id, None)
+        expirations.cancel('clock', game_id)
+
+    def snapshot(self, game):
+        """Live clock state for clients, or None for untimed games"""
+        if not self.is_timed(game):
+            return None
+        running = None if game.winner or game.is_draw else game.current_turn
+        elapsed = self._running(game, running) if running else None
+        remaining = {}
+        for side in ('X', 'O'):
+            stored = self._stored(game, side)
+            if stored is not None and side == running and elapsed is not None:
+                stored = max(0.0, stored - elapsed)
+            remaining[side] = None if stored is None else round(stored, 2)
+        budget = self._budget(game, running) if running else None
+        return {
+            'time_total': game.time_total,
+            'time_per_move': game.time_per_move,
+            'remaining': remaining,
+            'running': running if elapsed is not None else None,
+            'turn_remaining': round(max(0.0, budget - elapsed), 2)
+            if budget is not None and elapsed is not None else None
+        }
+
+    def running_count(self):
+        with self._lock:
+            return len(self._turns)
+
+
+game_clocks = GameClocks()
@@ -0,0 +1,97 @@
+"""
+Expiring socket state driven by a single hierarchical timing wheel.
+
+Pending play-again invites, rematch requests and presence entries of
+disconnected players are each scheduled here under a `(kind, key)` pair.
+Scheduling and cancelling are O(1), and one background task advances the
+wheel every `TIMER_TICK_INTERVAL` seconds, handing expired entries to the
+callback registered for their kind (inside an app context).
+"""
+import logging
+import threading
+import time
+
+from app.utils import metrics
+from app.utils.timing_wheel import HierarchicalTimingWheel
+
+logger = logging.getLogger(__name__)
+
+
+class Expirations:
+    """Timers by kind, with one callback per kind"""
+
+    def __init__(self, tick_interval=0.1, slots=64, levels=4):
+        self.tick_interval = tick_interval
+        self.slots = slots
+        self.levels = levels
+        self.app = None
+        self.socketio = None
+        self._wheel = HierarchicalTimingWheel(tick_interval, slots, levels, time.monotonic())
+        self._callbacks = {}  # {kind: callback(key, payload)}
+        self._lock = threading.Lock()
+
+    def init_app(self, app, socketio):
+        """Read settings from the app config"""
+        self.app = app
+        self.socketio = socketio
+        self.tick_interval = app.config.get('TIMER_TICK_INTERVAL', self.tick_interval)
+        with self._lock:
+            if not len(self._wheel):
+                self._wheel = HierarchicalTimingWheel(self.tick_interval, self.slots, self.levels,
+                                                      time.monotonic())
+
+    def on_expire(self, kind, callback):
+        """Register `callback(key, payload)` for expired timers of a kind"""
+        self._callbacks[kind] = callback
+
+    def schedule(self, kind, key, delay, payload=None):
+        """Expire `(kind, key)` after `delay` seconds, replacing any pending timer for it"""
+        with self._lock:
+            self._wheel.schedule((kind, key), time.monotonic() + delay, payload)
+        metrics.incr(f'expiry.{kind}.scheduled')
+
+    def cancel(self, kind, key):
+        """Drop a pending timer; True if one was pending"""
+        with self._lock:
+            pending = (kind, key) in self._wheel
+            if pending:
+                self._wheel.cancel((kind, key))
+        return pending
+
+    def deadline(self, kind, key):
+        """Seconds until `(kind, key)` expires, or None if it is not pending"""
+        with self._lock:
+            when = self._wheel.deadline((kind, key))
+        return None if when is None else max(0.0, when - time.monotonic())
+
+    def pending(self):
+        with self._lock:
+            return len(self._wheel)
+
+    def tick(self):
+        """Advance the wheel to now and run callbacks for expired timers"""
+        with self._lock:
+            expired = self._wheel.advance(time.monotonic())
+        for (kind, key), payload in expired:
+            metrics.incr(f'expiry.{kind}.expired')
+            callback = self._callbacks.get(kind)
+            if callback is None:
+                continue
+            try:
+                callback(key, payload)
+            except Exception as e:
+                logger.error(f"Expiry callback for {kind} {key} failed: {e}")
+        return len(expired)
+
+    def run(self):
+        """Background task driving `tick` every tick interval"""
+        while True:
+            self.socketio.sleep(self.tick_interval)
+            try:
+                with self.app.app_context():
+                    self.tick()
+            except Exception as e:
+                logger.error(f"Expiry tick failed: {e}")
+
+
+expirations = Expirations()
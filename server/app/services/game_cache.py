@@ -0,0 +1,148 @@
+"""
+Versioned in-memory snapshots of game state.
+
+Every committed change to a `Game` row made through the ORM bumps that
+game's version here and stores its `to_dict()` snapshot, captured at flush
+time and published only once the transaction commits (a rollback discards
+it). Reconnecting clients are served from these snapshots without touching
+the database, and the version lets a client that is already current skip
+the payload entirely. Entries are evicted least-recently-used.
+
+A lobby version is bumped on every committed game change; together with the
+per-game versions it backs the ETags on the game HTTP endpoints. Versions
+are process-local, tagged with a random per-process epoch so ETags from
+different processes never collide.
+"""
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.models.game import Game
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = 'game_cache_pending'
+
+
+class GameStateCache:
+    """LRU of {game_id: (version, snapshot)} kept current by session events"""
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._versions = {}  # {game_id: version}; survives eviction so versions never repeat
+        self._lock = threading.Lock()
+        self._listening = False
+        self.epoch = uuid.uuid4().hex[:8]
+        self.lobby_version = 0
+
+    def init_app(self, app):
+        """Read settings from the app config and start tracking game commits"""
+        self.max_size = app.config.get('GAME_CACHE_SIZE', self.max_size)
+        if not self._listening:
+            event.listen(Session, 'after_flush', self._after_flush)
+            event.listen(Session, 'after_commit', self._after_commit)
+            event.listen(Session, 'after_soft_rollback', self._after_rollback)
+            self._listening = True
+
+    def _after_flush(self, session, flush_context):
+        pending = session.info.setdefault(_PENDING_KEY, {})
+        for obj in session.new:
+            if isinstance(obj, Game):
+                pending[obj.id] = None
+        for obj in session.dirty:
+            if isinstance(obj, Game) and session.is_modified(obj):
+                # Server-generated values are not loaded yet; let the next read fetch them
+                pending[obj.id] = None if inspect(obj).expired_attributes else obj.to_dict()
+        for obj in session.deleted:
+            if isinstance(obj, Game):
+                pending[obj.id] = False
+
+    def _after_commit(self, session):
+        pending = session.info.pop(_PENDING_KEY, None)
+        if not pending:
+            return
+        with self._lock:
+            self.lobby_version += 1
+            for game_id, snapshot in pending.items():
+                if snapshot is False:
+                    self._entries.pop(game_id, None)
+                    self._versions.pop(game_id, None)
+                    continue
+                version = self._versions.get(game_id, 0) + 1
+                self._versions[game_id] = version
+                if snapshot is None:
+                    self._entries.pop(game_id, None)
+                else:
+                    self._store(game_id, version, snapshot)
+
+    def _after_rollback(self, session, previous_transaction):
+        session.info.pop(_PENDING_KEY, None)
+
+    def _store(self, game_id, version, snapshot):
+        self._entries[game_id] = (version, snapshot)
+        self._entries.move_to_end(game_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def version(self, game_id):
+        """Current version of a game, or None if it has never been loaded or changed here"""
+        return self._versions.get(game_id)
+
+    def get(self, game_id):
+        """(version, snapshot) from memory, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(game_id)
+            if entry is not None:
+                self._entries.move_to_end(game_id)
+        metrics.incr('game_cache.hits' if entry else 'game_cache.misses')
+        return entry
+
+    def fetch(self, game_id):
+        """(version, snapshot), loading from the game repository on a miss; None if the game does not exist"""
+        entry = self.get(game_id)
+        if entry is not None:
+            return entry
+        from app.services.repositories import repositories
+
+        version_before = self._versions.get(game_id)
+        game = repositories.games.get(game_id)
+        if game is None:
+            return None
+        snapshot = game.to_dict()
+        with self._lock:
+            version = self._versions.setdefault(game_id, 1)
+            if version_before is not None and version != version_before:
+                # A commit landed while we were loading; its snapshot (if any) is newer
+                return self._entries.get(game_id) or (version, snapshot)
+            self._store(game_id, version, snapshot)
+        return version, snapshot
+
+    def bump_lobby(self):
+        """Record a game change made outside the ORM (e.g. a bulk insert) after it commits"""
+        with self._lock:
+            self.lobby_version += 1
+
+    def mark_changed(self, game_id):
+        """Record a committed change to one game made outside the ORM; its snapshot is reloaded on next read"""
+        with self._lock:
+            self.lobby_version += 1
+            self._entries.pop(game_id, None)
+            if game_id in self._versions:
+                self._versions[game_id] += 1
+
+    def etag(self, *parts):
+        """Strong ETag value for versioned content"""
+        return '-'.join(str(part) for part in (self.epoch,) + parts)
+
+    def invalidate(self, game_id):
+        with self._lock:
+            self._entries.pop(game_id, None)
+
+
+game_cache = GameStateCache()
@@ -0,0 +1,144 @@
+"""
+Streaming export of games as NDJSON or CSV.
+
+Rows are read through a server-side cursor (`yield_per`) and serialized one
+at a time by generators, optionally through an incremental gzip encoder, so
+memory stays constant no matter how many games are exported.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+
+from sqlalchemy import and_, or_, select
+
+from app import db
+from app.models.game import Game
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+EXPORT_STATUSES = ('waiting', 'in_progress', 'completed')
+EXPORT_FIELDS = [
+    'id', 'player_x', 'player_o', 'board', 'current_turn', 'winner',
+    'is_draw', 'winning_line', 'move_count', 'moves', 'status', 'created_at'
+]
+YIELD_PER = 1000
+
+
+def parse_datetime(value):
+    """Parse an ISO date/datetime filter value (None passes through)"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError as e:
+        raise ValueError(f"Invalid date: {value}") from e
+
+
+def _status_condition(status):
+    finished = or_(Game.winner.isnot(None), Game.is_draw == True)
+    if status == 'completed':
+        return finished
+    if status == 'in_progress':
+        return and_(~finished, Game.player_o.isnot(None))
+    if status == 'waiting':
+        return and_(~finished, Game.player_o.is_(None))
+    raise ValueError(f"Invalid status: {status}")
+
+
+def _status(row):
+    if row.winner or row.is_draw:
+        return 'completed'
+    return 'in_progress' if row.player_o else 'waiting'
+
+
+def iter_games(since=None, until=None, status=None, yield_per=YIELD_PER):
+    """Yield export records for matching games in id order via a server-side cursor"""
+    query = select(
+        Game.id, Game.player_x, Game.player_o, Game.board, Game.current_turn, Game.winner,
+        Game.is_draw, Game.winning_line, Game.move_count, Game.moves, Game.created_at
+    )
+    if since is not None:
+        query = query.where(Game.created_at >= since)
+    if until is not None:
+        query = query.where(Game.created_at < until)
+    if status:
+        query = query.where(_status_condition(status))
+    query = query.order_by(Game.id).execution_options(yield_per=yield_per)
+
+    for row in db.session.execute(query):
+        yield {
+            'id': row.id,
+            'player_x': row.player_x,
+            'player_o': row.player_o,
+            'board': json.loads(row.board) if row.board else [""] * 9,
+            'current_turn': row.current_turn,
+            'winner': row.winner,
+            'is_draw': row.is_draw,
+            'winning_line': json.loads(row.winning_line) if row.winning_line else None,
+            'move_count': row.move_count or 0,
+            'moves': row.moves or '',
+            'status': _status(row),
+            'created_at': row.created_at.isoformat() if row.created_at else None
+        }
+
+
+def ndjson_chunks(records):
+    for record in records:
+        yield json.dumps(record, separators=(',', ':')) + '\n'
+
+
+def csv_chunks(records):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    for record in records:
+        record = dict(record, board=json.dumps(record['board'], separators=(',', ':')),
+                      winning_line=json.dumps(record['winning_line']) if record['winning_line'] else '')
+        writer.writerow(record)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_chunks(fmt='ndjson', **filters):
+    """Text chunks for the requested format"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Invalid format: {fmt}")
+    if filters.get('status') and filters['status'] not in EXPORT_STATUSES:
+        raise ValueError(f"Invalid status: {filters['status']}")
+    records = iter_games(**filters)
+    return ndjson_chunks(records) if fmt == 'ndjson' else csv_chunks(records)
+
+
+def gzip_chunks(chunks, flush_bytes=64 * 1024):
+    """Incrementally gzip text chunks, emitting compressed output every ~flush_bytes of input"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    pending = 0
+    for chunk in chunks:
+        data = chunk.encode('utf-8')
+        pending += len(data)
+        compressed = compressor.compress(data)
+        if pending >= flush_bytes:
+            compressed += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def batched(chunks, size=64 * 1024):
+    """Group small text chunks into ~size writes"""
+    parts = []
+    total = 0
+    for chunk in chunks:
+        parts.append(chunk)
+        total += len(chunk)
+        if total >= size:
+            yield ''.join(parts)
+            parts = []
+            total = 0
+    if parts:
+        yield ''.join(parts)
@@ -0,0 +1,85 @@
+"""
+Per-user game history with keyset pagination.
+
+A user's games are the union of two index range scans, one on
+(player_x, created_at, id) and one on (player_o, created_at, id). Only
+columns stored in those covering indexes are selected, so each page is
+served index-only. The cursor is the (created_at, id) of the last row.
+"""
+import base64
+import heapq
+from datetime import datetime
+
+from sqlalchemy import select, tuple_
+
+from app import db
+from app.models.game import Game
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at, game_id):
+    raw = f"{created_at.isoformat()}|{game_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, game_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+        return datetime.fromisoformat(created_at), int(game_id)
+    except (ValueError, UnicodeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def _side_query(username, own_column, opponent_column, cursor, limit):
+    """Newest-first range scan of one covering index"""
+    query = (
+        select(Game.id, Game.created_at, opponent_column.label('opponent'),
+               Game.winner, Game.is_draw, Game.move_count)
+        .where(own_column == username)
+    )
+    if cursor is not None:
+        query = query.where(tuple_(Game.created_at, Game.id) < tuple_(*cursor))
+    return query.order_by(Game.created_at.desc(), Game.id.desc()).limit(limit)
+
+
+def _result(symbol, row):
+    if row.is_draw:
+        return 'draw'
+    if row.winner:
+        return 'win' if row.winner == symbol else 'loss'
+    return 'in_progress' if row.opponent else 'waiting'
+
+
+def get_user_games(username, cursor=None, limit=20):
+    """Get one page of a user's games, newest first; returns (games, next_cursor)"""
+    position = decode_cursor(cursor) if cursor else None
+
+    as_x = db.session.execute(_side_query(username, Game.player_x, Game.player_o, position, limit + 1)).all()
+    as_o = db.session.execute(_side_query(username, Game.player_o, Game.player_x, position, limit + 1)).all()
+
+    # Both sides are already sorted newest first; merge and take one extra to detect more pages
+    merged = heapq.merge(
+        (('X', row) for row in as_x),
+        (('O', row) for row in as_o),
+        key=lambda item: (item[1].created_at, item[1].id),
+        reverse=True
+    )
+    page = [item for _, item in zip(range(limit + 1), merged)]
+
+    games = [{
+        'id': row.id,
+        'symbol': symbol,
+        'opponent': row.opponent,
+        'result': _result(symbol, row),
+        'move_count': row.move_count or 0,
+        'created_at': row.created_at.isoformat() if row.created_at else None
+    } for symbol, row in page[:limit]]
+
+    next_cursor = None
+    if len(page) > limit:
+        last = page[limit - 1][1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return games, next_cursor
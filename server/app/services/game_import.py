@@ -0,0 +1,260 @@
+"""
+Bulk import of games from NDJSON (the format written by `game_export`).
+
+Lines are parsed and validated a batch at a time. Every distinct board in a
+batch is checked against the game engine once (boards repeat heavily, and
+there are only 3^9 of them), then each record is checked for consistency
+with its board: mark counts, winner, draw flag, turn and move count. If a
+record carries `moves` (a string like "40812" or a list of indices) they
+are replayed through the engine, must reproduce the board, and are stored.
+Valid rows go in with one multi-row INSERT per batch; invalid ones are
+reported to a callback and skipped.
+"""
+import json
+import logging
+from datetime import datetime
+from functools import lru_cache
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.game import Game
+from app.services.game_logic import is_valid_move
+
+logger = logging.getLogger(__name__)
+
+WINNING_COMBINATIONS = (
+    (0, 1, 2), (3, 4, 5), (6, 7, 8),
+    (0, 3, 6), (1, 4, 7), (2, 5, 8),
+    (0, 4, 8), (2, 4, 6)
+)
+CELLS = frozenset({'', 'X', 'O'})
+BATCH_SIZE = 1000
+
+
+class InvalidRecord(ValueError):
+    pass
+
+
+@lru_cache(maxsize=None)
+def analyze_board(board):
+    """Engine facts for a board tuple: (x_count, o_count, winners, winning_line, full)"""
+    winners = set()
+    winning_line = None
+    for combo in WINNING_COMBINATIONS:
+        a, b, c = combo
+        if board[a] and board[a] == board[b] == board[c]:
+            winners.add(board[a])
+            if winning_line is None:
+                winning_line = list(combo)
+    return board.count('X'), board.count('O'), frozenset(winners), winning_line, '' not in board
+
+
+def replay(moves):
+    """Board tuple produced by alternating X/O moves"""
+    board = [''] * 9
+    for turn, index in enumerate(moves):
+        if type(index) is not int or not is_valid_move(board, index):
+            raise InvalidRecord(f"Illegal move {index!r} at ply {turn + 1}")
+        board[index] = 'X' if turn % 2 == 0 else 'O'
+        if analyze_board(tuple(board))[2] and turn != len(moves) - 1:
+            raise InvalidRecord(f"Moves continue after the game was won at ply {turn + 1}")
+    return tuple(board)
+
+
+def _player(value, field, required):
+    if value is None and not required:
+        return None
+    if not isinstance(value, str) or not value.strip() or len(value) > 80:
+        raise InvalidRecord(f"Invalid {field}")
+    return value
+
+
+def _moves(record):
+    moves = record.get('moves')
+    if moves is None:
+        return None
+    if isinstance(moves, str):
+        if not moves.isdigit() and moves:
+            raise InvalidRecord("Invalid moves")
+        moves = [int(ch) for ch in moves]
+    if not isinstance(moves, list) or len(moves) > 9:
+        raise InvalidRecord("Invalid moves")
+    # bool is an int subclass; True would be stored as the string 'True'
+    if not all(type(index) is int and 0 <= index <= 8 for index in moves):
+        raise InvalidRecord("Moves must be cell indices 0-8")
+    return moves
+
+
+def _is_board(board):
+    return (isinstance(board, list) and len(board) == 9
+            and all(isinstance(cell, str) for cell in board) and CELLS.issuperset(board))
+
+
+def _board(record):
+    board = record.get('board')
+    if isinstance(board, str):
+        try:
+            board = json.loads(board)
+        except json.JSONDecodeError:
+            raise InvalidRecord("Board is not valid JSON")
+    moves = _moves(record)
+    if moves:
+        replayed = replay(moves)
+        if board is not None and (not _is_board(board) or tuple(board) != replayed):
+            raise InvalidRecord("Moves do not reproduce the board")
+        return replayed
+    if not _is_board(board):
+        raise InvalidRecord("Board must be 9 cells of '', 'X' or 'O'")
+    return tuple(board)
+
+
+def to_row(record, board, facts, keep_ids=False):
+    """Validate one parsed record against its board's engine facts; returns an insert row"""
+    x_count, o_count, winners, winning_line, full = facts
+    player_x = _player(record.get('player_x'), 'player_x', required=True)
+    player_o = _player(record.get('player_o'), 'player_o', required=False)
+
+    if x_count - o_count not in (0, 1):
+        raise InvalidRecord(f"Impossible mark counts (X={x_count}, O={o_count})")
+    if o_count and not player_o:
+        raise InvalidRecord("Board has O moves but no player_o")
+    if len(winners) > 1:
+        raise InvalidRecord("Both players have a winning line")
+
+    winner = next(iter(winners), None)
+    if winner == 'X' and x_count == o_count or winner == 'O' and x_count != o_count:
+        raise InvalidRecord(f"Play continued after {winner} won")
+    if record.get('winner') != winner:
+        raise InvalidRecord(f"Winner {record.get('winner')!r} does not match board ({winner!r})")
+    is_draw = full and winner is None
+    if bool(record.get('is_draw', False)) != is_draw:
+        raise InvalidRecord(f"is_draw does not match board ({is_draw})")
+
+    current_turn = record.get('current_turn') or ('X' if x_count == o_count else 'O')
+    if current_turn not in ('X', 'O'):
+        raise InvalidRecord(f"Invalid current_turn {current_turn!r}")
+    if winner is None and not is_draw and current_turn != ('X' if x_count == o_count else 'O'):
+        raise InvalidRecord(f"current_turn {current_turn!r} does not match board")
+
+    move_count = record.get('move_count', x_count + o_count)
+    if move_count != x_count + o_count:
+        raise InvalidRecord(f"move_count {move_count!r} does not match board")
+
+    created_at = record.get('created_at')
+    if created_at is not None:
+        try:
+            created_at = datetime.fromisoformat(created_at)
+        except (TypeError, ValueError):
+            raise InvalidRecord(f"Invalid created_at {created_at!r}")
+
+    moves = _moves(record)
+    row = {
+        'player_x': player_x,
+        'player_o': player_o,
+        'board': json.dumps(list(board)),
+        'current_turn': current_turn,
+        'winner': winner,
+        'is_draw': is_draw,
+        'winning_line': json.dumps(winning_line) if winning_line else None,
+        'move_count': move_count,
+        'moves': ''.join(str(index) for index in moves) if moves else '',
+        'created_at': created_at or datetime.utcnow()
+    }
+    if keep_ids:
+        if not isinstance(record.get('id'), int) or record['id'] < 1:
+            raise InvalidRecord("Missing or invalid id")
+        row['id'] = record['id']
+    return row
+
+
+def validate_batch(lines, keep_ids=False):
+    """Validate a batch of (line_no, text); returns (rows, rejects)"""
+    parsed = []
+    rejects = []
+    for line_no, line in lines:
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise InvalidRecord("Record is not an object")
+            parsed.append((line_no, record, _board(record)))
+        except (json.JSONDecodeError, InvalidRecord) as e:
+            rejects.append((line_no, str(e)))
+
+    # One engine pass per distinct board in the batch
+    facts = {board: analyze_board(board) for board in {board for _, _, board in parsed}}
+
+    rows = []
+    for line_no, record, board in parsed:
+        try:
+            rows.append((line_no, to_row(record, board, facts[board], keep_ids)))
+        except InvalidRecord as e:
+            rejects.append((line_no, str(e)))
+    return rows, rejects
+
+
+def _insert(rows, on_reject):
+    """Multi-row insert of a batch; on conflict, retry row by row to isolate the bad ones"""
+    statement = insert(Game.__table__)
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(statement, [row for _, row in rows])
+        return len(rows)
+    except IntegrityError:
+        inserted = 0
+        for line_no, row in rows:
+            try:
+                with db.engine.begin() as connection:
+                    connection.execute(statement, [row])
+                inserted += 1
+            except IntegrityError as e:
+                on_reject(line_no, f"Insert failed: {e.orig}")
+        return inserted
+
+
+def _reset_id_sequence():
+    """Move the Postgres id sequence past imported ids"""
+    if db.engine.dialect.name != 'postgresql':
+        return
+    max_id = db.session.execute(select(func.max(Game.id))).scalar()
+    if max_id:
+        db.session.execute(text("SELECT setval(pg_get_serial_sequence('game', 'id'), :max_id)"),
+                           {'max_id': max_id})
+        db.session.commit()
+
+
+def import_games(lines, batch_size=BATCH_SIZE, keep_ids=False, dry_run=False, on_reject=None):
+    """Import NDJSON lines; returns (inserted, rejected). Invalid records go to on_reject(line_no, error)."""
+    rejected = 0
+
+    def reject(line_no, error):
+        nonlocal rejected
+        rejected += 1
+        if on_reject:
+            on_reject(line_no, error)
+
+    def flush(batch):
+        rows, rejects = validate_batch(batch, keep_ids)
+        for line_no, error in sorted(rejects):
+            reject(line_no, error)
+        if dry_run or not rows:
+            return len(rows) if dry_run else 0
+        return _insert(rows, reject)
+
+    inserted = 0
+    batch = []
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        batch.append((line_no, line))
+        if len(batch) >= batch_size:
+            inserted += flush(batch)
+            batch = []
+    if batch:
+        inserted += flush(batch)
+
+    if keep_ids and inserted and not dry_run:
+        _reset_id_sequence()
+    logger.info(f"Imported {inserted} games, rejected {rejected}")
+    return inserted, rejected
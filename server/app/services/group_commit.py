@@ -0,0 +1,136 @@
+"""
+Group commit of game writes from concurrent socket events.
+
+Handlers that would each commit a small write (a mid-game move is one
+guarded UPDATE of its game row) hand the statement to `group_commit`
+instead. A background task takes the first queued write, gathers whatever
+else arrives within `GROUP_COMMIT_WINDOW` seconds (up to
+`GROUP_COMMIT_MAX_BATCH`), and runs the lot in one transaction, so N
+concurrent moves cost one commit (one fsync) instead of N. Each handler
+blocks on its own event until the batch holding its write is durable and
+only then acknowledges its client.
+
+If a batch fails, its writes are retried one transaction each so a single
+bad write cannot fail the others. When the committer is not running (no
+socket server, or `GROUP_COMMIT_ENABLED=false`) writes commit inline.
+"""
+import logging
+import time
+
+from app import db
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class GroupCommitTimeout(Exception):
+    pass
+
+
+class _Write:
+    __slots__ = ('statement', 'done', 'rowcount', 'error')
+
+    def __init__(self, statement, done):
+        self.statement = statement
+        self.done = done
+        self.rowcount = None
+        self.error = None
+
+
+class GroupCommitter:
+    """Batches single-statement writes from concurrent events into shared transactions"""
+
+    def __init__(self, window=0.002, max_batch=128, timeout=5.0):
+        self.window = window
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.enabled = True
+        self.app = None
+        self.socketio = None
+        self._queue = None
+        self._running = False
+
+    def init_app(self, app, socketio):
+        """Read settings from the app config"""
+        self.app = app
+        self.socketio = socketio
+        self.enabled = app.config.get('GROUP_COMMIT_ENABLED', self.enabled)
+        self.window = app.config.get('GROUP_COMMIT_WINDOW', self.window)
+        self.max_batch = app.config.get('GROUP_COMMIT_MAX_BATCH', self.max_batch)
+        self.timeout = app.config.get('GROUP_COMMIT_TIMEOUT', self.timeout)
+
+    def execute(self, statement):
+        """Run a write statement and return its rowcount once it is durable"""
+        if not (self.enabled and self._running):
+            with db.engine.begin() as connection:
+                return connection.execute(statement).rowcount
+
+        write = _Write(statement, self.socketio.server.eio.create_event())
+        self._queue.put(write)
+        if not write.done.wait(self.timeout):
+            metrics.incr('group_commit.timeouts')
+            raise GroupCommitTimeout(f"Write not committed within {self.timeout}s")
+        if write.error is not None:
+            raise write.error
+        return write.rowcount
+
+    def _collect(self, first):
+        batch = [first]
+        empty = self.socketio.server.eio.get_queue_empty_exception()
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except empty:
+                break
+        return batch
+
+    def commit_batch(self, batch):
+        """Commit a batch in one transaction, falling back to one transaction per write on error"""
+        try:
+            with db.engine.begin() as connection:
+                rowcounts = [connection.execute(write.statement).rowcount for write in batch]
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0].error = e
+                batch[0].done.set()
+                return
+            logger.warning(f"Group commit of {len(batch)} writes failed, retrying individually: {e}")
+            metrics.incr('group_commit.retried_batches')
+            for write in batch:
+                self.commit_batch([write])
+            return
+
+        metrics.incr('group_commit.batches')
+        metrics.incr('group_commit.writes', len(batch))
+        for write, rowcount in zip(batch, rowcounts):
+            write.rowcount = rowcount
+            write.done.set()
+
+    def run(self):
+        """Background task: commit queued writes in batches"""
+        if not self.enabled:
+            return
+        # Queue and events of the server's async mode, so waiting yields to other greenlets
+        self._queue = self.socketio.server.eio.create_queue()
+        self._running = True
+        try:
+            while True:
+                batch = self._collect(self._queue.get())
+                try:
+                    with self.app.app_context():
+                        self.commit_batch(batch)
+                except Exception as e:
+                    logger.error(f"Group commit failed: {e}")
+                    for write in batch:
+                        if not write.done.is_set():
+                            write.error = e
+                            write.done.set()
+        finally:
+            self._running = False
+
+
+group_commit = GroupCommitter()
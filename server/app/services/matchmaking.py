@@ -0,0 +1,184 @@
+"""
+Quick-play matchmaking queue.
+
+Waiting players are kept in a SortedList by rating, so the closest opponent
+is found with a bisect. A player's acceptable rating band starts at
+`base_band` and widens with time spent waiting; a background tick retries
+the oldest waiters so widened bands eventually produce a match. Matched
+pairs are handed to a callback that creates the game exactly once.
+
+The queue is process-local; with sharding only the worker chosen by
+`shard_router.owns_matchmaking` keeps one (see app/services/sharding.py).
+"""
+import itertools
+import logging
+import threading
+import time
+
+from sortedcontainers import SortedList
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class QueueEntry:
+    __slots__ = ('username', 'sid', 'rating', 'joined_at', 'seq')
+
+    def __init__(self, username, sid, rating, joined_at, seq):
+        self.username = username
+        self.sid = sid
+        self.rating = rating
+        self.joined_at = joined_at
+        self.seq = seq
+
+    @property
+    def key(self):
+        return (self.rating, self.seq, self.username)
+
+
+class Matchmaker:
+    """Rating-banded matchmaking with wait-time widening"""
+
+    def __init__(self, base_band=100, band_growth=20, max_band=1000, tick_interval=1.0):
+        self.base_band = base_band
+        self.band_growth = band_growth
+        self.max_band = max_band
+        self.tick_interval = tick_interval
+        self.app = None
+        self.socketio = None
+        self._entries = {}  # {username: QueueEntry}
+        self._by_rating = SortedList()  # QueueEntry.key
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._match_callback = None
+
+    def init_app(self, app, socketio):
+        """Read settings from the app config"""
+        self.app = app
+        self.socketio = socketio
+        self.base_band = app.config.get('MATCHMAKING_BASE_BAND', self.base_band)
+        self.band_growth = app.config.get('MATCHMAKING_BAND_GROWTH', self.band_growth)
+        self.max_band = app.config.get('MATCHMAKING_MAX_BAND', self.max_band)
+        self.tick_interval = app.config.get('MATCHMAKING_TICK_INTERVAL', self.tick_interval)
+
+    def on_match(self, callback):
+        """Register the callback that creates a game for (first, second) entries"""
+        self._match_callback = callback
+        return callback
+
+    def band(self, entry, now=None):
+        """Acceptable rating difference for an entry given its wait time"""
+        waited = (now or time.monotonic()) - entry.joined_at
+        return min(self.base_band + self.band_growth * waited, self.max_band)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, username):
+        return username in self._entries
+
+    def _remove(self, entry):
+        self._entries.pop(entry.username, None)
+        self._by_rating.discard(entry.key)
+
+    def _closest(self, entry, band):
+        """Closest-rated other waiter within `band`, or None"""
+        index = self._by_rating.bisect_left(entry.key)
+        best = None
+        for neighbour in (index - 1, index + 1):
+            if 0 <= neighbour < len(self._by_rating):
+                rating, _, username = self._by_rating[neighbour]
+                gap = abs(rating - entry.rating)
+                if gap <= band and (best is None or gap < best[0]):
+                    best = (gap, self._entries[username])
+        return best[1] if best else None
+
+    def enqueue(self, username, sid, rating):
+        """Add a player; starts and returns a (first, second) pair if matched immediately"""
+        now = time.monotonic()
+        with self._lock:
+            existing = self._entries.get(username)
+            if existing:
+                # Re-queue from a new connection keeps the original wait time
+                self._remove(existing)
+                entry = QueueEntry(username, sid, rating, existing.joined_at, existing.seq)
+            else:
+                entry = QueueEntry(username, sid, rating, now, next(self._seq))
+            self._entries[username] = entry
+            self._by_rating.add(entry.key)
+            metrics.incr('matchmaking.enqueued')
+
+            opponent = self._closest(entry, self.band(entry, now))
+            if opponent is None:
+                return None
+            self._remove(entry)
+            self._remove(opponent)
+        pair = self._pair(opponent, entry)
+        self._dispatch(*pair)
+        return pair
+
+    def cancel(self, username):
+        """Remove a player from the queue; returns True if they were waiting"""
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                return False
+            self._remove(entry)
+        metrics.incr('matchmaking.cancelled')
+        return True
+
+    def drain(self):
+        """Empty the queue; returns the entries that were waiting"""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+            self._by_rating.clear()
+        return entries
+
+    def _pair(self, first, second):
+        """Longest waiter plays X"""
+        if second.seq < first.seq:
+            first, second = second, first
+        metrics.incr('matchmaking.matched')
+        return first, second
+
+    def tick(self):
+        """Retry the oldest waiters with their widened bands"""
+        now = time.monotonic()
+        pairs = []
+        with self._lock:
+            for entry in sorted(self._entries.values(), key=lambda e: e.seq):
+                if entry.username not in self._entries:
+                    continue
+                opponent = self._closest(entry, self.band(entry, now))
+                if opponent is not None:
+                    self._remove(entry)
+                    self._remove(opponent)
+                    pairs.append(self._pair(entry, opponent))
+        for first, second in pairs:
+            self._dispatch(first, second)
+        return pairs
+
+    def _dispatch(self, first, second):
+        if self._match_callback is None:
+            return
+        try:
+            self._match_callback(first, second)
+        except Exception as e:
+            logger.error(f"Failed to start match {first.username} vs {second.username}: {e}")
+
+    def run(self):
+        """Background task driving `tick`"""
+        while True:
+            self.socketio.sleep(self.tick_interval)
+            if not self._entries:
+                continue
+            try:
+                with self.app.app_context():
+                    self.tick()
+            except Exception as e:
+                logger.error(f"Matchmaking tick failed: {e}")
+
+
+matchmaker = Matchmaker()
@@ -0,0 +1,126 @@
+"""
+Move and game-end handling shared by the eventlet and asyncio socket servers.
+
+Both servers check a move with `move_error`, apply it with `apply_move` and
+store it with `store_move`: mid-game moves through the guarded `save_move`
+UPDATE (the asyncio server runs the same `move_update` statement on its
+async engine), game-ending moves through `repositories.games.finish`, which
+records stats, ratings, positions and tournament results in the same
+transaction as the final move. Timeouts go through `forfeit_on_time`. Once a
+result has committed, `advance_tournament` schedules any next round and
+`game_over_payload` builds what both servers broadcast. Only loading games
+and emitting events differ between the servers.
+"""
+import logging
+from datetime import datetime
+
+from app import db
+from app.services.clocks import game_clocks
+from app.services.game_logic import check_winner, is_draw
+from app.services.repositories import repositories
+from app.services.tournaments import tournaments
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def move_error(game, player, index):
+    """Message rejecting `player`'s move at `index`, or None if the move is legal"""
+    if not game.can_make_move(player):
+        reasons = []
+        if game.winner:
+            reasons.append("Game already won")
+        elif game.is_draw:
+            reasons.append("Game is a draw")
+        elif not game.player_o:
+            reasons.append("Waiting for second player")
+        elif not game.is_player_turn(player):
+            reasons.append("Not your turn")
+        return f'Invalid move: {", ".join(reasons)}'
+
+    if index < 0 or index > 8 or game.board_data[index] != "":
+        return 'Position already taken or invalid'
+    return None
+
+
+def time_expired(game):
+    """True if the side to move has run out of time, even if its timer has not fired yet"""
+    return game_clocks.flagged(game, game.current_turn)
+
+
+def apply_move(game, index):
+    """Play the side to move at `index`, settle the result and charge its clock; returns the symbol played"""
+    symbol = game.current_turn
+    board = game.board_data
+    board[index] = symbol
+    game.board_data = board
+    game.move_count = (game.move_count or 0) + 1
+    game.moves = (game.moves or '') + str(index)
+
+    result = check_winner(board)
+    if result['winner']:
+        game.winner = result['winner']
+        game.winning_line_data = result['winning_line']
+    elif is_draw(board):
+        game.is_draw = True
+    else:
+        game.current_turn = 'O' if game.current_turn == 'X' else 'X'
+
+    game_clocks.charge(game, symbol)
+    return symbol
+
+
+def store_move(game, previous_move_count):
+    """Store an applied move, finishing the game if it ended
+
+    Returns the rating changes of a finished game ({} for a mid-game move),
+    or None if another write got there first.
+    """
+    if game.winner or game.is_draw:
+        # Finished games update player stats and ratings in the same transaction
+        return repositories.games.finish(game, previous_move_count)
+    return {} if repositories.games.save_move(game, previous_move_count) else None
+
+
+def forfeit_on_time(game, side):
+    """End a timed game as a loss for `side`; returns the rating changes, or None if a move was stored first"""
+    game_clocks.charge(game, side)
+    game.winner = 'O' if side == 'X' else 'X'
+    rating_changes = repositories.games.finish(game, game.move_count, record_positions=False)
+    if rating_changes is not None:
+        metrics.incr('clock.timeouts')
+    return rating_changes
+
+
+def expire_clock(game_id, side, move_count):
+    """Clock timer callback: forfeit `side` if still on the timed move; returns (game, rating changes) or None"""
+    game = repositories.games.get(game_id, for_update=True)
+    if (game is None or game.winner or game.is_draw or game.current_turn != side
+            or game.move_count != move_count):
+        repositories.games.discard()
+        return None  # Stale timer: the game moved on before it fired
+    rating_changes = forfeit_on_time(game, side)
+    return None if rating_changes is None else (game, rating_changes)
+
+
+def game_over_payload(game, reason=None):
+    """`game_over` event for a finished game"""
+    return {
+        'winner': game.winner,
+        'is_draw': game.is_draw,
+        'reason': reason or ('draw' if game.is_draw else 'win'),
+        'final_board': game.board_data,
+        'timestamp': datetime.utcnow().isoformat(),
+        'winner_name': game.player_x if game.winner == 'X' else game.player_o if game.winner == 'O' else None
+    }
+
+
+def advance_tournament(game):
+    """Announce a tournament game's committed result and schedule the next round if it was the last"""
+    if not repositories.persistent:
+        return  # Tournament games only exist in the database
+    try:
+        tournaments.advance_round(game)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to advance tournament for game {game.id}: {e}")
@@ -0,0 +1,139 @@
+"""
+Opening and position statistics.
+
+Each game records its moves as a string of cell indices (`game.moves`).
+When a game finishes, every position it passed through is reduced to its
+canonical form under the board's 8 symmetries (rotations and reflections),
+encoded as a base-3 integer, and its outcome counters are bumped with one
+upsert per ply. Reads never touch `game.board`; they are primary-key or
+`ply` index lookups on `position_stats`.
+"""
+from functools import lru_cache
+
+from sqlalchemy import select, update
+
+from app import db
+from app.models.position_stat import PositionStat
+
+CELL_VALUES = {'': 0, 'X': 1, 'O': 2}
+CELL_SYMBOLS = ('', 'X', 'O')
+
+
+def _symmetries():
+    """Index permutations for the 8 symmetries: new_board[i] = board[perm[i]]"""
+    transforms = [
+        lambda r, c: (r, c), lambda r, c: (c, 2 - r),
+        lambda r, c: (2 - r, 2 - c), lambda r, c: (2 - c, r),
+        lambda r, c: (r, 2 - c), lambda r, c: (2 - r, c),
+        lambda r, c: (c, r), lambda r, c: (2 - c, 2 - r)
+    ]
+    perms = []
+    for transform in transforms:
+        cells = (transform(i // 3, i % 3) for i in range(9))
+        perms.append(tuple(r * 3 + c for r, c in cells))
+    return perms
+
+
+SYMMETRIES = _symmetries()
+
+
+def encode(board):
+    code = 0
+    for cell in board:
+        code = code * 3 + CELL_VALUES[cell]
+    return code
+
+
+def decode(code):
+    board = []
+    for _ in range(9):
+        code, value = divmod(code, 3)
+        board.append(CELL_SYMBOLS[value])
+    return board[::-1]
+
+
+@lru_cache(maxsize=None)
+def canonical(board):
+    """Smallest code among a board tuple's symmetric variants"""
+    return min(encode([board[i] for i in perm]) for perm in SYMMETRIES)
+
+
+def parse_moves(moves):
+    """Cell indices from a `game.moves` string"""
+    return [int(ch) for ch in moves or '']
+
+
+def game_positions(moves):
+    """(ply, canonical code) for every position after each move"""
+    board = [''] * 9
+    positions = []
+    for ply, index in enumerate(parse_moves(moves), start=1):
+        board[index] = 'X' if ply % 2 else 'O'
+        positions.append((ply, canonical(tuple(board))))
+    return positions
+
+
+def _outcome_counts(game):
+    return {
+        'games': 1,
+        'x_wins': int(game.winner == 'X'),
+        'o_wins': int(game.winner == 'O'),
+        'draws': int(bool(game.is_draw))
+    }
+
+
+def record_positions(game):
+    """Add a finished game's positions to the counters (caller commits)"""
+    positions = game_positions(game.moves)
+    if not positions:
+        return 0
+    counts = _outcome_counts(game)
+    rows = [dict(counts, position=code, ply=ply) for ply, code in positions]
+    table = PositionStat.__table__
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.position],
+            set_={name: table.c[name] + statement.excluded[name] for name in counts}
+        )
+        db.session.execute(statement, rows)
+        return len(rows)
+
+    for row in rows:
+        result = db.session.execute(
+            update(table)
+            .where(table.c.position == row['position'])
+            .values({name: table.c[name] + row[name] for name in counts})
+        )
+        if not result.rowcount:
+            db.session.execute(table.insert(), [row])
+    return len(rows)
+
+
+def _with_board(stat):
+    data = stat.to_dict()
+    data['board'] = decode(stat.position)
+    return data
+
+
+def openings(ply=1, limit=50):
+    """Most played canonical positions at a ply"""
+    stats = db.session.execute(
+        select(PositionStat)
+        .where(PositionStat.ply == ply)
+        .order_by(PositionStat.games.desc(), PositionStat.position)
+        .limit(limit)
+    ).scalars()
+    return [_with_board(stat) for stat in stats]
+
+
+def position_stats(board):
+    """Counters for a board (any orientation), or None if never reached"""
+    stat = db.session.get(PositionStat, canonical(tuple(board)))
+    return _with_board(stat) if stat else None
@@ -0,0 +1,169 @@
+"""
+Elo ratings and the in-memory leaderboard.
+
+Ratings are computed at game end from both players' `users.rating` rows,
+read with a row lock in the transaction that finishes the game, and
+written back in it, so every worker rates from the database's current
+values and a game is rated exactly once with its result.
+
+For reads, all ratings are loaded into a SortedList of (-rating, username),
+so top-N reads and rank lookups are O(log n) and never sort the users
+table. Each process applies the changes it commits; with sharding, games
+finished on other workers only show up when the list is reloaded every
+`LEADERBOARD_REFRESH_INTERVAL` seconds.
+"""
+import logging
+import threading
+
+from sortedcontainers import SortedList
+from sqlalchemy import bindparam, select, update
+
+from app import db
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+def expected_score(rating, opponent_rating):
+    return 1 / (1 + 10 ** ((opponent_rating - rating) / 400))
+
+
+def elo_update(rating_x, rating_o, score_x, k_factor=32):
+    """New (rating_x, rating_o) given X's score (1 win, 0.5 draw, 0 loss)"""
+    delta = k_factor * (score_x - expected_score(rating_x, rating_o))
+    return round(rating_x + delta), round(rating_o - delta)
+
+
+class Leaderboard:
+    """Sorted in-memory ratings over the `users.rating` column"""
+
+    def __init__(self, k_factor=32, default_rating=1200, refresh_interval=0.0):
+        self.k_factor = k_factor
+        self.default_rating = default_rating
+        self.refresh_interval = refresh_interval
+        self.app = None
+        self._ratings = {}  # {username: rating}
+        self._sorted = SortedList()  # (-rating, username)
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    def init_app(self, app):
+        """Read settings from the app config"""
+        self.app = app
+        self.k_factor = app.config.get('ELO_K_FACTOR', self.k_factor)
+        self.default_rating = app.config.get('ELO_DEFAULT_RATING', self.default_rating)
+        # A single process commits every rating change itself; shards must reload to see each other's
+        if app.config.get('SHARDING_ENABLED'):
+            self.refresh_interval = app.config.get('LEADERBOARD_REFRESH_INTERVAL', self.refresh_interval)
+
+    def _ensure_loaded(self):
+        """Load every user's rating once"""
+        if not self._loaded:
+            self.refresh()
+
+    def refresh(self):
+        """Reload every user's rating (single scan, no ORDER BY) and swap the sorted list in"""
+        rows = db.session.execute(select(User.username, User.rating)).all()
+        ratings = {row.username: row.rating or self.default_rating for row in rows}
+        ordered = SortedList((-rating, username) for username, rating in ratings.items())
+        with self._lock:
+            self._ratings, self._sorted = ratings, ordered
+            if not self._loaded:
+                logger.info(f"Loaded {len(ratings)} ratings into the leaderboard")
+            self._loaded = True
+
+    def _set_rating(self, username, rating):
+        old = self._ratings.get(username)
+        if old is not None:
+            self._sorted.remove((-old, username))
+        self._ratings[username] = rating
+        self._sorted.add((-rating, username))
+
+    def rating(self, username):
+        self._ensure_loaded()
+        return self._ratings.get(username, self.default_rating)
+
+    def rank(self, username):
+        """1-based rank; ties share the best rank"""
+        self._ensure_loaded()
+        with self._lock:
+            rating = self._ratings.get(username, self.default_rating)
+            return self._sorted.bisect_left((-rating, '')) + 1
+
+    def top(self, limit=10, offset=0):
+        """Highest rated users, best first"""
+        self._ensure_loaded()
+        with self._lock:
+            entries = list(self._sorted.islice(offset, offset + limit))
+            first_rank = None
+            result = []
+            for position, (negative_rating, username) in enumerate(entries, start=offset + 1):
+                # Ties share a rank; only look it up when the rating changes
+                if not result or result[-1]['rating'] != -negative_rating:
+                    first_rank = self._sorted.bisect_left((negative_rating, '')) + 1
+                result.append({'rank': first_rank, 'username': username, 'rating': -negative_rating})
+            return result
+
+    def __len__(self):
+        self._ensure_loaded()
+        return len(self._sorted)
+
+    def record_game(self, game):
+        """Rate a finished game in the transaction that finishes it (caller commits, then `apply`s the result)
+
+        Both players' rows are locked (in username order, so two games
+        sharing a player cannot deadlock) and the new ratings are computed
+        from the stored values. Returns {username: {old, new}}.
+        """
+        if not (game.winner or game.is_draw) or not game.player_o:
+            return {}
+        score_x = 0.5 if game.is_draw else (1.0 if game.winner == 'X' else 0.0)
+
+        rows = db.session.execute(
+            select(User.username, User.rating)
+            .where(User.username.in_([game.player_x, game.player_o]))
+            .order_by(User.username)
+            .with_for_update()
+        ).all()
+        stored = {row.username: row.rating or self.default_rating for row in rows}
+        old_x = stored.get(game.player_x, self.default_rating)
+        old_o = stored.get(game.player_o, self.default_rating)
+        new_x, new_o = elo_update(old_x, old_o, score_x, self.k_factor)
+        changes = {
+            game.player_x: {'old': old_x, 'new': new_x},
+            game.player_o: {'old': old_o, 'new': new_o}
+        }
+
+        updates = [{'target': username, 'new_rating': changes[username]['new']} for username in stored]
+        if updates:
+            db.session.execute(
+                update(User.__table__)
+                .where(User.__table__.c.username == bindparam('target'))
+                .values(rating=bindparam('new_rating')),
+                updates
+            )
+        return changes
+
+    def apply(self, changes):
+        """Show committed rating changes in this process's sorted list"""
+        if not self._loaded or not changes:
+            return
+        with self._lock:
+            for username, change in changes.items():
+                self._set_rating(username, change['new'])
+
+    def run_refresher(self):
+        """Background task: reload ratings every `refresh_interval` seconds (sharded workers only)"""
+        from app import socketio
+        if not self.refresh_interval:
+            return
+        while True:
+            socketio.sleep(self.refresh_interval)
+            try:
+                with self.app.app_context():
+                    self.refresh()
+            except Exception as e:
+                logger.error(f"Leaderboard refresh failed: {e}")
+
+
+leaderboard = Leaderboard()
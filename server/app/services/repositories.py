@@ -0,0 +1,415 @@
+"""
+Game and user repositories.
+
+Socket handlers and the game/auth routes load and store games and users
+through `repositories.games` and `repositories.users` rather than through
+`Game.query` and `db.session`, so the storage behind them can be swapped:
+
+- `sqlalchemy` (default): the database, exactly as before. Finishing a game
+  also records player stats, ratings, position statistics and tournament
+  results in the same commit, and mid-game moves go through the group committer.
+- `memory`: dicts in this process. Nothing is persisted and nothing waits on
+  a database, so tests and load tests of the socket layer measure our code
+  rather than DB latency. Only games and users live here: stats, ratings,
+  positions, exports, game history and tournaments still read the database
+  (empty in this mode, or whatever was in it before).
+
+The backend is chosen by `REPOSITORY_BACKEND` or `create_app(repository_backend=...)`.
+Repository methods never raise on a missing row; they return None.
+"""
+import itertools
+import logging
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+from sqlalchemy import update
+
+from app import db
+from app.models.game import Game
+from app.models.user import User
+from app.services.game_cache import game_cache
+
+logger = logging.getLogger(__name__)
+
+
+class GameRepository(ABC):
+    """Storage of games used by the socket handlers and game routes"""
+
+    @abstractmethod
+    def get(self, game_id, for_update=False):
+        """The game, or None; `for_update` locks its row until the next save or discard"""
+
+    @abstractmethod
+    def get_many(self, game_ids):
+        """The existing games among `game_ids`"""
+
+    @abstractmethod
+    def create(self, **fields):
+        """Store a new game and return it with its id"""
+
+    @abstractmethod
+    def save(self, game):
+        """Store changes to a game"""
+
+    @abstractmethod
+    def save_move(self, game, previous_move_count):
+        """Store a mid-game move; False if another move was stored first"""
+
+    @abstractmethod
+    def finish(self, game, previous_move_count, record_positions=True):
+        """Store a finished game with its results; returns the rating changes, or None if another write came first"""
+
+    @abstractmethod
+    def delete(self, game):
+        """Remove a game"""
+
+    @abstractmethod
+    def discard(self):
+        """Drop unsaved changes and locks after a failed operation"""
+
+    @abstractmethod
+    def waiting(self):
+        """Open games still waiting for a second player"""
+
+    @abstractmethod
+    def unfinished_for(self, username):
+        """Games in progress (or waiting) where `username` is a player"""
+
+    @abstractmethod
+    def newest_first(self):
+        """Every game, newest first"""
+
+
+class UserRepository(ABC):
+    """Storage of user accounts used by the auth and profile routes"""
+
+    @abstractmethod
+    def get_by_username(self, username):
+        """The user, or None"""
+
+    @abstractmethod
+    def create(self, username, password):
+        """Store a new user with a hashed password and return it"""
+
+    @abstractmethod
+    def save(self, user):
+        """Store changes to a user, including a new username"""
+
+    @abstractmethod
+    def discard(self):
+        """Drop unsaved changes after a failed operation"""
+
+
+class SQLAlchemyGameRepository(GameRepository):
+    """Games in the database, through the Flask-SQLAlchemy session"""
+
+    def get(self, game_id, for_update=False):
+        if for_update:
+            return Game.query.filter_by(id=game_id).with_for_update().first()
+        return db.session.get(Game, game_id)
+
+    def get_many(self, game_ids):
+        return Game.query.filter(Game.id.in_(list(game_ids))).all()
+
+    def create(self, **fields):
+        game = Game(**fields)
+        db.session.add(game)
+        try:
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return game
+
+    def save(self, game):
+        db.session.add(game)
+        db.session.commit()
+
+    def save_move(self, game, previous_move_count):
+        from app.services.group_commit import group_commit
+
+        # Keep the in-memory game for the broadcast, and end this event's read transaction before waiting
+        if game in db.session:
+            db.session.expunge(game)
+        db.session.rollback()
+
+        if not group_commit.execute(move_update(game, previous_move_count)):
+            return False
+        self._written(game)
+        return True
+
+    def finish(self, game, previous_move_count, record_positions=True):
+        from app.services.positions import record_positions as record_game_positions
+        from app.services.ratings import leaderboard
+        from app.services.tournaments import tournaments
+        from app.services.user_stats import record_game_result
+
+        # The final state is written with the same guard as a mid-game move, and nothing else is
+        # recorded unless it applied: two racing final moves (or a move and a forfeit) finish a game once
+        if game in db.session:
+            db.session.expunge(game)
+        if not db.session.execute(move_update(game, previous_move_count)).rowcount:
+            db.session.rollback()
+            return None
+
+        # Stats, ratings and any tournament result commit in the same transaction as the finished game
+        record_game_result(game)
+        if record_positions:
+            record_game_positions(game)
+        tournaments.record_result(game)
+        rating_changes = leaderboard.record_game(game)
+        db.session.commit()
+        leaderboard.apply(rating_changes)
+        self._written(game)
+        return rating_changes
+
+    def delete(self, game):
+        db.session.delete(game)
+        db.session.commit()
+
+    def discard(self):
+        db.session.rollback()
+
+    def waiting(self):
+        return Game.query.filter(
+            Game.player_o.is_(None),
+            Game.winner.is_(None),
+            Game.is_draw == False
+        ).all()
+
+    def unfinished_for(self, username):
+        return Game.query.filter(
+            (Game.player_x == username) | (Game.player_o == username),
+            Game.winner.is_(None),
+            Game.is_draw == False
+        ).all()
+
+    def newest_first(self):
+        return Game.query.order_by(Game.created_at.desc()).all()
+
+    @staticmethod
+    def _written(game):
+        """Bookkeeping the ORM would have done for a game written with a Core UPDATE"""
+        from app.utils.db_routing import replica_router
+
+        game_cache.mark_changed(game.id)
+        if replica_router.bind_keys:
+            replica_router.pin(name for name in (game.player_x, game.player_o) if name)
+
+
+class SQLAlchemyUserRepository(UserRepository):
+    """Users in the database, through the Flask-SQLAlchemy session"""
+
+    def get_by_username(self, username):
+        return User.query.filter_by(username=username).first()
+
+    def create(self, username, password):
+        user = User(username=username)
+        user.set_password(password)
+        db.session.add(user)
+        db.session.commit()
+        return user
+
+    def save(self, user):
+        db.session.add(user)
+        db.session.commit()
+
+    def discard(self):
+        db.session.rollback()
+
+
+def move_update(game, previous_move_count):
+    """UPDATE storing a game's state only if no other move was stored since `previous_move_count`
+
+    A finished game never matches, so a move still queued in the group
+    committer cannot land after a timeout forfeit (which ends the game
+    without a move).
+    """
+    return (
+        update(Game)
+        .where(Game.id == game.id, Game.move_count == previous_move_count,
+               Game.winner.is_(None), Game.is_draw == False)
+        .values(
+            board=game.board,
+            current_turn=game.current_turn,
+            winner=game.winner,
+            is_draw=game.is_draw,
+            winning_line=game.winning_line,
+            move_count=game.move_count,
+            moves=game.moves,
+            clock_x=game.clock_x,
+            clock_o=game.clock_o
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _copy(model, obj):
+    """Detached copy of a model instance's column values"""
+    return model(**{column.key: getattr(obj, column.key) for column in model.__table__.columns})
+
+
+def _fill_defaults(model, obj):
+    """Apply the scalar column defaults the database would have filled in"""
+    for column in model.__table__.columns:
+        default = column.default
+        if getattr(obj, column.key) is None and default is not None and default.is_scalar:
+            setattr(obj, column.key, default.arg)
+
+
+class MemoryGameRepository(GameRepository):
+    """Games in a dict; callers get copies, so unsaved changes never leak into the store"""
+
+    def __init__(self):
+        self._games = {}  # {game_id: Game}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def get(self, game_id, for_update=False):
+        try:
+            game_id = int(game_id)
+        except (TypeError, ValueError):
+            return None
+        with self._lock:
+            game = self._games.get(game_id)
+            return _copy(Game, game) if game is not None else None
+
+    def get_many(self, game_ids):
+        return [game for game in (self.get(game_id) for game_id in game_ids) if game is not None]
+
+    def create(self, **fields):
+        game = Game(**fields)
+        _fill_defaults(Game, game)
+        game.created_at = datetime.utcnow()
+        with self._lock:
+            game.id = next(self._ids)
+            self._games[game.id] = _copy(Game, game)
+        game_cache.mark_changed(game.id)
+        return game
+
+    def save(self, game):
+        with self._lock:
+            if game.id not in self._games:
+                return
+            self._games[game.id] = _copy(Game, game)
+        game_cache.mark_changed(game.id)
+
+    def save_move(self, game, previous_move_count):
+        with self._lock:
+            stored = self._games.get(game.id)
+            if (stored is None or stored.move_count != previous_move_count
+                    or stored.winner or stored.is_draw):
+                return False
+            self._games[game.id] = _copy(Game, game)
+        game_cache.mark_changed(game.id)
+        return True
+
+    def finish(self, game, previous_move_count, record_positions=True):
+        # Stats, ratings and position counters are database aggregates; they are not kept in memory
+        return {} if self.save_move(game, previous_move_count) else None
+
+    def delete(self, game):
+        with self._lock:
+            self._games.pop(game.id, None)
+        game_cache.mark_changed(game.id)
+
+    def discard(self):
+        pass
+
+    def _select(self, predicate):
+        with self._lock:
+            return [_copy(Game, game) for game in self._games.values() if predicate(game)]
+
+    def waiting(self):
+        return self._select(lambda game: game.player_o is None and not game.winner and not game.is_draw)
+
+    def unfinished_for(self, username):
+        return self._select(lambda game: username in (game.player_x, game.player_o)
+                            and not game.winner and not game.is_draw)
+
+    def newest_first(self):
+        return sorted(self._select(lambda game: True), key=lambda game: (game.created_at, game.id), reverse=True)
+
+    def __len__(self):
+        return len(self._games)
+
+
+class MemoryUserRepository(UserRepository):
+    """Users in a dict keyed by username, with an id index for renames"""
+
+    def __init__(self):
+        self._users = {}  # {username: User}
+        self._usernames = {}  # {user id: username}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def get_by_username(self, username):
+        with self._lock:
+            user = self._users.get(username)
+            return _copy(User, user) if user is not None else None
+
+    def create(self, username, password):
+        user = User(username=username)
+        user.set_password(password)
+        _fill_defaults(User, user)
+        user.created_at = datetime.utcnow()
+        with self._lock:
+            if username in self._users:
+                raise ValueError(f"Username {username} already exists")
+            user.id = next(self._ids)
+            self._users[username] = _copy(User, user)
+            self._usernames[user.id] = username
+        return user
+
+    def save(self, user):
+        with self._lock:
+            stored = self._usernames.get(user.id)
+            if stored is None:
+                return
+            if user.username != stored:
+                if user.username in self._users:
+                    raise ValueError(f"Username {user.username} already exists")
+                del self._users[stored]
+                self._usernames[user.id] = user.username
+            self._users[user.username] = _copy(User, user)
+
+    def discard(self):
+        pass
+
+    def __len__(self):
+        return len(self._users)
+
+
+BACKENDS = {
+    'sqlalchemy': (SQLAlchemyGameRepository, SQLAlchemyUserRepository),
+    'memory': (MemoryGameRepository, MemoryUserRepository)
+}
+
+
+class Repositories:
+    """The game and user repositories the app was created with"""
+
+    def __init__(self):
+        self.backend = 'sqlalchemy'
+        self.games = SQLAlchemyGameRepository()
+        self.users = SQLAlchemyUserRepository()
+
+    def init_app(self, app, backend=None):
+        """Select the backend (argument, else REPOSITORY_BACKEND) and start with empty stores"""
+        backend = (backend or app.config.get('REPOSITORY_BACKEND') or 'sqlalchemy').lower()
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown repository backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+        game_repository, user_repository = BACKENDS[backend]
+        self.backend = backend
+        self.games = game_repository()
+        self.users = user_repository()
+        app.logger.info(f"Repository backend: {backend}")
+
+    @property
+    def persistent(self):
+        """True when games are rows in the database (and so can join tournaments, stats and exports)"""
+        return self.backend == 'sqlalchemy'
+
+
+repositories = Repositories()
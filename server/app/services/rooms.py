@@ -0,0 +1,271 @@
+"""
+Bounded, compact registry of in-memory socket room state.
+
+Each game with socket activity gets a `RoomState`: a `__slots__` object
+whose optional collections (spectators, invites, rematch requests, restart
+votes, disconnected players) are only allocated while in use, with usernames
+interned so the same string is shared across rooms. Players (X and O) are a
+tuple.
+
+The registry is an LRU keyed by integer game id. Every access moves a room
+to the recent end, so idle rooms collect at the old end: a background sweep
+evicts rooms idle for `ROOM_IDLE_TTL` seconds, and creating a room beyond
+`ROOM_MAX_COUNT` evicts the least recently used. Evicted rooms are rebuilt
+from the database the next time a client joins.
+"""
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+_NAME_SETS = ('spectators', 'rematch_requests', 'restart_votes', 'disconnected')
+
+
+class RoomState:
+    """Socket-side state of one game room"""
+
+    __slots__ = ('game_id', 'players', 'spectators', 'invites', 'rematch_requests',
+                 'restart_votes', 'disconnected', 'last_active')
+
+    def __init__(self, game_id, players=()):
+        self.game_id = game_id
+        self.players = tuple(sys.intern(name) for name in players)
+        self.spectators = None
+        self.invites = None  # {invite_key: {inviter, invitee, timestamp, status}}
+        self.rematch_requests = None
+        self.restart_votes = None
+        self.disconnected = None
+        self.last_active = time.monotonic()
+
+    @property
+    def room_name(self):
+        return f"game_{self.game_id}"
+
+    def add_player(self, username):
+        if username not in self.players:
+            self.players += (sys.intern(username),)
+
+    def discard_player(self, username):
+        if username in self.players:
+            self.players = tuple(name for name in self.players if name != username)
+
+    # Optional name sets: None until first used, dropped again when emptied
+
+    def add_to(self, field, username):
+        names = getattr(self, field)
+        if names is None:
+            names = set()
+            setattr(self, field, names)
+        names.add(sys.intern(username))
+
+    def discard_from(self, field, username):
+        names = getattr(self, field)
+        if names:
+            names.discard(username)
+            if not names:
+                setattr(self, field, None)
+
+    def has(self, field, username):
+        names = getattr(self, field)
+        return bool(names) and username in names
+
+    def count(self, field):
+        names = getattr(self, field)
+        return len(names) if names else 0
+
+    def names(self, field):
+        """Current members of a name set (a copy, safe to iterate while modifying)"""
+        names = getattr(self, field)
+        return tuple(names) if names else ()
+
+    def clear(self, field):
+        setattr(self, field, None)
+
+    # Play-again invites
+
+    def add_invite(self, invite_key, invite):
+        if self.invites is None:
+            self.invites = {}
+        self.invites[invite_key] = invite
+
+    def get_invite(self, invite_key):
+        return self.invites.get(invite_key) if self.invites else None
+
+    def pop_invite(self, invite_key):
+        if not self.invites:
+            return None
+        invite = self.invites.pop(invite_key, None)
+        if not self.invites:
+            self.invites = None
+        return invite
+
+    def invite_items(self):
+        return list(self.invites.items()) if self.invites else []
+
+    def info(self):
+        """Room summary with a spectator count rather than the full list"""
+        return {'players': list(self.players), 'spectator_count': self.count('spectators')}
+
+
+def _deep_size(obj, seen):
+    """Bytes held by a room's own containers; interned strings are shared, so not counted"""
+    if id(obj) in seen or obj is None or isinstance(obj, (str, int, float, bool)):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_size(k, seen) + _deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (set, frozenset, tuple, list)):
+        size += sum(_deep_size(item, seen) for item in obj)
+    elif isinstance(obj, RoomState):
+        size += sum(_deep_size(getattr(obj, slot), seen) for slot in RoomState.__slots__)
+    return size
+
+
+class RoomRegistry:
+    """LRU of {game_id: RoomState} with idle-TTL and capacity eviction"""
+
+    def __init__(self, max_rooms=100000, idle_ttl=3600.0, sweep_interval=60.0):
+        self.max_rooms = max_rooms
+        self.idle_ttl = idle_ttl
+        self.sweep_interval = sweep_interval
+        self.app = None
+        self.socketio = None
+        self._rooms = OrderedDict()
+        self._evict_callbacks = []
+        self._lock = threading.RLock()
+
+    def init_app(self, app, socketio):
+        """Read settings from the app config"""
+        self.app = app
+        self.socketio = socketio
+        self.max_rooms = app.config.get('ROOM_MAX_COUNT', self.max_rooms)
+        self.idle_ttl = app.config.get('ROOM_IDLE_TTL', self.idle_ttl)
+        self.sweep_interval = app.config.get('ROOM_SWEEP_INTERVAL', self.sweep_interval)
+
+    def on_evict(self, callback):
+        """Register `callback(room)` for rooms dropped by TTL or capacity eviction"""
+        self._evict_callbacks.append(callback)
+
+    @staticmethod
+    def _key(game_id):
+        return int(game_id)
+
+    def __contains__(self, game_id):
+        try:
+            return self._key(game_id) in self._rooms
+        except (TypeError, ValueError):
+            return False
+
+    def __len__(self):
+        return len(self._rooms)
+
+    def __iter__(self):
+        return iter(list(self._rooms))
+
+    def values(self):
+        return list(self._rooms.values())
+
+    def get(self, game_id):
+        """Room for a game, or None; marks it active"""
+        try:
+            key = self._key(game_id)
+        except (TypeError, ValueError):
+            return None
+        with self._lock:
+            room = self._rooms.get(key)
+            if room is not None:
+                self._rooms.move_to_end(key)
+                room.last_active = time.monotonic()
+        return room
+
+    def touch(self, game_id):
+        self.get(game_id)
+
+    def ensure(self, game_id, players=()):
+        """Room for a game, created if missing; marks it active"""
+        room = self.get(game_id)
+        if room is not None:
+            return room
+        key = self._key(game_id)
+        evicted = []
+        with self._lock:
+            room = self._rooms.get(key)
+            if room is None:
+                room = self._rooms[key] = RoomState(key, players)
+                metrics.incr('rooms.created')
+                while len(self._rooms) > self.max_rooms:
+                    evicted.append(self._rooms.popitem(last=False)[1])
+        self._evicted(evicted, 'rooms.evicted_lru')
+        return room
+
+    def replace(self, game_id, players=()):
+        """Start a fresh room for a game (e.g. a newly created match)"""
+        with self._lock:
+            self._rooms.pop(self._key(game_id), None)
+        return self.ensure(game_id, players)
+
+    def pop(self, game_id):
+        with self._lock:
+            return self._rooms.pop(self._key(game_id), None)
+
+    def sweep(self, now=None):
+        """Evict rooms idle longer than `idle_ttl`; returns how many were dropped"""
+        cutoff = (now if now is not None else time.monotonic()) - self.idle_ttl
+        evicted = []
+        with self._lock:
+            while self._rooms:
+                key, room = next(iter(self._rooms.items()))
+                if room.last_active > cutoff:
+                    break
+                del self._rooms[key]
+                evicted.append(room)
+        self._evicted(evicted, 'rooms.evicted_idle')
+        return len(evicted)
+
+    def _evicted(self, rooms, counter):
+        if not rooms:
+            return
+        metrics.incr(counter, len(rooms))
+        for room in rooms:
+            for callback in self._evict_callbacks:
+                try:
+                    callback(room)
+                except Exception as e:
+                    logger.error(f"Room eviction callback failed for game {room.game_id}: {e}")
+
+    def memory_report(self):
+        """Approximate bytes held by the registry and its rooms"""
+        with self._lock:
+            rooms = list(self._rooms.values())
+            index_bytes = sys.getsizeof(self._rooms)
+        seen = set()
+        room_bytes = sum(_deep_size(room, seen) for room in rooms)
+        allocated = {field: sum(1 for room in rooms if getattr(room, field))
+                     for field in _NAME_SETS + ('invites',)}
+        return {
+            'rooms': len(rooms),
+            'max_rooms': self.max_rooms,
+            'idle_ttl': self.idle_ttl,
+            'index_bytes': index_bytes,
+            'room_bytes': room_bytes,
+            'bytes_per_room': round((index_bytes + room_bytes) / len(rooms), 1) if rooms else 0,
+            'rooms_with': allocated
+        }
+
+    def run(self):
+        """Background task: evict idle rooms every `sweep_interval` seconds"""
+        while True:
+            self.socketio.sleep(self.sweep_interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Room sweep failed: {e}")
+
+
+game_rooms = RoomRegistry()
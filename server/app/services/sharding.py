@@ -0,0 +1,220 @@
+"""
+Game-affinity sharding across worker processes.
+
+Game state (the room registry, chat buffers, typing and spectator state) lives in
+per-process dicts, so every event for a game must be handled by the same
+worker. Workers announce themselves with a heartbeat row in `shard_workers`;
+each worker builds the same consistent-hash ring from the live rows and maps
+game ids onto it. Events for a game owned elsewhere are answered with a
+`shard_redirect` so the client reconnects to the owning worker.
+
+The quick-play queue is per process too, so it lives on the one worker that
+owns `MATCHMAKING_KEY` on the ring; quick-play requests sent anywhere else
+are redirected there.
+"""
+import atexit
+import bisect
+import hashlib
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask_socketio import emit
+
+from app import db
+from app.models.shard_worker import ShardWorker
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+MATCHMAKING_KEY = 'matchmaking'
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.blake2b(str(key).encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """Consistent-hash ring with virtual nodes"""
+
+    def __init__(self, virtual_nodes=64):
+        self.virtual_nodes = virtual_nodes
+        self._points = []  # sorted hashes
+        self._owners = {}  # {hash: node}
+        self.nodes = set()
+
+    def add_node(self, node):
+        if node in self.nodes:
+            return
+        self.nodes.add(node)
+        for replica in range(self.virtual_nodes):
+            point = _hash(f"{node}#{replica}")
+            self._owners[point] = node
+            bisect.insort(self._points, point)
+
+    def remove_node(self, node):
+        if node not in self.nodes:
+            return
+        self.nodes.discard(node)
+        for replica in range(self.virtual_nodes):
+            point = _hash(f"{node}#{replica}")
+            if self._owners.get(point) == node:
+                del self._owners[point]
+                self._points.pop(bisect.bisect_left(self._points, point))
+
+    def get_node(self, key):
+        """Get the node owning a key, or None if the ring is empty"""
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
+
+
+class ShardRouter:
+    """Maps game ids to worker processes and keeps worker membership current"""
+
+    def __init__(self):
+        self.enabled = False
+        self.worker_id = None
+        self.worker_url = None
+        self.heartbeat_interval = 5.0
+        self.worker_ttl = 15.0
+        self.app = None
+        self.socketio = None
+        self.ring = HashRing()
+        self._urls = {}  # {worker_id: url}
+        self._rebalance_callbacks = []
+
+    def init_app(self, app, socketio):
+        """Read settings from the app config and join the ring"""
+        self.app = app
+        self.socketio = socketio
+        self.enabled = app.config.get('SHARDING_ENABLED', False)
+        self.worker_id = app.config.get('WORKER_ID') or f"{socket.gethostname()}-{os.getpid()}"
+        self.worker_url = app.config.get('WORKER_URL')
+        self.heartbeat_interval = app.config.get('SHARD_HEARTBEAT_INTERVAL', self.heartbeat_interval)
+        self.worker_ttl = app.config.get('SHARD_WORKER_TTL', self.worker_ttl)
+        self.ring = HashRing(app.config.get('SHARD_VIRTUAL_NODES', 64))
+        self.set_workers({self.worker_id: self.worker_url})
+
+        if self.enabled:
+            socketio.start_background_task(self.run)
+            atexit.register(self.leave)
+
+    def on_rebalance(self, callback):
+        """Register a callback run after ring membership changes"""
+        self._rebalance_callbacks.append(callback)
+        return callback
+
+    def owner(self, game_id):
+        """Get the worker id owning a game"""
+        return self.ring.get_node(int(game_id)) or self.worker_id
+
+    def owns(self, game_id):
+        """Check whether this process should handle events for a game"""
+        if not self.enabled:
+            return True
+        try:
+            return self.owner(game_id) == self.worker_id
+        except (TypeError, ValueError):
+            return True
+
+    def redirect_payload(self, game_id):
+        owner = self.owner(game_id)
+        return {
+            'game_id': game_id,
+            'worker_id': owner,
+            'url': self._urls.get(owner)
+        }
+
+    def matchmaking_owner(self):
+        """Get the worker id holding the quick-play queue"""
+        return self.ring.get_node(MATCHMAKING_KEY) or self.worker_id
+
+    def owns_matchmaking(self):
+        """Check whether this process should queue quick-play players"""
+        return not self.enabled or self.matchmaking_owner() == self.worker_id
+
+    def matchmaking_redirect_payload(self):
+        owner = self.matchmaking_owner()
+        return {
+            'game_id': None,
+            'quick_play': True,
+            'worker_id': owner,
+            'url': self._urls.get(owner)
+        }
+
+    def set_workers(self, workers):
+        """Replace ring membership; returns True if it changed"""
+        current = set(self.ring.nodes)
+        live = set(workers)
+        for worker_id in current - live:
+            self.ring.remove_node(worker_id)
+        for worker_id in live - current:
+            self.ring.add_node(worker_id)
+        self._urls = dict(workers)
+        return current != live
+
+    def heartbeat(self):
+        """Refresh this worker's row and rebuild the ring from live workers"""
+        now = datetime.utcnow()
+        worker = db.session.get(ShardWorker, self.worker_id)
+        if worker is None:
+            worker = ShardWorker(worker_id=self.worker_id)
+            db.session.add(worker)
+        worker.url = self.worker_url
+        worker.heartbeat_at = now
+        db.session.commit()
+
+        cutoff = now - timedelta(seconds=self.worker_ttl)
+        live = ShardWorker.query.filter(ShardWorker.heartbeat_at >= cutoff).all()
+        workers = {row.worker_id: row.url for row in live}
+        workers[self.worker_id] = self.worker_url
+
+        if self.set_workers(workers):
+            metrics.incr('sharding.rebalances')
+            logger.info(f"Shard ring changed: {sorted(workers)}")
+            for callback in self._rebalance_callbacks:
+                callback()
+
+    def leave(self):
+        """Remove this worker's row so the others rebalance immediately"""
+        try:
+            with self.app.app_context():
+                ShardWorker.query.filter_by(worker_id=self.worker_id).delete()
+                db.session.commit()
+        except Exception as e:
+            logger.warning(f"Failed to deregister shard worker {self.worker_id}: {e}")
+
+    def run(self):
+        """Background task sending heartbeats"""
+        while True:
+            try:
+                with self.app.app_context():
+                    self.heartbeat()
+            except Exception as e:
+                logger.error(f"Shard heartbeat failed: {e}")
+                with self.app.app_context():
+                    db.session.rollback()
+            self.socketio.sleep(self.heartbeat_interval)
+
+
+shard_router = ShardRouter()
+
+
+def owned_game(f):
+    """Decorator for socket handlers: redirect events for games owned by another worker"""
+    @wraps(f)
+    def wrapper(data, *args, **kwargs):
+        game_id = None
+        if isinstance(data, dict):
+            game_id = next((data[key] for key in ('room', 'gameId', 'game_id')
+                            if data.get(key) is not None), None)
+        if game_id is not None and not shard_router.owns(game_id):
+            metrics.incr('sharding.redirected')
+            emit('shard_redirect', shard_router.redirect_payload(game_id))
+            return None
+        return f(data, *args, **kwargs)
+    return wrapper
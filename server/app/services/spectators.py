@@ -0,0 +1,131 @@
+"""
+Spectator fan-out tier.
+
+Spectators join `game_{id}_spectators` rather than the players' `game_{id}`
+room. Player updates are emitted to the player room immediately; a copy is
+queued here and delivered to spectators by a background tick, with snapshot
+events (e.g. `game_state_update`) coalesced to the latest one per tick and
+an optional broadcast delay. Spectators only ever see a spectator count.
+"""
+import logging
+import threading
+import time
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def spectator_room(game_id):
+    """Socket room name for a game's spectators"""
+    return f"game_{game_id}_spectators"
+
+
+class SpectatorFanout:
+    """Throttled, optionally delayed delivery of game events to spectators"""
+
+    # Snapshot events: only the newest queued copy is delivered each tick
+    SNAPSHOT_EVENTS = frozenset({'game_state_update', 'move_made'})
+
+    def __init__(self, snapshot_interval=1.0, broadcast_delay=0.0):
+        self.snapshot_interval = snapshot_interval
+        self.broadcast_delay = broadcast_delay
+        self.socketio = None
+        self._pending = {}  # {game_id: [(ready_at, event, payload)]}
+        self._counts = {}  # {game_id: number of spectators}
+        self._count_dirty = set()  # games whose spectator count changed since the last tick
+        self._lock = threading.Lock()
+
+    def init_app(self, app, socketio):
+        """Read settings from the app config"""
+        self.socketio = socketio
+        self.snapshot_interval = app.config.get('SPECTATOR_SNAPSHOT_INTERVAL', self.snapshot_interval)
+        self.broadcast_delay = app.config.get('SPECTATOR_BROADCAST_DELAY', self.broadcast_delay)
+
+    def set_count(self, game_id, count):
+        """Record the current number of spectators for a game"""
+        with self._lock:
+            if self._counts.get(game_id, 0) == count:
+                return
+            if count:
+                self._counts[game_id] = count
+            else:
+                self._counts.pop(game_id, None)
+                self._pending.pop(game_id, None)
+            self._count_dirty.add(game_id)
+
+    def count(self, game_id):
+        return self._counts.get(game_id, 0)
+
+    def publish(self, game_id, event, payload):
+        """Queue a copy of a player-room event for the game's spectators"""
+        if not self._counts.get(game_id):
+            return
+        ready_at = time.monotonic() + self.broadcast_delay
+        with self._lock:
+            self._pending.setdefault(game_id, []).append((ready_at, event, payload))
+        metrics.incr('spectators.published')
+
+    def forget(self, game_id):
+        """Drop all spectator state for a game"""
+        with self._lock:
+            self._pending.pop(game_id, None)
+            self._counts.pop(game_id, None)
+            self._count_dirty.discard(game_id)
+
+    def _take_ready(self, now):
+        """Remove and return events whose delay has passed, per game"""
+        ready = {}
+        with self._lock:
+            for game_id, items in list(self._pending.items()):
+                # Items are appended with a constant delay, so due items form a prefix
+                split = 0
+                while split < len(items) and items[split][0] <= now:
+                    split += 1
+                if not split:
+                    continue
+                ready[game_id] = items[:split]
+                if split == len(items):
+                    del self._pending[game_id]
+                else:
+                    self._pending[game_id] = items[split:]
+            counts = {game_id: self._counts.get(game_id, 0) for game_id in self._count_dirty}
+            self._count_dirty.clear()
+        return ready, counts
+
+    def tick(self):
+        """Deliver due events to spectator rooms, coalescing snapshots"""
+        ready, counts = self._take_ready(time.monotonic())
+
+        for game_id, items in ready.items():
+            # Keep only the last occurrence of each snapshot event, preserving order
+            seen = set()
+            deliver = []
+            for _, event, payload in reversed(items):
+                if event in self.SNAPSHOT_EVENTS:
+                    if event in seen:
+                        metrics.incr('spectators.coalesced')
+                        continue
+                    seen.add(event)
+                deliver.append((event, payload))
+
+            for event, payload in reversed(deliver):
+                self.socketio.emit(event, payload, room=spectator_room(game_id))
+                metrics.incr('spectators.emitted')
+
+        for game_id, count in counts.items():
+            payload = {'game_id': game_id, 'spectator_count': count}
+            self.socketio.emit('spectator_count', payload, room=f"game_{game_id}")
+            self.socketio.emit('spectator_count', payload, room=spectator_room(game_id))
+
+    def run(self):
+        """Background task driving `tick` every snapshot interval"""
+        while True:
+            self.socketio.sleep(self.snapshot_interval)
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Spectator fan-out tick failed: {e}")
+
+
+spectator_fanout = SpectatorFanout()
@@ -0,0 +1,391 @@
+"""
+Round-robin and single-elimination tournaments.
+
+Each round's games are created with one multi-row INSERT ... RETURNING and
+its bracket rows with a second bulk insert, so scheduling a round of
+hundreds of players is two statements. Every finished tournament game
+updates both players' scores and atomically decrements the tournament's
+`pending_games` in the same transaction that finishes the game, so a
+committed result is always counted. Once a round's count is zero, the next
+round is scheduled (one query for the round's results) or the tournament
+completed; that step claims the round with a conditional UPDATE first, so
+it runs once however many callers see the round done.
+"""
+import logging
+
+from sqlalchemy import bindparam, insert, select, update
+
+from app import db
+from app.models.game import Game
+from app.models.tournament import Tournament, TournamentMatch, TournamentPlayer
+from app.services.clocks import game_clocks
+from app.services.game_cache import game_cache
+from app.services.ratings import leaderboard
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+ROUND_ROBIN = 'round_robin'
+SINGLE_ELIMINATION = 'single_elimination'
+FORMATS = (ROUND_ROBIN, SINGLE_ELIMINATION)
+
+
+class TournamentError(ValueError):
+    pass
+
+
+def tournament_room(tournament_id):
+    """Socket room for a tournament's round updates"""
+    return f"tournament_{tournament_id}"
+
+
+def round_robin_rounds(player_count):
+    return player_count - 1 if player_count % 2 == 0 else player_count
+
+
+def round_robin_pairs(players, round_index):
+    """Circle-method pairings for a 0-based round; None marks a bye"""
+    seats = list(players) + ([None] if len(players) % 2 else [])
+    count = len(seats)
+    rest = seats[1:]
+    shift = round_index % (count - 1)
+    order = [seats[0]] + (rest[-shift:] + rest[:-shift] if shift else rest)
+    pairs = []
+    for i in range(count // 2):
+        first, second = order[i], order[count - 1 - i]
+        # Alternate who plays X
+        pairs.append((second, first) if (round_index + i) % 2 else (first, second))
+    return pairs
+
+
+def bracket_order(size):
+    """Seed positions for a bracket of `size` (power of two), best seeds meeting last"""
+    order = [0]
+    while len(order) < size:
+        order = [seat for seed in order for seat in (seed, len(order) * 2 - 1 - seed)]
+    return order
+
+
+def elimination_pairs(players):
+    """First-round bracket for players in seed order; top seeds receive the byes"""
+    size = 1 << (len(players) - 1).bit_length()
+    seats = [players[seed] if seed < len(players) else None for seed in bracket_order(size)]
+    return [(seats[i], seats[i + 1]) for i in range(0, size, 2)]
+
+
+class TournamentManager:
+    """Creates tournaments, schedules rounds and advances brackets"""
+
+    def __init__(self):
+        self.socketio = None
+        self._round_callbacks = []
+
+    def init_app(self, app, socketio):
+        self.socketio = socketio
+
+    def on_round(self, callback):
+        """Register a callback(tournament, matches) run after a round is scheduled"""
+        self._round_callbacks.append(callback)
+        return callback
+
+    # Registration
+
+    def create(self, name, fmt, creator):
+        if fmt not in FORMATS:
+            raise TournamentError(f"Format must be one of {', '.join(FORMATS)}")
+        if not name or len(name) > 120:
+            raise TournamentError("Name is required (max 120 characters)")
+        tournament = Tournament(name=name, format=fmt, created_by=creator)
+        db.session.add(tournament)
+        db.session.flush()
+        db.session.add(TournamentPlayer(tournament_id=tournament.id, username=creator))
+        db.session.commit()
+        return tournament
+
+    def get(self, tournament_id):
+        tournament = db.session.get(Tournament, tournament_id)
+        if tournament is None:
+            raise TournamentError(f"Tournament {tournament_id} not found")
+        return tournament
+
+    def join(self, tournament_id, username):
+        tournament = self.get(tournament_id)
+        if tournament.status != 'registration':
+            raise TournamentError("Registration is closed")
+        if db.session.get(TournamentPlayer, (tournament_id, username)) is not None:
+            raise TournamentError("Already registered")
+        db.session.add(TournamentPlayer(tournament_id=tournament_id, username=username))
+        db.session.commit()
+        self._emit(tournament_id, 'tournament_player_joined', {
+            'tournament_id': tournament_id, 'username': username
+        })
+
+    def start(self, tournament_id, username):
+        """Seed players by rating and schedule the first round (or resume a round that failed to advance)"""
+        tournament = self.get(tournament_id)
+        if tournament.created_by != username:
+            raise TournamentError("Only the organiser can start the tournament")
+        if tournament.status == 'in_progress' and tournament.pending_games == 0:
+            # Every result of the current round is in but scheduling the next one failed
+            self._advance(tournament, tournament.current_round)
+            return tournament
+        if tournament.status != 'registration':
+            raise TournamentError("Tournament already started")
+
+        usernames = db.session.execute(
+            select(TournamentPlayer.username).where(TournamentPlayer.tournament_id == tournament_id)
+        ).scalars().all()
+        if len(usernames) < 2:
+            raise TournamentError("At least 2 players are required")
+
+        seeded = sorted(usernames, key=lambda name: (-leaderboard.rating(name), name))
+        db.session.execute(
+            update(TournamentPlayer.__table__)
+            .where(TournamentPlayer.__table__.c.tournament_id == tournament_id)
+            .where(TournamentPlayer.__table__.c.username == bindparam('target'))
+            .values(seed=bindparam('seed')),
+            [{'target': name, 'seed': seed} for seed, name in enumerate(seeded, start=1)]
+        )
+        tournament.status = 'in_progress'
+        if tournament.format == ROUND_ROBIN:
+            pairs = round_robin_pairs(seeded, 0)
+        else:
+            pairs = elimination_pairs(seeded)
+        matches = self._schedule_round(tournament, pairs)
+        db.session.commit()
+        self._announce_round(tournament, matches)
+        return tournament
+
+    # Scheduling
+
+    def _schedule_round(self, tournament, pairs):
+        """Bulk insert a round's games and bracket rows (caller commits)"""
+        tournament.current_round += 1
+        games = [(slot, x, o) for slot, (x, o) in enumerate(pairs) if x and o]
+
+        game_ids = {}
+        if games:
+            time_control = game_clocks.time_control()
+            returned = db.session.execute(
+                insert(Game).returning(Game.id, sort_by_parameter_order=True),
+                [dict(time_control, player_x=x, player_o=o) for _, x, o in games]
+            ).scalars().all()
+            game_ids = {slot: game_id for (slot, _, _), game_id in zip(games, returned)}
+
+        matches = []
+        for slot, (x, o) in enumerate(pairs):
+            if x is None and o is None:
+                continue
+            bye = slot not in game_ids
+            player = x or o
+            matches.append({
+                'tournament_id': tournament.id,
+                'round': tournament.current_round,
+                'slot': slot,
+                'game_id': game_ids.get(slot),
+                'player_x': player if bye else x,
+                'player_o': None if bye else o,
+                # A bye advances in elimination and scores nothing in round robin
+                'winner': player if bye and tournament.format == SINGLE_ELIMINATION else None,
+                'finished': bye
+            })
+        db.session.execute(insert(TournamentMatch), matches)
+        tournament.pending_games = len(game_ids)
+        metrics.incr('tournaments.games_scheduled', len(game_ids))
+        return matches
+
+    def _announce_round(self, tournament, matches):
+        # Round games were bulk inserted outside the ORM
+        game_cache.bump_lobby()
+        self._emit(tournament.id, 'tournament_round', {
+            'tournament_id': tournament.id,
+            'round': tournament.current_round,
+            'matches': [
+                {key: match[key] for key in ('slot', 'game_id', 'player_x', 'player_o')}
+                for match in matches
+            ]
+        })
+        for callback in self._round_callbacks:
+            try:
+                callback(tournament, matches)
+            except Exception as e:
+                logger.error(f"Tournament {tournament.id} round callback failed: {e}")
+
+    # Results
+
+    def record_result(self, game):
+        """Score a finished tournament game in the transaction that finishes it (caller commits)"""
+        match = db.session.execute(
+            select(TournamentMatch).where(TournamentMatch.game_id == game.id)
+        ).scalar_one_or_none()
+        if match is None or match.finished:
+            return
+
+        tournament = db.session.get(Tournament, match.tournament_id)
+        players = {match.player_x, match.player_o}
+        if game.winner:
+            winner = match.player_x if game.winner == 'X' else match.player_o
+        else:
+            winner = None
+
+        if tournament.format == SINGLE_ELIMINATION:
+            advancing = winner or self._higher_seed(tournament.id, players)
+            eliminated = (players - {advancing}).pop()
+            db.session.execute(
+                update(TournamentPlayer)
+                .where(TournamentPlayer.tournament_id == tournament.id)
+                .where(TournamentPlayer.username == eliminated)
+                .values(eliminated=True)
+            )
+            match.winner = advancing
+        else:
+            match.winner = winner
+        self._score(tournament.id, players, winner)
+        match.finished = True
+
+        db.session.execute(
+            update(Tournament)
+            .where(Tournament.id == tournament.id)
+            .values(pending_games=Tournament.pending_games - 1)
+            .execution_options(synchronize_session=False)
+        )
+
+    def advance_round(self, game):
+        """After a tournament game's result has committed: announce it and advance the round if it was the last"""
+        match = db.session.execute(
+            select(TournamentMatch).where(TournamentMatch.game_id == game.id)
+        ).scalar_one_or_none()
+        if match is None or not match.finished:
+            return
+        self._emit(match.tournament_id, 'tournament_result', dict(match.to_dict(), tournament_id=match.tournament_id))
+        self._advance(db.session.get(Tournament, match.tournament_id), match.round)
+
+    def _higher_seed(self, tournament_id, players):
+        """Draws in elimination go to the better seed"""
+        return db.session.execute(
+            select(TournamentPlayer.username)
+            .where(TournamentPlayer.tournament_id == tournament_id)
+            .where(TournamentPlayer.username.in_(players))
+            .order_by(TournamentPlayer.seed)
+            .limit(1)
+        ).scalar()
+
+    def _score(self, tournament_id, players, winner):
+        table = TournamentPlayer.__table__
+        rows = []
+        for username in players:
+            if winner is None:
+                rows.append({'target': username, 'points': 1, 'win': 0, 'draw': 1, 'loss': 0})
+            elif username == winner:
+                rows.append({'target': username, 'points': 2, 'win': 1, 'draw': 0, 'loss': 0})
+            else:
+                rows.append({'target': username, 'points': 0, 'win': 0, 'draw': 0, 'loss': 1})
+        db.session.execute(
+            update(table)
+            .where(table.c.tournament_id == tournament_id)
+            .where(table.c.username == bindparam('target'))
+            .values(
+                points=table.c.points + bindparam('points'),
+                wins=table.c.wins + bindparam('win'),
+                draws=table.c.draws + bindparam('draw'),
+                losses=table.c.losses + bindparam('loss')
+            ),
+            rows
+        )
+
+    def _advance(self, tournament, round_number):
+        """Schedule the next round or finish the tournament, if `round_number` is current and has no games left"""
+        # Claim the finished round (pending_games 0 -> -1) so only one caller advances it; the
+        # scheduling or completion below replaces the marker in the same transaction
+        claimed = db.session.execute(
+            update(Tournament)
+            .where(Tournament.id == tournament.id)
+            .where(Tournament.status == 'in_progress')
+            .where(Tournament.current_round == round_number)
+            .where(Tournament.pending_games == 0)
+            .values(pending_games=-1)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not claimed:
+            db.session.rollback()
+            return
+        db.session.refresh(tournament)
+        if tournament.format == ROUND_ROBIN:
+            seeded = db.session.execute(
+                select(TournamentPlayer.username)
+                .where(TournamentPlayer.tournament_id == tournament.id)
+                .order_by(TournamentPlayer.seed)
+            ).scalars().all()
+            if tournament.current_round < round_robin_rounds(len(seeded)):
+                pairs = round_robin_pairs(seeded, tournament.current_round)
+            else:
+                pairs = None
+        else:
+            winners = db.session.execute(
+                select(TournamentMatch.winner)
+                .where(TournamentMatch.tournament_id == tournament.id)
+                .where(TournamentMatch.round == tournament.current_round)
+                .order_by(TournamentMatch.slot)
+            ).scalars().all()
+            if len(winners) > 1:
+                pairs = [(winners[i], winners[i + 1]) for i in range(0, len(winners), 2)]
+            else:
+                pairs = None
+
+        if pairs is None:
+            self._complete(tournament)
+            return
+        matches = self._schedule_round(tournament, pairs)
+        db.session.commit()
+        self._announce_round(tournament, matches)
+        # A round made only of byes has nothing to wait for
+        if tournament.pending_games == 0:
+            self._advance(tournament, tournament.current_round)
+
+    def _complete(self, tournament):
+        standings = self.standings(tournament.id)
+        if tournament.format == SINGLE_ELIMINATION:
+            tournament.winner = next((p['username'] for p in standings if not p['eliminated']), None)
+        else:
+            tournament.winner = standings[0]['username'] if standings else None
+        tournament.status = 'completed'
+        tournament.pending_games = 0
+        db.session.commit()
+        metrics.incr('tournaments.completed')
+        self._emit(tournament.id, 'tournament_completed', {
+            'tournament_id': tournament.id,
+            'winner': tournament.winner,
+            'standings': standings
+        })
+
+    # Reads
+
+    def standings(self, tournament_id):
+        players = db.session.execute(
+            select(TournamentPlayer)
+            .where(TournamentPlayer.tournament_id == tournament_id)
+            .order_by(TournamentPlayer.points.desc(), TournamentPlayer.wins.desc(), TournamentPlayer.seed)
+        ).scalars()
+        return [player.to_dict() for player in players]
+
+    def state(self, tournament_id):
+        """Tournament summary, standings and the current round's matches"""
+        tournament = self.get(tournament_id)
+        matches = db.session.execute(
+            select(TournamentMatch)
+            .where(TournamentMatch.tournament_id == tournament_id)
+            .where(TournamentMatch.round == tournament.current_round)
+            .order_by(TournamentMatch.slot)
+        ).scalars()
+        return {
+            'tournament': tournament.to_dict(),
+            'standings': self.standings(tournament_id),
+            'matches': [match.to_dict() for match in matches]
+        }
+
+    def _emit(self, tournament_id, event, payload):
+        if self.socketio is not None:
+            self.socketio.emit(event, payload, room=tournament_room(tournament_id))
+
+
+tournaments = TournamentManager()
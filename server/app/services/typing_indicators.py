@@ -0,0 +1,129 @@
+"""
+Server-side coalescing of typing indicators.
+
+Clients send `typing_indicator` on every keystroke. Only state changes per
+user are kept, each room's typing set is emitted at most once per interval
+as a single `typing_update`, and "is typing" expires after a timeout if the
+client never sends the stop event.
+"""
+import logging
+import threading
+import time
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class TypingCoalescer:
+    """Debounce per user, coalesce per room"""
+
+    def __init__(self, emit_interval=0.5, timeout=5.0):
+        self.emit_interval = emit_interval
+        self.timeout = timeout
+        self.socketio = None
+        self._typing = {}  # {game_id: {user: expires_at}}
+        self._dirty = set()  # rooms whose typing set changed since their last emit
+        self._last_emit = {}  # {game_id: monotonic time of last emit}
+        self._lock = threading.Lock()
+
+    def init_app(self, app, socketio):
+        """Read settings from the app config"""
+        self.socketio = socketio
+        self.emit_interval = app.config.get('TYPING_EMIT_INTERVAL', self.emit_interval)
+        self.timeout = app.config.get('TYPING_TIMEOUT', self.timeout)
+
+    def update(self, game_id, user, is_typing):
+        """Record a typing event; emits immediately if the room is outside its interval"""
+        metrics.incr('typing.received')
+        now = time.monotonic()
+        with self._lock:
+            users = self._typing.get(game_id, {})
+            was_typing = user in users
+            if is_typing:
+                users[user] = now + self.timeout
+                self._typing[game_id] = users
+            elif was_typing:
+                del users[user]
+                if not users:
+                    del self._typing[game_id]
+
+            if bool(is_typing) == was_typing:
+                # No state change, only the expiry was refreshed
+                metrics.incr('typing.debounced')
+                return
+
+            metrics.incr('typing.state_changes')
+            self._dirty.add(game_id)
+            due = now - self._last_emit.get(game_id, 0) >= self.emit_interval
+
+        if due:
+            self._flush_room(game_id)
+
+    def clear_user(self, game_id, user):
+        """Stop showing a user as typing (e.g. after they sent a message or left)"""
+        if user in self._typing.get(game_id, ()):
+            self.update(game_id, user, False)
+
+    def forget(self, game_id):
+        """Drop all typing state for a room"""
+        with self._lock:
+            self._typing.pop(game_id, None)
+            self._dirty.discard(game_id)
+            self._last_emit.pop(game_id, None)
+
+    def typing_users(self, game_id):
+        """Get the users currently typing in a room"""
+        return sorted(self._typing.get(game_id, ()))
+
+    def _expire(self, now):
+        """Remove typing entries whose timeout passed"""
+        with self._lock:
+            for game_id, users in list(self._typing.items()):
+                expired = [user for user, expires_at in users.items() if expires_at <= now]
+                for user in expired:
+                    del users[user]
+                if expired:
+                    metrics.incr('typing.expired', len(expired))
+                    self._dirty.add(game_id)
+                if not users:
+                    del self._typing[game_id]
+
+    def _flush_room(self, game_id):
+        with self._lock:
+            if game_id not in self._dirty:
+                return
+            self._dirty.discard(game_id)
+            self._last_emit[game_id] = time.monotonic()
+            typing_users = sorted(self._typing.get(game_id, ()))
+            if not typing_users:
+                self._last_emit.pop(game_id, None)
+
+        self.socketio.emit('typing_update', {
+            'game_id': game_id,
+            'typing_users': typing_users
+        }, room=f"game_{game_id}")
+        metrics.incr('typing.emitted')
+
+    def tick(self):
+        """Expire stale entries and emit rooms whose interval has elapsed"""
+        now = time.monotonic()
+        self._expire(now)
+        due = [
+            game_id for game_id in list(self._dirty)
+            if now - self._last_emit.get(game_id, 0) >= self.emit_interval
+        ]
+        for game_id in due:
+            self._flush_room(game_id)
+
+    def run(self):
+        """Background task driving `tick` every emit interval"""
+        while True:
+            self.socketio.sleep(self.emit_interval)
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Typing indicator tick failed: {e}")
+
+
+typing_indicators = TypingCoalescer()
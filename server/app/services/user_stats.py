@@ -0,0 +1,106 @@
+"""
+Incrementally maintained per-user statistics.
+
+`record_game_result` is called in the same transaction that finishes a
+game, so `user_stats` always agrees with the game table. Each player's row
+is written with one upsert whose update side is computed in SQL (no
+read-modify-write), so two games ending at once for the same player, even
+their first, cannot lose an update or collide on the primary key.
+"""
+from sqlalchemy import and_, case, func, update
+
+from app import db
+from app.models.user_stats import UserStats
+
+WIN = 'win'
+LOSS = 'loss'
+DRAW = 'draw'
+
+
+def game_outcomes(game):
+    """Get {username: outcome} for a finished game"""
+    if game.is_draw:
+        return {game.player_x: DRAW, game.player_o: DRAW}
+    if game.winner == 'X':
+        return {game.player_x: WIN, game.player_o: LOSS}
+    if game.winner == 'O':
+        return {game.player_x: LOSS, game.player_o: WIN}
+    return {}
+
+
+def _outcome_values(outcome):
+    streak = UserStats.current_streak
+    best = UserStats.best_win_streak
+    values = {UserStats.games_played: UserStats.games_played + 1}
+
+    if outcome == WIN:
+        new_streak = case((streak > 0, streak + 1), else_=1)
+        values[UserStats.wins] = UserStats.wins + 1
+        values[UserStats.current_streak] = new_streak
+        values[UserStats.best_win_streak] = case(
+            (and_(streak > 0, streak + 1 > best), streak + 1),
+            (and_(streak <= 0, best < 1), 1),
+            else_=best
+        )
+    elif outcome == LOSS:
+        values[UserStats.losses] = UserStats.losses + 1
+        values[UserStats.current_streak] = case((streak < 0, streak - 1), else_=-1)
+    else:
+        values[UserStats.draws] = UserStats.draws + 1
+        values[UserStats.current_streak] = 0
+    return values
+
+
+def _first_game_row(username, outcome):
+    """Stats row for a player whose first finished game this is"""
+    return {
+        'username': username,
+        'games_played': 1,
+        'wins': int(outcome == WIN),
+        'losses': int(outcome == LOSS),
+        'draws': int(outcome == DRAW),
+        'current_streak': 1 if outcome == WIN else -1 if outcome == LOSS else 0,
+        'best_win_streak': int(outcome == WIN)
+    }
+
+
+def record_game_result(game):
+    """Add a finished game to both players' stats (caller commits)"""
+    dialect = db.session.get_bind().dialect.name
+    for username, outcome in game_outcomes(game).items():
+        if not username:
+            continue
+        if dialect in ('postgresql', 'sqlite'):
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            # Column onupdate defaults do not apply to ON CONFLICT updates
+            values = _outcome_values(outcome)
+            values[UserStats.updated_at] = func.now()
+            db.session.execute(
+                insert(UserStats)
+                .values(_first_game_row(username, outcome))
+                .on_conflict_do_update(index_elements=[UserStats.username], set_=values)
+            )
+            continue
+
+        if db.session.get(UserStats, username) is None:
+            db.session.add(UserStats(username=username, games_played=0, wins=0, losses=0,
+                                     draws=0, current_streak=0, best_win_streak=0))
+            db.session.flush()
+        db.session.execute(
+            update(UserStats)
+            .where(UserStats.username == username)
+            .values(_outcome_values(outcome))
+            .execution_options(synchronize_session=False)
+        )
+
+
+def get_user_stats(username):
+    """Primary-key lookup of a user's stats"""
+    stats = db.session.get(UserStats, username, populate_existing=True)
+    if stats is None:
+        return UserStats(username=username, games_played=0, wins=0, losses=0,
+                         draws=0, current_streak=0, best_win_streak=0).to_dict()
+    return stats.to_dict()
@@ -0,0 +1,414 @@
+"""
+Socket.IO handlers for the asyncio server mode (python-socketio AsyncServer).
+
+These are an async adapter over the same services as app/sockets/handlers.py,
+with the same event names and payloads. Moves are checked, applied and
+ended by app/services/moves.py and room state lives in the shared room
+registry; what differs is I/O. Lobby, join and mid-game moves read and
+write natively on the event loop with an async database driver (a move is
+the same guarded `move_update` as the eventlet server's). Game-ending moves
+are stored by `moves.store_move` in a worker thread inside a Flask app
+context, so stats, positions and tournament results commit in the same
+transaction as the final move, as they do under eventlet; chat buffering,
+ratings and tournament scheduling run there too, off the event loop.
+
+Timed games run on the shared `game_clocks`: `run_clocks` advances the
+timing wheel on the event loop and an expired turn is forfeited through
+`moves.expire_clock` in a worker thread.
+"""
+import asyncio
+import logging
+from datetime import datetime
+
+import jwt
+from sqlalchemy import select, update
+
+from app import db
+from app.models.game import Game
+from app.services import moves
+from app.services.chat_history import chat_history
+from app.services.clocks import game_clocks
+from app.services.expirations import expirations
+from app.services.game_cache import game_cache
+from app.services.repositories import move_update
+from app.services.rooms import game_rooms
+from app.services.spectators import spectator_room
+from app.utils import metrics
+from app.utils.rate_limit import rate_limiter
+
+logger = logging.getLogger(__name__)
+
+game_table = Game.__table__
+
+
+def _game_from_row(row):
+    """Transient Game (never added to a session) so model rules and to_dict are reused"""
+    return Game(**dict(row._mapping))
+
+
+class AsyncGameHandlers:
+    """Registers the async event handlers and holds per-process connection state"""
+
+    def __init__(self, sio, engine, flask_app):
+        self.sio = sio
+        self.engine = engine
+        self.flask_app = flask_app
+        self.connections = {}  # {sid: username} (room state lives in app.services.rooms.game_rooms)
+        self._clock_tasks = set()  # running timeout forfeits
+
+    # Helpers
+
+    def _in_app_context(self, fn, *args):
+        with self.flask_app.app_context():
+            try:
+                return fn(*args)
+            except Exception:
+                db.session.rollback()
+                raise
+
+    async def run_sync(self, fn, *args):
+        """Run a synchronous service call in a worker thread with an app context"""
+        return await asyncio.to_thread(self._in_app_context, fn, *args)
+
+    async def _throttled(self, sid, event_class, event):
+        retry_after = rate_limiter.check(event_class, sid)
+        if not retry_after:
+            metrics.incr(f'rate_limit.{event_class}.allowed')
+            return False
+        metrics.incr(f'rate_limit.{event_class}.throttled')
+        await self.sio.emit('error', {
+            'message': 'Too many requests, please slow down',
+            'code': 'rate_limited',
+            'event': event,
+            'retry_after': round(retry_after, 3)
+        }, to=sid)
+        return True
+
+    async def _broadcast_game(self, game_id, event, payload):
+        """Players and spectators get the update immediately in this mode"""
+        await self.sio.emit(event, payload, room=f"game_{game_id}")
+        await self.sio.emit(event, payload, room=spectator_room(game_id))
+
+    async def _load_game(self, conn, game_id, for_update=False):
+        query = select(game_table).where(game_table.c.id == game_id)
+        if for_update:
+            query = query.with_for_update()
+        row = (await conn.execute(query)).first()
+        return _game_from_row(row) if row else None
+
+    async def _store_move(self, game, previous_move_count):
+        """Mid-game moves are one guarded UPDATE on the event loop; game-ending moves finish in a worker thread
+
+        Same result as `moves.store_move`: rating changes ({} mid-game), or None if another write came first.
+        """
+        if game.winner or game.is_draw:
+            return await self.run_sync(moves.store_move, game, previous_move_count)
+        async with self.engine.begin() as conn:
+            written = (await conn.execute(move_update(game, previous_move_count))).rowcount
+        if not written:
+            return None
+        game_cache.mark_changed(game.id)
+        return {}
+
+    async def _announce_game_over(self, game, rating_changes, reason=None):
+        """Tell the room and lobby a game ended (results and ratings are already committed), then advance tournaments"""
+        game_end_data = moves.game_over_payload(game, reason)
+        game_end_data['rating_changes'] = rating_changes
+        await self._broadcast_game(game.id, 'game_over', game_end_data)
+        await self.sio.emit('game_completed', {'game_id': game.id}, room='lobby')
+        await self.run_sync(moves.advance_tournament, game)
+
+    async def _announce_timeout(self, game, rating_changes):
+        """Broadcast a game just forfeited on time"""
+        await self._broadcast_game(game.id, 'game_state_update',
+                                   {'game': game.to_dict(), 'clock': game_clocks.snapshot(game)})
+        await self._announce_game_over(game, rating_changes, reason='timeout')
+
+    async def _expire_clock(self, game_id, side, move_count):
+        try:
+            forfeited = await self.run_sync(moves.expire_clock, game_id, side, move_count)
+            if forfeited is not None:
+                await self._announce_timeout(*forfeited)
+        except Exception as e:
+            logger.error(f"Failed to forfeit game {game_id} on time: {e}")
+
+    def _on_clock_expired(self, game_id, payload):
+        """Timing wheel callback (on the event loop): the side to move ran out of time"""
+        side, move_count = payload
+        task = asyncio.get_running_loop().create_task(self._expire_clock(game_id, side, move_count))
+        self._clock_tasks.add(task)
+        task.add_done_callback(self._clock_tasks.discard)
+
+    async def run_clocks(self):
+        """Background task: advance the timing wheel that expires timed games' turns"""
+        while True:
+            await asyncio.sleep(expirations.tick_interval)
+            try:
+                expirations.tick()
+            except Exception as e:
+                logger.error(f"Clock tick failed: {e}")
+
+    @staticmethod
+    def _forget_room(room):
+        """Drop per-room service state when an idle room is evicted"""
+        chat_history.forget(room.game_id)
+
+    # Event handlers
+
+    def register(self):
+        sio = self.sio
+        game_rooms.on_evict(self._forget_room)
+        expirations.on_expire('clock', self._on_clock_expired)
+
+        @sio.event
+        async def connect(sid, environ, auth):
+            token = (auth or {}).get('token')
+            if not token or token in ('null', 'undefined'):
+                return True
+            try:
+                claims = jwt.decode(token, self.flask_app.config['JWT_SECRET_KEY'],
+                                    algorithms=[self.flask_app.config.get('JWT_ALGORITHM', 'HS256')])
+            except jwt.InvalidTokenError:
+                return True
+            username = claims['sub']
+            self.connections[sid] = username
+            rate_limiter.bind_user(sid, username)
+            await sio.emit('connection_confirmed', {'username': username}, to=sid)
+            return True
+
+        @sio.event
+        async def disconnect(sid):
+            rate_limiter.forget_sid(sid)
+            username = self.connections.pop(sid, None)
+            if not username:
+                return
+            for room in game_rooms.values():
+                room.discard_from('spectators', username)
+                if username in room.players:
+                    await sio.emit('player_disconnected', {
+                        'player': username,
+                        'game_id': room.game_id,
+                        'message': f'{username} has disconnected'
+                    }, room=room.room_name)
+
+        @sio.event
+        async def join_lobby(sid, data=None):
+            if await self._throttled(sid, 'lobby', 'join_lobby'):
+                return
+            await sio.enter_room(sid, 'lobby')
+            try:
+                async with self.engine.connect() as conn:
+                    rows = (await conn.execute(
+                        select(game_table.c.id, game_table.c.player_x, game_table.c.created_at)
+                        .where(game_table.c.player_o.is_(None))
+                        .where(game_table.c.winner.is_(None))
+                        .where(game_table.c.is_draw == False)
+                    )).all()
+                games = [{
+                    'id': row.id,
+                    'host': row.player_x,
+                    'createdAt': row.created_at.isoformat() if row.created_at else None,
+                    'playerCount': 1
+                } for row in rows]
+            except Exception as e:
+                logger.error(f"Failed to load lobby: {e}")
+                games = []
+            await sio.emit('lobby_games_update', {'games': games}, to=sid)
+
+        @sio.event
+        async def leave_lobby(sid, data=None):
+            await sio.leave_room(sid, 'lobby')
+
+        @sio.event
+        async def join_room(sid, data):
+            try:
+                game_id = int(data['room'])
+                player = (data.get('player') or '').strip()
+            except (KeyError, TypeError, ValueError):
+                await sio.emit('error', {'message': 'Failed to join room'}, to=sid)
+                return
+            if not player:
+                await sio.emit('error', {'message': 'Player name is required'}, to=sid)
+                return
+            room_name = f"game_{game_id}"
+
+            try:
+                async with self.engine.begin() as conn:
+                    game = await self._load_game(conn, game_id)
+                    if game is None:
+                        await sio.emit('error', {'message': f'Game {game_id} not found'}, to=sid)
+                        return
+
+                    joined_as_o = False
+                    if game.player_x == player:
+                        player_role = 'X'
+                    elif game.player_o == player:
+                        player_role = 'O'
+                    elif not game.player_o:
+                        # Claim the O seat atomically; a concurrent joiner loses the race
+                        result = await conn.execute(
+                            update(game_table)
+                            .where(game_table.c.id == game_id)
+                            .where(game_table.c.player_o.is_(None))
+                            .values(player_o=player)
+                        )
+                        joined_as_o = result.rowcount == 1
+                        if joined_as_o:
+                            game.player_o = player
+                        player_role = 'O' if joined_as_o else 'spectator'
+                    else:
+                        player_role = 'spectator'
+            except Exception as e:
+                logger.error(f"Failed to join game {game_id}: {e}")
+                await sio.emit('error', {'message': 'Failed to join room'}, to=sid)
+                return
+            if joined_as_o:
+                game_cache.mark_changed(game_id)
+
+            room = game_rooms.ensure(game_id)
+            if player_role == 'spectator':
+                await sio.enter_room(sid, spectator_room(game_id))
+                room.add_to('spectators', player)
+                payload = {'game_id': game_id, 'spectator_count': room.count('spectators')}
+                await sio.emit('spectator_count', payload, room=room_name)
+            else:
+                await sio.enter_room(sid, room_name)
+                room.add_player(player)
+                # Timed games start (or, after a restart, resume) the clock once a player is seated
+                game_clocks.start(game)
+
+            game_data = game.to_dict()
+            if joined_as_o:
+                await sio.emit('game_started', {
+                    'game_id': game_id,
+                    'players': [game.player_x, game.player_o]
+                }, room='lobby')
+                await sio.emit('player_count_updated', {'game_id': game_id, 'playerCount': 2}, room='lobby')
+                await sio.emit('game_ready', {
+                    'message': 'Game is ready! Both players have joined.',
+                    'game': game_data,
+                    'both_players_joined': True
+                }, room=room_name)
+
+            game_state = {
+                'game': game_data,
+                'clock': game_clocks.snapshot(game),
+                'room_info': room.info(),
+                'player_role': player_role,
+                'is_your_turn': player_role != 'spectator' and game.current_turn == player_role
+            }
+            if player_role == 'spectator':
+                await sio.emit('game_state_update', game_state, to=sid)
+            else:
+                await sio.emit('game_state_update', game_state, room=room_name)
+                await sio.emit('player_joined', {
+                    'player': player,
+                    'is_player': True,
+                    'role': player_role,
+                    'game_ready': game.player_o is not None,
+                    'message': f"{player} joined as {player_role.upper()}"
+                }, room=room_name)
+
+            try:
+                messages, has_more = await self.run_sync(
+                    chat_history.page, game_id, None, self.flask_app.config['CHAT_HISTORY_SIZE'])
+                await sio.emit('chat_history', {
+                    'game_id': game_id,
+                    'messages': messages,
+                    'has_more': has_more
+                }, to=sid)
+            except Exception as e:
+                logger.error(f"Failed to load chat history for game {game_id}: {e}")
+
+        @sio.event
+        async def make_move(sid, data):
+            if await self._throttled(sid, 'move', 'make_move'):
+                return
+            try:
+                game_id = int(data['room'])
+                index = int(data['index'])
+                player = data['player']
+            except (KeyError, TypeError, ValueError):
+                await sio.emit('error', {'message': 'Invalid move data'}, to=sid)
+                return
+
+            try:
+                async with self.engine.connect() as conn:
+                    game = await self._load_game(conn, game_id)
+                if game is None:
+                    await sio.emit('error', {'message': 'Game not found'}, to=sid)
+                    return
+                error = moves.move_error(game, player, index)
+                if error:
+                    await sio.emit('error', {'message': error}, to=sid)
+                    return
+
+                # A move that arrives after the clock ran out loses on time, even if the timer has not fired yet
+                if moves.time_expired(game):
+                    rating_changes = await self.run_sync(moves.forfeit_on_time, game, game.current_turn)
+                    if rating_changes is not None:
+                        await self._announce_timeout(game, rating_changes)
+                    await sio.emit('error', {'message': 'Invalid move: Time expired'}, to=sid)
+                    return
+
+                previous_move_count = game.move_count or 0
+                symbol = moves.apply_move(game, index)
+                rating_changes = await self._store_move(game, previous_move_count)
+            except Exception as e:
+                logger.error(f"Failed to make move in game {game_id}: {e}")
+                await sio.emit('error', {'message': 'Failed to make move'}, to=sid)
+                return
+            if rating_changes is None:
+                await sio.emit('error', {'message': 'Invalid move: Game changed, please reload'}, to=sid)
+                return
+
+            game_rooms.touch(game_id)
+            game_clocks.start(game)
+            metrics.incr('async.moves')
+            last_move = {
+                'index': index,
+                'symbol': symbol,
+                'player': player,
+                'timestamp': datetime.utcnow().isoformat()
+            }
+            await self._broadcast_game(game_id, 'game_state_update', {
+                'game': game.to_dict(),
+                'clock': game_clocks.snapshot(game),
+                'last_move': last_move
+            })
+            await self._broadcast_game(game_id, 'move_made', last_move)
+
+            if game.winner or game.is_draw:
+                await self._announce_game_over(game, rating_changes)
+
+        @sio.event
+        async def send_message(sid, data):
+            if await self._throttled(sid, 'chat', 'send_message'):
+                return
+            try:
+                message = await self.run_sync(chat_history.record, int(data['room']), data['sender'], data['text'])
+            except Exception as e:
+                logger.error(f"Failed to record chat message: {e}")
+                await sio.emit('error', {'message': 'Failed to send message'}, to=sid)
+                return
+            game_rooms.touch(message['game_id'])
+            await self._broadcast_game(message['game_id'], 'receive_message', message)
+
+        @sio.event
+        async def leave_room(sid, data):
+            try:
+                game_id = int(data['room'])
+            except (KeyError, TypeError, ValueError):
+                return
+            player = data.get('player', 'Unknown')
+            room_name = f"game_{game_id}"
+            await sio.leave_room(sid, room_name)
+            await sio.leave_room(sid, spectator_room(game_id))
+            room = game_rooms.get(game_id)
+            if room:
+                room.discard_player(player)
+                room.discard_from('spectators', player)
+            await sio.emit('player_left', {
+                'player': player,
+                'timestamp': datetime.utcnow().isoformat()
+            }, room=room_name)
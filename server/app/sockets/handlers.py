@@ -1,17 +1,245 @@
 from flask_socketio import emit, join_room, leave_room
-from flask import request
+from flask import request, current_app
 from flask_jwt_extended import decode_token
 from jwt.exceptions import DecodeError, InvalidTokenError
 from app.models.game import Game
-from app.services.game_logic import check_winner, is_draw
+from app.services.game_cache import game_cache
+from app.services.group_commit import GroupCommitTimeout
+from app.services.chat_history import chat_history
+from app.services.clocks import game_clocks
+from app.services.expirations import expirations
+from app.services.rooms import game_rooms
+from app.services.repositories import repositories
+from app.services.ratings import leaderboard
+from app.services.matchmaking import matchmaker
+from app.services import moves
+from app.services.tournaments import tournament_room, tournaments
+from app.services.typing_indicators import typing_indicators
+from app.services.spectators import spectator_fanout, spectator_room
+from app.services.sharding import owned_game, shard_router
 from app import db, socketio
+from app.utils.logging_config import SampledLogger
+from app.utils import metrics
+from app.utils.rate_limit import rate_limited, rate_limiter
 from datetime import datetime
+import logging
 
-# Store active connections and game rooms
+logger = logging.getLogger(__name__)
+move_log = SampledLogger(logger)
+
+# Store active connections (room state lives in app.services.rooms.game_rooms)
 active_connections = {}  # {username: socket_id}
-game_rooms = {}  # {game_id: {players: set(), spectators: set(), room_name: str}}
+
+
+def _broadcast_game(game_id, event, payload):
+    """Emit to the players' room now and queue a throttled copy for spectators"""
+    socketio.emit(event, payload, room=f"game_{game_id}")
+    spectator_fanout.publish(int(game_id), event, payload)
+
+
+def _release_unowned_rooms():
+    """After a shard rebalance, hand off games this worker no longer owns"""
+    for game_id in game_rooms:
+        if shard_router.owns(game_id):
+            continue
+        payload = shard_router.redirect_payload(game_id)
+        socketio.emit('shard_redirect', payload, room=f"game_{game_id}")
+        socketio.emit('shard_redirect', payload, room=spectator_room(game_id))
+        game_rooms.pop(game_id)
+        chat_history.forget(int(game_id))
+        typing_indicators.forget(int(game_id))
+        spectator_fanout.forget(int(game_id))
+
+
+def _hand_off_matchmaking():
+    """After a shard rebalance, send waiting quick-play players to the worker now holding the queue"""
+    if shard_router.owns_matchmaking():
+        return
+    payload = shard_router.matchmaking_redirect_payload()
+    for entry in matchmaker.drain():
+        metrics.incr('sharding.redirected')
+        socketio.emit('shard_redirect', payload, room=entry.sid)
+
+
+def _start_quick_play_match(first, second):
+    """Create the game for a matched pair and put both players in its room
+
+    When sharding puts the new game on another worker, the players are sent
+    there instead (`shard_redirect` in `match_found`, plus the usual
+    `shard_redirect` event); the owner seats them and starts the clock when
+    they join.
+    """
+    try:
+        game = repositories.games.create(player_x=first.username, player_o=second.username,
+                                         **game_clocks.time_control())
+    except Exception:
+        for entry in (first, second):
+            socketio.emit('error', {'message': 'Failed to start quick play game'}, room=entry.sid)
+        raise
+
+    redirect = None
+    if shard_router.owns(game.id):
+        game_clocks.start(game)
+        room_name = game_rooms.replace(game.id, (first.username, second.username)).room_name
+    else:
+        metrics.incr('sharding.redirected')
+        redirect = shard_router.redirect_payload(game.id)
+    game_data = game.to_dict()
+    clock = game_clocks.snapshot(game)
+    for entry, role, opponent in ((first, 'X', second), (second, 'O', first)):
+        if redirect is None:
+            socketio.server.enter_room(entry.sid, room_name, namespace='/')
+        socketio.emit('match_found', {
+            'game': game_data,
+            'player_role': role,
+            'opponent': opponent.username,
+            'opponent_rating': opponent.rating,
+            'is_your_turn': role == 'X',
+            'clock': clock,
+            'shard_redirect': redirect
+        }, room=entry.sid)
+        if redirect is not None:
+            socketio.emit('shard_redirect', redirect, room=entry.sid)
+
+
+def _start_tournament_round(tournament, matches):
+    """Put connected players in their new tournament games' rooms and start timed games' clocks
+
+    Games another shard owns are only announced, with a `shard_redirect`;
+    their owner seats the players and starts the clock when they join.
+    """
+    game_ids = [match['game_id'] for match in matches if match['game_id'] is not None]
+    owned = {game_id for game_id in game_ids if shard_router.owns(game_id)}
+    if owned and (game_clocks.default_total or game_clocks.default_per_move):
+        for game in repositories.games.get_many(owned):
+            game_clocks.start(game)
+
+    for match in matches:
+        game_id = match['game_id']
+        if game_id is None:
+            continue
+        redirect = None
+        if game_id in owned:
+            room_name = game_rooms.replace(game_id, (match['player_x'], match['player_o'])).room_name
+        else:
+            redirect = shard_router.redirect_payload(game_id)
+        for role, player, opponent in (('X', match['player_x'], match['player_o']),
+                                       ('O', match['player_o'], match['player_x'])):
+            sid = active_connections.get(player)
+            if not sid:
+                continue
+            if redirect is None:
+                socketio.server.enter_room(sid, room_name, namespace='/')
+            socketio.emit('tournament_match', {
+                'tournament_id': tournament.id,
+                'round': match['round'],
+                'game_id': game_id,
+                'player_role': role,
+                'opponent': opponent,
+                'is_your_turn': role == 'X',
+                'shard_redirect': redirect
+            }, room=sid)
+
+
+def _expire_play_again_invite(key, payload):
+    """An invite went unanswered for PLAY_AGAIN_INVITE_TTL: tell both players"""
+    game_id, invite_key = key
+    room = game_rooms.get(game_id)
+    invite = room.pop_invite(invite_key) if room else None
+    if invite is None:
+        return
+    cancelled = {'gameId': game_id, 'inviter': invite['inviter'], 'reason': 'expired'}
+    for player in (invite['inviter'], invite['invitee']):
+        sid = active_connections.get(player)
+        if sid:
+            socketio.emit('play_again_cancelled', cancelled, room=sid)
+
+
+def _expire_rematch_request(key, payload):
+    """A rematch request went unanswered for REMATCH_REQUEST_TTL"""
+    game_id, player = key
+    room = game_rooms.get(game_id)
+    if not room or not room.has('rematch_requests', player):
+        return
+    room.discard_from('rematch_requests', player)
+    socketio.emit('rematch_expired', {
+        'requesting_player': player,
+        'game_id': game_id
+    }, room=f"game_{game_id}")
+
+
+def _expire_presence(key, payload):
+    """A disconnected player did not resume within PRESENCE_TTL: drop them from the room"""
+    game_id, username = key
+    room = game_rooms.get(game_id)
+    if not room or not room.has('disconnected', username):
+        return
+    room.discard_from('disconnected', username)
+    if username in active_connections:
+        return  # Reconnected without resuming
+    room.discard_player(username)
+    socketio.emit('player_left', {
+        'player': username,
+        'game_id': game_id,
+        'reason': 'timeout',
+        'timestamp': datetime.utcnow().isoformat()
+    }, room=room.room_name)
+
+
+def _sid_username(sid):
+    """Authenticated username for a socket id, or None"""
+    return next((user for user, user_sid in active_connections.items() if user_sid == sid), None)
+
+
+def _expire_clock(game_id, payload):
+    """The side to move in a timed game ran out of time: it forfeits"""
+    side, move_count = payload
+    forfeited = moves.expire_clock(game_id, side, move_count)
+    if forfeited is not None:
+        _announce_timeout(*forfeited)
+
+
+def _announce_timeout(game, rating_changes):
+    """Broadcast a game just forfeited on time"""
+    _broadcast_game(game.id, 'game_state_update', {'game': game.to_dict(), 'clock': game_clocks.snapshot(game)})
+    _announce_game_over(game, rating_changes, reason='timeout')
+
+
+def _announce_game_over(game, rating_changes, reason=None):
+    """Tell the room and lobby a game ended (results and ratings are already committed), then advance tournaments"""
+    game_end_data = moves.game_over_payload(game, reason)
+    game_end_data['rating_changes'] = rating_changes
+
+    _broadcast_game(game.id, 'game_over', game_end_data)
+
+    # Update lobby
+    socketio.emit('game_completed', {'game_id': game.id}, room='lobby')
+
+    # The result itself committed with the game; this announces it and schedules the next round
+    moves.advance_tournament(game)
+
+
+def _room_info(game_id):
+    """Room summary with a spectator count rather than the full list"""
+    return game_rooms.ensure(game_id).info()
+
+
+def _forget_room(room):
+    """Drop per-room service state when an idle room is evicted"""
+    chat_history.forget(room.game_id)
+    typing_indicators.forget(room.game_id)
+    spectator_fanout.forget(room.game_id)
 
 def register_socket_handlers(socketio):
+    shard_router.on_rebalance(_release_unowned_rooms)
+    shard_router.on_rebalance(_hand_off_matchmaking)
+    matchmaker.on_match(_start_quick_play_match)
+    tournaments.on_round(_start_tournament_round)
+    expirations.on_expire('play_again_invite', _expire_play_again_invite)
+    expirations.on_expire('rematch_request', _expire_rematch_request)
+    expirations.on_expire('presence', _expire_presence)
+    expirations.on_expire('clock', _expire_clock)
+    game_rooms.on_evict(_forget_room)
     
     @socketio.on('connect')
     def on_connect(auth):
@@ -23,6 +251,7 @@ def register_socket_handlers(socketio):
                     decoded_token = decode_token(token)
                     username = decoded_token['sub']
                     active_connections[username] = request.sid
+                    rate_limiter.bind_user(request.sid, username)
 
                     emit('connection_confirmed', {'username': username})
                     return True
@@ -33,8 +262,11 @@ def register_socket_handlers(socketio):
             return True
         except Exception as e:
 
-            return True    @socketio.on('disconnect')
+            return True
+
+    @socketio.on('disconnect')
     def on_disconnect():
+        rate_limiter.forget_sid(request.sid)
         username = None
         for user, sid in list(active_connections.items()):
             if sid == request.sid:
@@ -43,45 +275,48 @@ def register_socket_handlers(socketio):
         
         if username:
             del active_connections[username]
+            matchmaker.cancel(username)
 
             # Cancel any pending play again invitations
             try:
-                for game_id, room_data in game_rooms.items():
-                    if 'play_again_invites' in room_data:
-                        invites_to_remove = []
-                        for invite_key, invite_data in room_data['play_again_invites'].items():
-                            if invite_data['inviter'] == username or invite_data['invitee'] == username:
-                                invites_to_remove.append(invite_key)
-                                
-                                # Notify the other player
-                                other_player = invite_data['invitee'] if invite_data['inviter'] == username else invite_data['inviter']
-                                if other_player in active_connections:
-                                    emit('play_again_cancelled', {
-                                        'gameId': game_id,
-                                        'inviter': invite_data['inviter'],
-                                        'reason': 'player_disconnected'
-                                    }, room=active_connections[other_player])
-                        
-                        # Remove the invitations
-                        for invite_key in invites_to_remove:
-                            del room_data['play_again_invites'][invite_key]
+                for room in game_rooms.values():
+                    for invite_key, invite_data in room.invite_items():
+                        if invite_data['inviter'] == username or invite_data['invitee'] == username:
+                            room.pop_invite(invite_key)
+                            expirations.cancel('play_again_invite', (room.game_id, invite_key))
+
+                            # Notify the other player
+                            other_player = invite_data['invitee'] if invite_data['inviter'] == username else invite_data['inviter']
+                            if other_player in active_connections:
+                                emit('play_again_cancelled', {
+                                    'gameId': room.game_id,
+                                    'inviter': invite_data['inviter'],
+                                    'reason': 'player_disconnected'
+                                }, room=active_connections[other_player])
             except Exception as e:
                 pass  # Handle exception gracefully
 
+            # Remove the user from any spectator sets
+            for room in game_rooms.values():
+                if room.has('spectators', username):
+                    room.discard_from('spectators', username)
+                    spectator_fanout.set_count(room.game_id, room.count('spectators'))
+
             # Notify games where this user was playing
             try:
-                games = Game.query.filter(
-                    (Game.player_x == username) | (Game.player_o == username),
-                    Game.winner.is_(None),
-                    Game.is_draw == False
-                ).all()
-                
+                games = repositories.games.unfinished_for(username)
+
                 for game in games:
                     room_name = f"game_{game.id}"
-                    # Clean up rematch requests for disconnected player
-                    if game.id in game_rooms and 'rematch_requests' in game_rooms[game.id]:
-                        game_rooms[game.id]['rematch_requests'].discard(username)
-                    
+                    room = game_rooms.get(game.id)
+                    if room:
+                        # Clean up rematch requests for disconnected player
+                        room.discard_from('rematch_requests', username)
+                        expirations.cancel('rematch_request', (game.id, username))
+                        # Remembered so a resume can tell the room the player is back, until PRESENCE_TTL
+                        room.add_to('disconnected', username)
+                        expirations.schedule('presence', (game.id, username), current_app.config['PRESENCE_TTL'])
+
                     emit('player_disconnected', {
                         'player': username,
                         'game_id': game.id,
@@ -94,13 +329,11 @@ def register_socket_handlers(socketio):
                 pass  # No additional action needed
 
     @socketio.on('join_lobby')
+    @rate_limited('lobby')
     def on_join_lobby():
         join_room('lobby')        # Send current active games
         try:
-            active_games = Game.query.filter(
-                Game.player_o.is_(None),
-                Game.winner.is_(None),
-                Game.is_draw == False            ).all()
+            active_games = repositories.games.waiting()
             
             games_data = []
             for game in active_games:
@@ -114,10 +347,72 @@ def register_socket_handlers(socketio):
         except Exception as e:
             emit('lobby_games_update', {'games': []})
     
+    @socketio.on('quick_play')
+    @rate_limited('lobby')
+    def on_quick_play(data):
+        """
+        Join the matchmaking queue instead of polling the lobby.
+        
+        Players are paired by rating band (widening with wait time); both
+        receive `match_found` once the game has been created. With sharding
+        the queue lives on one worker; other workers answer `shard_redirect`.
+        
+        Args:
+            data (dict): {'player': username}
+        """
+        player = (data or {}).get('player', '').strip()
+        if not player or active_connections.get(player) != request.sid:
+            emit('error', {'message': 'Quick play requires an authenticated connection'})
+            return
+        if not shard_router.owns_matchmaking():
+            metrics.incr('sharding.redirected')
+            emit('shard_redirect', shard_router.matchmaking_redirect_payload())
+            return
+
+        try:
+            rating = leaderboard.rating(player)
+            if matchmaker.enqueue(player, request.sid, rating) is None:
+                emit('quick_play_queued', {
+                    'player': player,
+                    'rating': rating,
+                    'queue_size': len(matchmaker)
+                })
+        except Exception as e:
+            logger.error(f"Quick play failed for {player}: {e}")
+            matchmaker.cancel(player)
+            emit('error', {'message': 'Failed to join quick play'})
+
+    @socketio.on('cancel_quick_play')
+    def on_cancel_quick_play(data):
+        player = (data or {}).get('player', '').strip()
+        if active_connections.get(player) == request.sid and matchmaker.cancel(player):
+            emit('quick_play_cancelled', {'player': player})
+
+    @socketio.on('watch_tournament')
+    @rate_limited('lobby')
+    def on_watch_tournament(data):
+        """Subscribe to a tournament's round updates and get its current state"""
+        try:
+            tournament_id = int(data['tournament_id'])
+            state = tournaments.state(tournament_id)
+        except Exception as e:
+            emit('error', {'message': f'Failed to watch tournament: {e}'})
+            return
+        join_room(tournament_room(tournament_id))
+        emit('tournament_state', state)
+
+    @socketio.on('unwatch_tournament')
+    def on_unwatch_tournament(data):
+        try:
+            leave_room(tournament_room(int(data['tournament_id'])))
+        except (KeyError, TypeError, ValueError):
+            emit('error', {'message': 'tournament_id is required'})
+
     @socketio.on('leave_lobby')
     def on_leave_lobby():        leave_room('lobby')
     
     @socketio.on('join_room')
+    @owned_game
     def on_join_room(data):
         try:
             game_id = data['room']
@@ -128,22 +423,18 @@ def register_socket_handlers(socketio):
                 return
                 
             room_name = f"game_{game_id}"
-            join_room(room_name)
         except Exception as e:
             emit('error', {'message': 'Failed to join room'})
             return
-          # Initialize game room tracking
-        if game_id not in game_rooms:
-            game_rooms[game_id] = {
-                'players': set(), 
-                'spectators': set(),                'room_name': room_name
-            }
-        
+
         try:
-            game = Game.query.get(game_id)
+            game = repositories.games.get(game_id)
             if not game:
                 emit('error', {'message': f'Game {game_id} not found'})
                 return
+
+            # Initialize game room tracking
+            room = game_rooms.ensure(game.id)
             
             is_player = False
             player_role = 'spectator'
@@ -152,33 +443,33 @@ def register_socket_handlers(socketio):
             # Player assignment logic
             if game.player_x == player:
                 # Player X rejoining
-                game_rooms[game_id]['players'].add(player)
+                join_room(room_name)
+                room.add_player(player)
                 is_player = True
                 player_role = 'X'
 
             elif game.player_o == player:
                 # Player O rejoining
-                game_rooms[game_id]['players'].add(player)
+                join_room(room_name)
+                room.add_player(player)
                 is_player = True
                 player_role = 'O'
 
             elif not game.player_o and game.player_x != player:
                 # New player joining as O
+                join_room(room_name)
                 game.player_o = player
-                game_rooms[game_id]['players'].add(player)
+                room.add_player(player)
                 is_player = True
                 player_role = 'O'
                 
                 try:
-                    db.session.commit()
+                    repositories.games.save(game)
 
                     # Send updated game state immediately to all players
                     updated_game_state = {
                         'game': game.to_dict(),
-                        'room_info': {
-                            'players': list(game_rooms[game_id]['players']),
-                            'spectators': list(game_rooms[game_id]['spectators'])
-                        },
+                        'room_info': room.info(),
                         'player_o_joined': True,
                         'both_players_present': True
                     }
@@ -196,7 +487,7 @@ def register_socket_handlers(socketio):
                     }, room='lobby')
                     
                     # Send game state update to all players first
-                    emit('game_state_update', updated_game_state, room=room_name)
+                    _broadcast_game(game.id, 'game_state_update', updated_game_state)
                       # Then notify all players in the game that it's ready to start
                     emit('game_ready', {
                         'message': 'Game is ready! Both players have joined.',
@@ -204,22 +495,26 @@ def register_socket_handlers(socketio):
                         'both_players_joined': True                    }, room=room_name)
                     
                 except Exception as e:
-                    db.session.rollback()
+                    repositories.games.discard()
                     emit('error', {'message': 'Failed to join game'})
                     return
                     
             else:
-                # Join as spectator
-                game_rooms[game_id]['spectators'].add(player)
+                # Join as spectator: separate room with throttled updates, no join broadcast
+                join_room(spectator_room(game.id))
+                room.add_to('spectators', player)
+                spectator_fanout.set_count(game.id, room.count('spectators'))
                 player_role = 'spectator'
 
+            # Timed games start (or, after a restart, resume) the clock once a player is seated
+            if is_player:
+                game_clocks.start(game)
+
             # Send comprehensive game state with clear role information
             game_state = {
                 'game': game.to_dict(),
-                'room_info': {
-                    'players': list(game_rooms[game_id]['players']),
-                    'spectators': list(game_rooms[game_id]['spectators'])
-                },
+                'clock': game_clocks.snapshot(game),
+                'room_info': room.info(),
                 'player_role': player_role,
                 'is_your_turn': (
                     (player_role == 'X' and game.current_turn == 'X') or
@@ -227,17 +522,31 @@ def register_socket_handlers(socketio):
                 ) if player_role != 'spectator' else False
             }
             
-            # Send game state to all players in the room
-            emit('game_state_update', game_state, room=room_name)
-            
-            # Notify about player joining with clear role information
-            emit('player_joined', {
-                'player': player,
-                'is_player': is_player,
-                'role': player_role,
-                'game_ready': game.player_o is not None,
-                'message': f"{player} joined as {player_role.upper() if player_role != 'spectator' else 'spectator'}"
-            }, room=room_name)            # If this was player O joining, send a special broadcast to ensure UI updates
+            if is_player:
+                # Send game state to all players in the room
+                emit('game_state_update', game_state, room=room_name)
+                
+                # Notify about player joining with clear role information
+                emit('player_joined', {
+                    'player': player,
+                    'is_player': is_player,
+                    'role': player_role,
+                    'game_ready': game.player_o is not None,
+                    'message': f"{player} joined as {player_role.upper()}"
+                }, room=room_name)
+            else:
+                # Spectators only get their own snapshot; the room sees a coalesced count
+                emit('game_state_update', game_state)
+
+            # Replay recent chat to the joining client from the in-memory buffer
+            messages, has_more = chat_history.page(game.id, limit=current_app.config['CHAT_HISTORY_SIZE'])
+            emit('chat_history', {
+                'game_id': game.id,
+                'messages': messages,
+                'has_more': has_more
+            })
+
+            # If this was player O joining, send a special broadcast to ensure UI updates
             if player_role == 'O' and was_waiting:
                 emit('game_state_update', {
                     'game': game.to_dict(),
@@ -246,7 +555,98 @@ def register_socket_handlers(socketio):
                 }, room=room_name)
                 
         except Exception as e:
-            emit('error', {'message': 'Failed to join room'})    @socketio.on('make_move')
+            emit('error', {'message': 'Failed to join room'})
+
+    @socketio.on('resume_game')
+    @owned_game
+    def on_resume_game(data):
+        """
+        Restore a reconnecting client's place in a game from cached state.
+        
+        Unlike join_room this never writes to the database, sends one snapshot
+        to the caller only, and only tells the room when the player had been
+        announced as disconnected.
+        
+        Args:
+            data (dict): {
+                'room': game_id,
+                'version': `version` from the last game_resumed the client saw (optional),
+                'last_message_id': newest chat message the client has (optional)
+            }
+        """
+        username = _sid_username(request.sid)
+        if not username:
+            emit('error', {'message': 'Authentication required to resume'})
+            return
+        try:
+            game_id = int(data['room'])
+        except (KeyError, TypeError, ValueError):
+            emit('error', {'message': 'Game id is required'})
+            return
+
+        entry = game_cache.fetch(game_id)
+        if entry is None:
+            emit('error', {'message': f'Game {game_id} not found'})
+            return
+        version, game = entry
+
+        room = game_rooms.ensure(game_id)
+        if username == game['player_x']:
+            player_role = 'X'
+        elif username == game['player_o']:
+            player_role = 'O'
+        else:
+            player_role = 'spectator'
+
+        if player_role == 'spectator':
+            join_room(spectator_room(game_id))
+            if not room.has('spectators', username):
+                room.add_to('spectators', username)
+                spectator_fanout.set_count(game_id, room.count('spectators'))
+        else:
+            join_room(room.room_name)
+            room.add_player(username)
+            if room.has('disconnected', username):
+                room.discard_from('disconnected', username)
+                expirations.cancel('presence', (game_id, username))
+                emit('player_reconnected', {
+                    'player': username,
+                    'game_id': game_id,
+                    'role': player_role
+                }, room=room.room_name, include_self=False)
+        metrics.incr('resume.requests')
+
+        # Versions are per-process counters; the epoch in the tag keeps a number
+        # from before a restart or shard handoff from matching a different state
+        tag = game_cache.etag('game', game_id, version)
+        snapshot = {
+            'game_id': game_id,
+            'version': tag,
+            'player_role': player_role,
+            'room_info': room.info(),
+            'clock': None
+        }
+        if game['time_total'] or game['time_per_move']:
+            # Remaining totals are not in the cached snapshot
+            timed_game = repositories.games.get(game_id)
+            snapshot['clock'] = game_clocks.snapshot(timed_game) if timed_game else None
+        if data.get('version') == tag:
+            snapshot['unchanged'] = True
+            metrics.incr('resume.unchanged')
+        else:
+            snapshot['game'] = game
+            snapshot['is_your_turn'] = player_role == game['current_turn'] and not (
+                game['winner'] or game['is_draw'])
+
+        last_message_id = data.get('last_message_id')
+        if last_message_id is not None:
+            messages, _ = chat_history.page(game_id, limit=current_app.config['CHAT_HISTORY_SIZE'])
+            snapshot['missed_messages'] = [m for m in messages if m['message_id'] > last_message_id]
+        emit('game_resumed', snapshot)
+
+    @socketio.on('make_move')
+    @rate_limited('move')
+    @owned_game
     def on_make_move(data):
         game_id = data['room']
         index = data['index']
@@ -257,61 +657,42 @@ def register_socket_handlers(socketio):
             return
 
         try:
-            game = Game.query.get(game_id)
+            game = repositories.games.get(game_id)
             if not game:
                 emit('error', {'message': 'Game not found'})
                 return
             
             # Validate move
-            if not game.can_make_move(player):
-                reasons = []
-                if game.winner:
-                    reasons.append("Game already won")
-                elif game.is_draw:
-                    reasons.append("Game is a draw")
-                elif not game.player_o:
-                    reasons.append("Waiting for second player")
-                elif not game.is_player_turn(player):
-                    reasons.append("Not your turn")
-                
-                emit('error', {'message': f'Invalid move: {", ".join(reasons)}'})
+            error = moves.move_error(game, player, index)
+            if error:
+                emit('error', {'message': error})
                 return
             
-            board = game.board_data
-            if index < 0 or index > 8 or board[index] != "":
-                emit('error', {'message': 'Position already taken or invalid'})
+            # A move that arrives after the clock ran out loses on time, even if the timer has not fired yet
+            if moves.time_expired(game):
+                rating_changes = moves.forfeit_on_time(game, game.current_turn)
+                if rating_changes is not None:
+                    _announce_timeout(game, rating_changes)
+                emit('error', {'message': 'Invalid move: Time expired'})
                 return
-            
+
             # Make the move
-            symbol = game.current_turn
-            board[index] = symbol
-            game.board_data = board
-              # Check for winner or draw
-            result = check_winner(board)
-            winner = result['winner']
-            winning_line = result['winning_line']
-            
-            print(f"🏆 Server Debug - Game {game_id}:")
-            print(f"  - Winner: {winner}")
-            print(f"  - Winning line: {winning_line}")
-            
-            if winner:
-                game.winner = winner
-                game.winning_line_data = winning_line
-                print(f"  - Set game.winning_line_data: {game.winning_line_data}")
-
-            elif is_draw(board):
-                game.is_draw = True
+            previous_move_count = game.move_count or 0
+            symbol = moves.apply_move(game, index)
+            move_log.debug("Move game=%s index=%s symbol=%s winner=%s winning_line=%s",
+                           game_id, index, symbol, game.winner, game.winning_line_data)
 
-            else:
-                # Switch turns
-                game.current_turn = 'O' if game.current_turn == 'X' else 'X'
-            
-            db.session.commit()
+            rating_changes = moves.store_move(game, previous_move_count)
+            if rating_changes is None:
+                emit('error', {'message': 'Invalid move: Game changed, please reload'})
+                return
+            game_rooms.touch(game_id)
+            game_clocks.start(game)
             
             # Prepare move data
             move_data = {
                 'game': game.to_dict(),
+                'clock': game_clocks.snapshot(game),
                 'last_move': {
                     'index': index,
                     'symbol': symbol,
@@ -320,57 +701,87 @@ def register_socket_handlers(socketio):
                 }
             }
             
-            print(f"  - Move data game.winning_line: {move_data['game'].get('winning_line')}")
-            
-            room_name = f"game_{game_id}"
-            
-            # Emit to all players in the game
-            emit('game_state_update', move_data, room=room_name)
-            emit('move_made', move_data['last_move'], room=room_name)
+            # Emit to all players in the game (spectators get a throttled copy)
+            _broadcast_game(game_id, 'game_state_update', move_data)
+            _broadcast_game(game_id, 'move_made', move_data['last_move'])
             
             # Handle game end
             if game.winner or game.is_draw:
-                game_end_data = {
-                    'winner': game.winner,
-                    'is_draw': game.is_draw,
-                    'final_board': game.board_data,
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'winner_name': game.player_x if game.winner == 'X' else game.player_o if game.winner == 'O' else None
-                }
-                
-                emit('game_over', game_end_data, room=room_name)
-                
-                # Update lobby
-                emit('game_completed', {'game_id': game.id}, room='lobby')
+                _announce_game_over(game, rating_changes)
+
+        except GroupCommitTimeout as e:
+            logger.error(f"Move in game {game_id} not confirmed: {e}")
+            emit('error', {'message': 'Move not confirmed, please reload'})
 
         except Exception as e:
 
-            db.session.rollback()
+            repositories.games.discard()
             emit('error', {'message': 'Failed to make move'})
 
     @socketio.on('send_message')
+    @rate_limited('chat')
+    @owned_game
     def on_send_message(data):
-        room_id = f"game_{data['room']}"
-        message = {
-            'sender': data['sender'],
-            'text': data['text'],
-            'timestamp': datetime.utcnow().isoformat(),
-            'message_id': f"{data['room']}_{datetime.utcnow().timestamp()}"
-        }
-        emit('receive_message', message, room=room_id)
+        try:
+            message = chat_history.record(int(data['room']), data['sender'], data['text'])
+        except Exception as e:
+            logger.error(f"Failed to record chat message: {e}")
+            emit('error', {'message': 'Failed to send message'})
+            return
+        game_rooms.touch(message['game_id'])
+        _broadcast_game(message['game_id'], 'receive_message', message)
+        typing_indicators.clear_user(message['game_id'], message['sender'])
+
+    @socketio.on('fetch_chat_history')
+    @rate_limited('chat')
+    @owned_game
+    def on_fetch_chat_history(data):
+        """
+        Page backwards through a room's chat history.
+        
+        Args:
+            data (dict): {
+                'room': game_id,
+                'before': message_id (optional, omit for the newest page),
+                'limit': page size (optional)
+            }
+        """
+        try:
+            game_id = int(data['room'])
+            before_id = data.get('before')
+            limit = min(int(data.get('limit') or current_app.config['CHAT_PAGE_SIZE']),
+                        current_app.config['CHAT_PAGE_SIZE'])
+            messages, has_more = chat_history.page(
+                game_id, int(before_id) if before_id is not None else None, limit)
+            emit('chat_history', {
+                'game_id': game_id,
+                'messages': messages,
+                'has_more': has_more
+            })
+        except Exception as e:
+            logger.error(f"Failed to fetch chat history: {e}")
+            emit('error', {'message': 'Failed to fetch chat history'})
 
     @socketio.on('leave_room')
+    @owned_game
     def on_leave_room(data):
         game_id = data['room']
         player = data.get('player', 'Unknown')
         room_name = f"game_{game_id}"
         
         leave_room(room_name)
+        leave_room(spectator_room(game_id))
         
         # Remove from room tracking
-        if game_id in game_rooms:
-            game_rooms[game_id]['players'].discard(player)
-            game_rooms[game_id]['spectators'].discard(player)
+        room = game_rooms.get(game_id)
+        if room:
+            room.discard_player(player)
+            room.discard_from('spectators', player)
+            spectator_fanout.set_count(room.game_id, room.count('spectators'))
+        try:
+            typing_indicators.clear_user(int(game_id), player)
+        except (TypeError, ValueError):
+            pass
         
         emit('player_left', {
             'player': player,
@@ -378,14 +789,17 @@ def register_socket_handlers(socketio):
         }, room=room_name)
 
     @socketio.on('typing_indicator')
+    @rate_limited('typing')
+    @owned_game
     def on_typing_indicator(data):
-        room_id = f"game_{data['room']}"
-        emit('user_typing', {
-            'user': data['user'],
-            'is_typing': data['is_typing']
-        }, room=room_id, include_self=False)
+        # Coalesced server-side; the room receives at most one `typing_update` per interval
+        try:
+            typing_indicators.update(int(data['room']), data['user'], bool(data['is_typing']))
+        except Exception as e:
+            logger.error(f"Failed to process typing indicator: {e}")
 
     @socketio.on('send_play_again_invite')
+    @owned_game
     def on_send_play_again_invite(data):
         """Handle sending play again invitation"""
         try:
@@ -394,7 +808,7 @@ def register_socket_handlers(socketio):
             invitee = data['invitee']
             
             # Verify game exists and is completed
-            game = Game.query.get(game_id)
+            game = repositories.games.get(game_id)
             if not game:
                 emit('error', {'message': 'Game not found'})
                 return
@@ -414,25 +828,23 @@ def register_socket_handlers(socketio):
                 return
                 
             # Initialize play again tracking for this game
-            if game_id not in game_rooms:
-                game_rooms[game_id] = {'players': set(), 'spectators': set(), 'room_name': f'game_{game_id}'}
-                
-            if 'play_again_invites' not in game_rooms[game_id]:
-                game_rooms[game_id]['play_again_invites'] = {}
+            room = game_rooms.ensure(game.id)
                 
             # Prevent duplicate invites
             invite_key = f"{inviter}_{invitee}"
-            if invite_key in game_rooms[game_id]['play_again_invites']:
+            if room.get_invite(invite_key):
                 emit('error', {'message': 'Invitation already sent'})
                 return
                 
             # Store the invitation
-            game_rooms[game_id]['play_again_invites'][invite_key] = {
+            room.add_invite(invite_key, {
                 'inviter': inviter,
                 'invitee': invitee,
                 'timestamp': datetime.utcnow(),
                 'status': 'pending'
-            }
+            })
+            expirations.schedule('play_again_invite', (room.game_id, invite_key),
+                                 current_app.config['PLAY_AGAIN_INVITE_TTL'])
             
             # Send invitation to the invitee
             invitee_sid = active_connections.get(invitee)
@@ -448,6 +860,7 @@ def register_socket_handlers(socketio):
             emit('error', {'message': 'Failed to send play again invitation'})
 
     @socketio.on('respond_to_play_again')
+    @owned_game
     def on_respond_to_play_again(data):
         """Handle response to play again invitation"""
         try:
@@ -457,23 +870,23 @@ def register_socket_handlers(socketio):
             accepted = data['accepted']
             
             # Verify game exists
-            game = Game.query.get(game_id)
+            game = repositories.games.get(game_id)
             if not game:
                 emit('error', {'message': 'Game not found'})
                 return
                 
             # Check invitation exists
-            if game_id not in game_rooms or 'play_again_invites' not in game_rooms[game_id]:
+            room = game_rooms.get(game_id)
+            if room is None or not room.invites:
                 emit('error', {'message': 'No invitation found'})
                 return
                 
+            # Remove the invitation
             invite_key = f"{inviter}_{invitee}"
-            if invite_key not in game_rooms[game_id]['play_again_invites']:
+            if room.pop_invite(invite_key) is None:
                 emit('error', {'message': 'Invitation not found or expired'})
                 return
-                
-            # Remove the invitation
-            del game_rooms[game_id]['play_again_invites'][invite_key]
+            expirations.cancel('play_again_invite', (room.game_id, invite_key))
             
             # Send response to inviter
             inviter_sid = active_connections.get(inviter)
@@ -489,31 +902,35 @@ def register_socket_handlers(socketio):
             if accepted:
                 # Reset the game state
                 game.board_data = [''] * 9
+                game.move_count = 0
+                game.moves = ''
                 game.current_turn = 'X'
                 game.winner = None
                 game.is_draw = False
+                game_clocks.reset(game)
                 
-                db.session.commit()
+                repositories.games.save(game)
+                game_clocks.start(game)
                 
                 # Notify both players that game has restarted
-                room_name = f"game_{game_id}"
-                emit('game_restarted', {
+                _broadcast_game(game_id, 'game_restarted', {
                     'game': game.to_dict(),
                     'message': f'New game started! {invitee} accepted the invitation.',
                     'restarted_by': 'mutual_agreement'
-                }, room=room_name)
+                })
                 
                 # Send updated game state
-                emit('game_state_update', {
+                _broadcast_game(game_id, 'game_state_update', {
                     'game': game.to_dict(),
                     'restart': True
-                }, room=room_name)
+                })
                 
         except Exception as e:
-            db.session.rollback()
+            repositories.games.discard()
             emit('error', {'message': 'Failed to process play again response'})
 
     @socketio.on('cancel_play_again_invite')
+    @owned_game
     def on_cancel_play_again_invite(data):
         """Handle cancellation of play again invitation"""
         try:
@@ -521,24 +938,25 @@ def register_socket_handlers(socketio):
             inviter = data['inviter']
             invitee = data['invitee']
             
-            if game_id in game_rooms and 'play_again_invites' in game_rooms[game_id]:
-                invite_key = f"{inviter}_{invitee}"
-                if invite_key in game_rooms[game_id]['play_again_invites']:
-                    del game_rooms[game_id]['play_again_invites'][invite_key]
-                    
-                    # Notify invitee that invitation was cancelled
-                    invitee_sid = active_connections.get(invitee)
-                    if invitee_sid:
-                        emit('play_again_cancelled', {
-                            'gameId': game_id,
-                            'inviter': inviter,
-                            'reason': 'cancelled_by_inviter'
-                        }, room=invitee_sid)
+            room = game_rooms.get(game_id)
+            invite_key = f"{inviter}_{invitee}"
+            if room and room.pop_invite(invite_key) is not None:
+                expirations.cancel('play_again_invite', (room.game_id, invite_key))
+
+                # Notify invitee that invitation was cancelled
+                invitee_sid = active_connections.get(invitee)
+                if invitee_sid:
+                    emit('play_again_cancelled', {
+                        'gameId': game_id,
+                        'inviter': inviter,
+                        'reason': 'cancelled_by_inviter'
+                    }, room=invitee_sid)
                         
         except Exception as e:
             emit('error', {'message': 'Failed to cancel invitation'})
 
     @socketio.on('delete_game_from_lobby')
+    @owned_game
     def on_delete_game_from_lobby(data):
         """Handle game deletion from lobby"""
         try:
@@ -546,7 +964,7 @@ def register_socket_handlers(socketio):
             player = data['player']
             
             # Verify game exists
-            game = Game.query.get(game_id)
+            game = repositories.games.get(game_id)
             if not game:
                 emit('error', {'message': 'Game not found'})
                 return
@@ -561,9 +979,9 @@ def register_socket_handlers(socketio):
                 emit('error', {'message': 'Cannot delete active game'})
                 return
                 
-            # Remove game from database
-            db.session.delete(game)
-            db.session.commit()
+            # Remove game and its chat history from database
+            chat_history.forget(game.id, delete_persisted=True)
+            repositories.games.delete(game)
             
             # Notify lobby about game deletion
             emit('game_deleted', {
@@ -571,27 +989,34 @@ def register_socket_handlers(socketio):
                 'deleted_by': player
             }, room='lobby')
             
-            # Notify any remaining players in the game room
+            # Notify any remaining players and spectators in the game room
             room_name = f"game_{game_id}"
-            emit('game_deleted', {
+            game_deleted_data = {
                 'game_id': game_id,
                 'deleted_by': player,
                 'message': 'Game has been deleted'
-            }, room=room_name)
+            }
+            emit('game_deleted', game_deleted_data, room=room_name)
+            emit('game_deleted', game_deleted_data, room=spectator_room(game_id))
             
             # Clean up room tracking
-            if game_id in game_rooms:
-                del game_rooms[game_id]                
+            game_rooms.pop(game_id)
+            game_clocks.stop(int(game_id))
+            typing_indicators.forget(int(game_id))
+            spectator_fanout.forget(int(game_id))
         except Exception as e:
-            db.session.rollback()
+            repositories.games.discard()
             emit('error', {'message': 'Failed to delete game'})
+
+    @socketio.on('request_game_restart')
+    @owned_game
     def on_request_game_restart(data):
         game_id = data['room']
         player = data.get('player')
         room_name = f"game_{game_id}"
 
         try:
-            game = Game.query.get(game_id)
+            game = repositories.games.get(game_id)
             if not game:
                 emit('error', {'message': 'Game not found'})
                 return
@@ -606,60 +1031,61 @@ def register_socket_handlers(socketio):
                 emit('error', {'message': 'Only game players can request restart'})
                 return
             
-            # Initialize restart votes if not exists
-            if game_id not in game_rooms:
-                game_rooms[game_id] = {'players': set(), 'spectators': set(), 'room_name': room_name}
-            
-            if 'restart_votes' not in game_rooms[game_id]:
-                game_rooms[game_id]['restart_votes'] = set()
-            
             # Store restart vote
-            game_rooms[game_id]['restart_votes'].add(player)
+            room = game_rooms.ensure(game.id)
+            room.add_to('restart_votes', player)
             
             # Determine other player
             other_player = game.player_o if player == game.player_x else game.player_x
 
             # Check if both players voted for restart
-            if len(game_rooms[game_id]['restart_votes']) >= 2:
+            if room.count('restart_votes') >= 2:
                 # Both players agreed, restart the game
                 game.board_data = [''] * 9
+                game.move_count = 0
+                game.moves = ''
                 game.current_turn = 'X'
                 game.winner = None
                 game.is_draw = False
                 
                 # Clear restart votes
-                game_rooms[game_id]['restart_votes'] = set()
+                room.clear('restart_votes')
+                game_clocks.reset(game)
                 
-                db.session.commit()
+                repositories.games.save(game)
+                game_clocks.start(game)
                 
                 # Notify all players that game restarted
-                emit('game_restarted', {
+                _broadcast_game(game_id, 'game_restarted', {
                     'game': game.to_dict(),
                     'message': 'Game has been restarted by mutual agreement!'
-                }, room=room_name)
+                })
                 
-                emit('game_state_update', {
+                _broadcast_game(game_id, 'game_state_update', {
                     'game': game.to_dict(),
                     'restart': True
-                }, room=room_name)
+                })
 
             else:
                 # First vote, notify other player about restart request
                 emit('restart_requested', {
                     'requesting_player': player,
                     'other_player': other_player,
-                    'votes_needed': 2 - len(game_rooms[game_id]['restart_votes']),
+                    'votes_needed': 2 - room.count('restart_votes'),
                     'message': f'{player} wants to restart the game. Waiting for {other_player} to accept.'
                 }, room=room_name)
 
         except Exception as e:
 
-            db.session.rollback()
-            emit('error', {'message': 'Failed to restart game'})    @socketio.on('accept_restart')
+            repositories.games.discard()
+            emit('error', {'message': 'Failed to restart game'})
+
+    @socketio.on('accept_restart')
     def on_accept_restart(data):
         # This will trigger the same voting logic as request_game_restart
         on_request_game_restart(data)    # Rematch functionality handlers
     @socketio.on('rematch_request')
+    @owned_game
     def on_rematch_request(data):
         """
         Handle rematch request from a player.
@@ -680,7 +1106,7 @@ def register_socket_handlers(socketio):
         room_name = f"game_{game_id}"
 
         try:
-            game = Game.query.get(game_id)
+            game = repositories.games.get(game_id)
             if not game:
                 emit('error', {'message': 'Game not found'})
                 return
@@ -695,24 +1121,20 @@ def register_socket_handlers(socketio):
                 emit('error', {'message': 'Only game players can request rematch'})
                 return
             
-            # Initialize rematch tracking if not exists
-            if game_id not in game_rooms:
-                game_rooms[game_id] = {'players': set(), 'spectators': set(), 'room_name': room_name}
-            
-            if 'rematch_requests' not in game_rooms[game_id]:
-                game_rooms[game_id]['rematch_requests'] = set()
-            
             # Check for duplicate request
-            if requesting_player in game_rooms[game_id]['rematch_requests']:
+            room = game_rooms.ensure(game.id)
+            if room.has('rematch_requests', requesting_player):
                 emit('error', {'message': 'Rematch request already pending'})
                 return
             
             # Store rematch request
-            game_rooms[game_id]['rematch_requests'].add(requesting_player)
+            room.add_to('rematch_requests', requesting_player)
+            expirations.schedule('rematch_request', (room.game_id, requesting_player),
+                                 current_app.config['REMATCH_REQUEST_TTL'])
             
             # Check if both players requested rematch simultaneously
             other_player = game.player_o if requesting_player == game.player_x else game.player_x
-            if other_player in game_rooms[game_id]['rematch_requests']:
+            if room.has('rematch_requests', other_player):
                 # Both players requested, automatically start new game
                 _reset_game_for_rematch(game, game_id, room_name)
                 return
@@ -725,10 +1147,11 @@ def register_socket_handlers(socketio):
             }, room=room_name)
 
         except Exception as e:
-            db.session.rollback()
+            repositories.games.discard()
             emit('error', {'message': 'Failed to send rematch request'})
 
     @socketio.on('rematch_accept')
+    @owned_game
     def on_rematch_accept(data):
         """
         Handle rematch acceptance.
@@ -749,7 +1172,7 @@ def register_socket_handlers(socketio):
         room_name = f"game_{game_id}"
 
         try:
-            game = Game.query.get(game_id)
+            game = repositories.games.get(game_id)
             if not game:
                 emit('error', {'message': 'Game not found'})
                 return
@@ -763,10 +1186,11 @@ def register_socket_handlers(socketio):
             _reset_game_for_rematch(game, game_id, room_name)
 
         except Exception as e:
-            db.session.rollback()
+            repositories.games.discard()
             emit('error', {'message': 'Failed to accept rematch'})
 
     @socketio.on('rematch_decline')
+    @owned_game
     def on_rematch_decline(data):
         """
         Handle rematch decline.
@@ -788,8 +1212,10 @@ def register_socket_handlers(socketio):
 
         try:
             # Clear rematch requests for this game
-            if game_id in game_rooms and 'rematch_requests' in game_rooms[game_id]:
-                game_rooms[game_id]['rematch_requests'].discard(requesting_player)
+            room = game_rooms.get(game_id)
+            if room:
+                room.discard_from('rematch_requests', requesting_player)
+                expirations.cancel('rematch_request', (room.game_id, requesting_player))
             
             # Notify players about the decline
             emit('rematch_declined', {
@@ -819,30 +1245,38 @@ def register_socket_handlers(socketio):
         try:
             # Reset game state
             game.board_data = [''] * 9
+            game.move_count = 0
+            game.moves = ''
             game.current_turn = 'X'
             game.winner = None
             game.is_draw = False
             
             # Clear rematch requests
-            if game_id in game_rooms and 'rematch_requests' in game_rooms[game_id]:
-                game_rooms[game_id]['rematch_requests'] = set()
+            room = game_rooms.get(game_id)
+            if room:
+                for player in room.names('rematch_requests'):
+                    expirations.cancel('rematch_request', (room.game_id, player))
+                room.clear('rematch_requests')
+            game_clocks.reset(game)
             
-            db.session.commit()
+            repositories.games.save(game)
+            game_clocks.start(game)
             
             # Notify all players that rematch was accepted and new game started
-            emit('rematch_accepted', {
+            _broadcast_game(game_id, 'rematch_accepted', {
                 'game': game.to_dict(),
                 'message': 'New game started!',
                 'game_id': game_id
-            }, room=room_name)
+            })
             
-            emit('game_state_update', {
+            _broadcast_game(game_id, 'game_state_update', {
                 'game': game.to_dict(),
+                'clock': game_clocks.snapshot(game),
                 'rematch': True
-            }, room=room_name)
+            })
 
         except Exception as e:
-            db.session.rollback()
+            repositories.games.discard()
             raise e
 
 def cleanup_old_games():
@@ -867,8 +1301,8 @@ def cleanup_old_games():
             }, room=room_name)
             
             # Clean up tracking
-            if game.id in game_rooms:
-                del game_rooms[game.id]
+            game_rooms.pop(game.id)
+            game_clocks.stop(game.id)
             
             db.session.delete(game)
         
@@ -0,0 +1,107 @@
+"""
+HTTP response compression and WebSocket permessage-deflate control.
+
+`init_compression(app)` compresses buffered JSON/text responses above
+`COMPRESSION_MIN_SIZE` with brotli (when the `brotli` package is installed
+and the client accepts it) or gzip. Compressed variants get an encoding
+suffix on their ETag, as Apache's mod_deflate does, and the suffix is
+stripped from `If-None-Match` before the view runs so conditional requests
+still match. Streaming responses are left alone.
+
+The WebSocket transport is served by eventlet, which negotiates
+permessage-deflate whenever the client offers it; `WEBSOCKET_COMPRESSION =
+False` hides the offer so frames are sent uncompressed.
+"""
+import gzip
+import re
+
+from flask import g, request
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+_ETAG_SUFFIX = re.compile(r'-(gzip|br)"')
+
+
+def _accepted_encodings():
+    accepted = request.accept_encodings
+    return {value for value, quality in accepted if quality > 0}
+
+
+def choose_encoding(accepted):
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding, gzip_level=6, brotli_quality=4):
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality)
+    return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+
+
+def init_compression(app):
+    """Register the compression hooks on a Flask app"""
+    min_size = app.config.get('COMPRESSION_MIN_SIZE', 1024)
+    mimetypes = set(app.config.get('COMPRESSION_MIMETYPES', ['application/json']))
+    gzip_level = app.config.get('COMPRESSION_LEVEL', 6)
+    brotli_quality = app.config.get('BROTLI_QUALITY', 4)
+
+    if not app.config.get('COMPRESSION_ENABLED', True):
+        return
+
+    @app.before_request
+    def strip_etag_encoding():
+        header = request.environ.get('HTTP_IF_NONE_MATCH')
+        match = _ETAG_SUFFIX.search(header) if header else None
+        if match:
+            g.etag_encoding = match.group(1)
+            request.environ['HTTP_IF_NONE_MATCH'] = _ETAG_SUFFIX.sub('"', header)
+
+    @app.after_request
+    def compress_response(response):
+        etag, weak = response.get_etag()
+
+        if response.status_code == 304:
+            # Hand back the variant tag the client sent
+            encoding = g.get('etag_encoding')
+            if etag and encoding:
+                response.set_etag(f"{etag}-{encoding}", weak)
+            return response
+
+        if (response.direct_passthrough or response.is_streamed
+                or not 200 <= response.status_code < 300
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in mimetypes):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(_accepted_encodings())
+        if encoding is None:
+            return response
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+
+        response.set_data(compress(data, encoding, gzip_level, brotli_quality))
+        response.headers['Content-Encoding'] = encoding
+        if etag:
+            response.set_etag(f"{etag}-{encoding}", weak)
+        return response
+
+
+class WebSocketCompressionMiddleware:
+    """WSGI middleware that hides permessage-deflate offers when WebSocket compression is disabled"""
+
+    def __init__(self, wsgi_app, enabled=True):
+        self.wsgi_app = wsgi_app
+        self.enabled = enabled
+
+    def __call__(self, environ, start_response):
+        if not self.enabled:
+            environ.pop('HTTP_SEC_WEBSOCKET_EXTENSIONS', None)
+        return self.wsgi_app(environ, start_response)
@@ -0,0 +1,210 @@
+"""
+Read-replica routing for read-only requests.
+
+Replicas are ordinary Flask-SQLAlchemy binds (`replica0`, `replica1`, ...
+built from `DATABASE_REPLICA_URLS`). `RoutingSession.get_bind` sends plain
+SELECTs to a replica only inside views decorated with `@replica_reads`;
+everything else — writes, `FOR UPDATE` reads, flushes, and any query after
+the session has written — uses the primary. A session sticks to the replica
+it first picked so one request never mixes snapshots.
+
+Staleness: each replica's replay lag is sampled at most every
+`REPLICA_LAG_CHECK_INTERVAL` seconds (Postgres `pg_last_xact_replay_timestamp`;
+other databases report 0) and replicas lagging more than `REPLICA_MAX_LAG`
+seconds, or failing the check, are skipped.
+
+Read-your-writes: when a transaction commits, the requesting user and the
+users whose rows it touched (game players, user records) are pinned to the
+primary for `REPLICA_STICKY_SECONDS`. Pins are process-local.
+"""
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+_WROTE_KEY = 'replica_wrote'
+_WRITERS_KEY = 'replica_writers'
+_BIND_KEY = 'replica_bind'
+
+_PG_LAG_QUERY = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() "
+    "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class RoutingSession(FlaskSession):
+    """Flask-SQLAlchemy session that lets the replica router pick the engine for reads"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and replica_router.bind_keys:
+            engine = replica_router.engine_for(self, clause)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter:
+    """Chooses a healthy replica for read-only sessions and tracks read-your-writes pins"""
+
+    def __init__(self, max_lag=2.0, sticky_seconds=5.0, check_interval=1.0):
+        self.max_lag = max_lag
+        self.sticky_seconds = sticky_seconds
+        self.check_interval = check_interval
+        self.bind_keys = []
+        self.db = None
+        self._lag = {}  # {bind_key: (checked_at, lag seconds or None if unreachable)}
+        self._sticky = {}  # {username: pinned until (monotonic)}
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def init_app(self, app, db):
+        """Read settings from the app config and start tracking writes"""
+        self.db = db
+        self.max_lag = app.config.get('REPLICA_MAX_LAG', self.max_lag)
+        self.sticky_seconds = app.config.get('REPLICA_STICKY_SECONDS', self.sticky_seconds)
+        self.check_interval = app.config.get('REPLICA_LAG_CHECK_INTERVAL', self.check_interval)
+        self.bind_keys = sorted(key for key in (app.config.get('SQLALCHEMY_BINDS') or {})
+                                if key.startswith('replica'))
+        if self.bind_keys:
+            app.logger.info(f"Routing read-only requests across {len(self.bind_keys)} replica(s)")
+        if not self._listening:
+            event.listen(Session, 'after_flush', self._after_flush)
+            event.listen(Session, 'after_commit', self._after_commit)
+            event.listen(Session, 'after_soft_rollback', self._after_rollback)
+            self._listening = True
+
+    # Routing
+
+    def engine_for(self, session, clause):
+        """Replica engine for this statement, or None to use the primary"""
+        if not has_app_context() or not g.get('replica_reads'):
+            return None
+        if not isinstance(clause, Select) or clause._for_update_arg is not None:
+            return None
+        if session._flushing or session.info.get(_WROTE_KEY):
+            return None
+
+        key = session.info.get(_BIND_KEY)
+        if key is None:
+            if self.is_sticky(g.get('replica_user')):
+                metrics.incr('replica.sticky_primary')
+                key = False
+            else:
+                key = self._pick() or False
+            session.info[_BIND_KEY] = key
+        return self.db.engines[key] if key else None
+
+    def _pick(self):
+        healthy = [key for key in self.bind_keys if self._within_lag(key)]
+        if not healthy:
+            metrics.incr('replica.unavailable')
+            return None
+        metrics.incr('replica.sessions')
+        return healthy[next(self._next) % len(healthy)]
+
+    def _within_lag(self, key):
+        now = time.monotonic()
+        checked_at, lag = self._lag.get(key, (None, None))
+        if checked_at is None or now - checked_at >= self.check_interval:
+            lag = self._measure_lag(key)
+            self._lag[key] = (now, lag)
+        return lag is not None and lag <= self.max_lag
+
+    def _measure_lag(self, key):
+        engine = self.db.engines[key]
+        try:
+            with engine.connect() as connection:
+                if engine.dialect.name != 'postgresql':
+                    return 0.0
+                return float(connection.execute(_PG_LAG_QUERY).scalar() or 0)
+        except Exception as e:
+            logger.warning(f"Replica {key} lag check failed: {e}")
+            return None
+
+    def lag(self):
+        """Last measured lag per replica, in seconds (None if unreachable)"""
+        return {key: self._lag.get(key, (None, None))[1] for key in self.bind_keys}
+
+    # Read-your-writes
+
+    def is_sticky(self, username):
+        if not username:
+            return False
+        until = self._sticky.get(username)
+        return until is not None and until > time.monotonic()
+
+    def pin(self, usernames):
+        """Send these users' reads to the primary for the next `sticky_seconds`"""
+        until = time.monotonic() + self.sticky_seconds
+        with self._lock:
+            for username in usernames:
+                self._sticky[username] = until
+            if len(self._sticky) > 10000:
+                now = time.monotonic()
+                self._sticky = {name: t for name, t in self._sticky.items() if t > now}
+
+    def _after_flush(self, session, flush_context):
+        from app.models.game import Game
+        from app.models.user import User
+
+        session.info[_WROTE_KEY] = True
+        if not self.bind_keys:
+            return
+        writers = session.info.setdefault(_WRITERS_KEY, set())
+        if has_app_context() and g.get('replica_user'):
+            writers.add(g.replica_user)
+        for obj in itertools.chain(session.new, session.dirty, session.deleted):
+            if isinstance(obj, Game):
+                writers.update(name for name in (obj.player_x, obj.player_o) if name)
+            elif isinstance(obj, User):
+                writers.add(obj.username)
+
+    def _after_commit(self, session):
+        writers = session.info.pop(_WRITERS_KEY, None)
+        if writers:
+            self.pin(writers)
+
+    def _after_rollback(self, session, previous_transaction):
+        session.info.pop(_WRITERS_KEY, None)
+
+
+replica_router = ReplicaRouter()
+
+
+def replica_reads(f):
+    """Let a view's plain SELECTs go to a replica; place below @jwt_required() so the user is known"""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        from flask_jwt_extended import get_jwt_identity
+        g.replica_reads = True
+        try:
+            g.replica_user = get_jwt_identity()
+        except RuntimeError:
+            g.replica_user = None
+        return f(*args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def primary():
+    """Read from the primary inside a @replica_reads view, e.g. when filling a versioned cache"""
+    previous = g.get('replica_reads', False)
+    g.replica_reads = False
+    try:
+        yield
+    finally:
+        g.replica_reads = previous
@@ -0,0 +1,86 @@
+"""
+Non-blocking logging setup.
+
+Log records are pushed onto an in-process queue by a QueueHandler and
+formatted/written by a QueueListener thread, so socket handlers never block
+on log formatting or stream I/O.
+"""
+import atexit
+import itertools
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s [in %(pathname)s:%(lineno)d]'
+
+_listener = None
+
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread.
+
+    The stock QueueHandler formats the record in the calling thread so it
+    can be pickled; our queue is in-process, so the record is passed as-is.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class SampledLogger:
+    """Wrap a logger so debug output is only emitted for 1 in N calls."""
+
+    sample_rate = 100
+
+    def __init__(self, logger, sample_rate=None):
+        self.logger = logger
+        self._sample_rate = sample_rate
+        self._counter = itertools.count(1)
+
+    @property
+    def rate(self):
+        return self._sample_rate or SampledLogger.sample_rate
+
+    def debug(self, msg, *args, **kwargs):
+        """Log a debug message if it falls on the sampling interval"""
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+        if next(self._counter) % max(self.rate, 1):
+            return
+        self.logger.debug(msg, *args, **kwargs)
+
+
+def configure_logging(app):
+    """Install the queue-based pipeline and apply per-subsystem log levels"""
+    global _listener
+
+    SampledLogger.sample_rate = app.config.get('LOG_SAMPLE_RATE', 100)
+
+    root = logging.getLogger()
+    root.setLevel(app.config.get('LOG_LEVEL', 'INFO'))
+    for name, level in app.config.get('LOG_LEVELS', {}).items():
+        logging.getLogger(name).setLevel(level)
+
+    if _listener is not None:
+        return _listener
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(DeferredQueueHandler(log_queue))
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
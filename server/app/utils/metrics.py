@@ -0,0 +1,37 @@
+"""
+In-process counters for socket traffic.
+
+Counters are plain integers keyed by dotted names (e.g.
+`typing.received`) and are exposed through the `/metrics` endpoint.
+"""
+import threading
+from collections import defaultdict
+
+_counters = defaultdict(int)
+_lock = threading.Lock()
+
+
+def incr(name, amount=1):
+    """Increment a counter"""
+    with _lock:
+        _counters[name] += amount
+
+
+def get(name):
+    """Get the current value of a counter"""
+    return _counters.get(name, 0)
+
+
+def snapshot(prefix=None):
+    """Get a copy of all counters, optionally limited to a name prefix"""
+    with _lock:
+        return {
+            name: value for name, value in sorted(_counters.items())
+            if prefix is None or name.startswith(prefix)
+        }
+
+
+def reset():
+    """Clear all counters"""
+    with _lock:
+        _counters.clear()
@@ -0,0 +1,127 @@
+"""
+Token-bucket rate limiting for socket events.
+
+Each event class (move, chat, typing, lobby) has a bucket per connection
+and per authenticated user. Buckets are two floats, so memory is O(1) per
+active connection and event class. Throttled events get the standard
+`error` event with `code: 'rate_limited'` and are counted in metrics.
+"""
+import logging
+import time
+from functools import wraps
+
+from flask import request
+from flask_socketio import emit
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `burst`"""
+
+    __slots__ = ('tokens', 'updated')
+
+    def __init__(self, burst, now):
+        self.tokens = float(burst)
+        self.updated = now
+
+    def consume(self, rate, burst, now):
+        """Take one token; returns seconds to wait if none are available, else 0"""
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / rate if rate > 0 else float('inf')
+
+
+class RateLimiter:
+    """Per-sid and per-user token buckets keyed by event class"""
+
+    def __init__(self):
+        self.limits = {}
+        self.enabled = True
+        self._sid_buckets = {}  # {sid: {event_class: TokenBucket}}
+        self._user_buckets = {}  # {username: {event_class: TokenBucket}}
+        self._sid_users = {}  # {sid: username}
+        self._user_sids = {}  # {username: number of open connections}
+
+    def init_app(self, app):
+        """Read limits from the app config"""
+        self.limits = app.config.get('RATE_LIMITS', {})
+        self.enabled = app.config.get('RATE_LIMIT_ENABLED', True)
+
+    def bind_user(self, sid, username):
+        """Associate an authenticated user with a connection"""
+        if self._sid_users.get(sid) == username:
+            return
+        self.forget_sid(sid)
+        self._sid_users[sid] = username
+        self._user_sids[username] = self._user_sids.get(username, 0) + 1
+
+    def forget_sid(self, sid):
+        """Drop all buckets for a closed connection"""
+        self._sid_buckets.pop(sid, None)
+        username = self._sid_users.pop(sid, None)
+        if username:
+            remaining = self._user_sids.get(username, 1) - 1
+            if remaining > 0:
+                self._user_sids[username] = remaining
+            else:
+                self._user_sids.pop(username, None)
+                self._user_buckets.pop(username, None)
+
+    def _take(self, buckets, key, event_class, rate, burst, now):
+        per_key = buckets.get(key)
+        if per_key is None:
+            per_key = buckets[key] = {}
+        bucket = per_key.get(event_class)
+        if bucket is None:
+            bucket = per_key[event_class] = TokenBucket(burst, now)
+        return bucket.consume(rate, burst, now)
+
+    def check(self, event_class, sid):
+        """Consume a token for this connection (and its user); returns retry-after seconds or 0"""
+        limits = self.limits.get(event_class)
+        if not self.enabled or not limits:
+            return 0
+
+        now = time.monotonic()
+        retry_after = 0
+        if 'sid' in limits:
+            rate, burst = limits['sid']
+            retry_after = self._take(self._sid_buckets, sid, event_class, rate, burst, now)
+
+        username = self._sid_users.get(sid)
+        if not retry_after and username and 'user' in limits:
+            rate, burst = limits['user']
+            retry_after = self._take(self._user_buckets, username, event_class, rate, burst, now)
+
+        return retry_after
+
+
+rate_limiter = RateLimiter()
+
+
+def rate_limited(event_class):
+    """Decorator for socket handlers; place it under `@socketio.on(...)`"""
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            retry_after = rate_limiter.check(event_class, request.sid)
+            if retry_after:
+                metrics.incr(f'rate_limit.{event_class}.throttled')
+                logger.debug(f"Throttled {event_class} event from {request.sid}")
+                emit('error', {
+                    'message': 'Too many requests, please slow down',
+                    'code': 'rate_limited',
+                    'event': request.event['message'],
+                    'retry_after': round(retry_after, 3)
+                })
+                return None
+            metrics.incr(f'rate_limit.{event_class}.allowed')
+            return f(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,131 @@
+"""
+Embedded SQLite backend for single-node deployments.
+
+With no DATABASE_URL the app runs on a local SQLite file (see `config.py`).
+Every connection is switched to WAL, so readers never block the writer or
+each other, and gets the tuned pragmas below: `synchronous=NORMAL` (WAL
+stays consistent and only the last commits can be lost on power failure),
+a larger page cache and memory-mapped reads.
+
+SQLite has a single writer. Rather than letting concurrent writers collide
+and spin on `SQLITE_BUSY`, a process-wide writer lock is taken when a
+transaction issues its first INSERT/UPDATE/DELETE and released once it has
+committed or rolled back, so write transactions queue in arrival order while
+reads (each its own snapshot under pysqlite's deferred transactions) run
+freely.
+"""
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import event
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+_LOCK_KEY = 'sqlite_write_lock'
+_WRITES = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+def is_sqlite(url):
+    return bool(url) and str(url).startswith('sqlite')
+
+
+def sqlite_file(url):
+    """Database file of an SQLite URL, or None for in-memory databases"""
+    path = str(url).split(':///', 1)[-1].split('?', 1)[0]
+    return None if path in ('', ':memory:') else path
+
+
+class SQLiteWriterLock:
+    """Serializes write transactions across the connections of one engine"""
+
+    def __init__(self, timeout=5.0):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+
+    def acquire(self, info):
+        if info.get(_LOCK_KEY):
+            return
+        if not self._lock.acquire(blocking=False):
+            metrics.incr('sqlite.write_waits')
+            start = time.monotonic()
+            if not self._lock.acquire(timeout=self.timeout):
+                metrics.incr('sqlite.write_timeouts')
+                raise TimeoutError(f"SQLite writer lock not acquired within {self.timeout}s")
+            waited = time.monotonic() - start
+            if waited > 0.1:
+                logger.warning(f"Waited {waited:.3f}s for the SQLite writer lock")
+        info[_LOCK_KEY] = True
+
+    def release(self, info):
+        if info.pop(_LOCK_KEY, False):
+            self._lock.release()
+
+
+def apply_pragmas(dbapi_connection, config):
+    """Per-connection settings: WAL, relaxed fsync, bigger cache, mmap"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={config.get('SQLITE_SYNCHRONOUS', 'NORMAL')}")
+        cursor.execute(f"PRAGMA cache_size=-{int(config.get('SQLITE_CACHE_SIZE_KB', 65536))}")
+        cursor.execute(f"PRAGMA mmap_size={int(config.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))}")
+        cursor.execute(f"PRAGMA busy_timeout={int(config.get('SQLITE_BUSY_TIMEOUT', 5.0) * 1000)}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA foreign_keys=ON")
+    finally:
+        cursor.close()
+
+
+def _is_write(context, statement):
+    if context is not None and getattr(context, 'compiled', None) is not None:
+        return context.isinsert or context.isupdate or context.isdelete
+    return statement.lstrip()[:7].upper().startswith(_WRITES)
+
+
+def configure_engine(engine, config, writer_lock=True):
+    """Attach pragmas and (for the sync engine) the single-writer lock to an SQLite engine"""
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection, config)
+
+    if not writer_lock:
+        return
+
+    lock = SQLiteWriterLock(config.get('SQLITE_BUSY_TIMEOUT', 5.0))
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _is_write(context, statement):
+            lock.acquire(conn.info)
+
+    @event.listens_for(engine, 'rollback')
+    def on_rollback(conn):
+        lock.release(conn.info)
+
+    # The `commit` event fires before the commit itself, so committed transactions release the
+    # lock when their connection goes back to the pool (sessions and engine.begin() both do)
+    @event.listens_for(engine, 'reset')
+    def on_reset(dbapi_connection, connection_record, reset_state):
+        lock.release(connection_record.info)
+
+    @event.listens_for(engine, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        lock.release(connection_record.info)
+
+
+def init_sqlite(app, db):
+    """Prepare the embedded database: its directory, pragmas and writer lock"""
+    url = app.config.get('SQLALCHEMY_DATABASE_URI')
+    if not is_sqlite(url):
+        return False
+    path = sqlite_file(url)
+    if path:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with app.app_context():
+        configure_engine(db.engine, app.config)
+    app.logger.info(f"Using embedded SQLite database: {path or ':memory:'}")
+    return True
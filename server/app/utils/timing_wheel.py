@@ -0,0 +1,108 @@
+"""
+Hierarchical timing wheel (Varghese & Lauck) for large numbers of timers.
+
+Time is divided into ticks. Level 0 has one slot per tick; each higher level
+has slots that span a whole rotation of the level below, so `levels` wheels
+of `slots` slots cover `slots ** levels` ticks. Scheduling and cancelling
+are O(1) dict operations; a timer is touched again only when it cascades
+down a level, at most `levels - 1` times. Timers beyond the top level's
+range park in its furthest slot and are re-placed each time it comes round.
+
+Not thread-safe; callers serialize access.
+"""
+
+
+class HierarchicalTimingWheel:
+    """Timers keyed by any hashable key; scheduling an existing key replaces it"""
+
+    def __init__(self, tick=0.1, slots=64, levels=4, start=0.0):
+        if slots & (slots - 1):
+            raise ValueError("slots must be a power of two")
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self._bits = slots.bit_length() - 1
+        self._mask = slots - 1
+        self._span = slots ** levels  # ticks covered by the whole hierarchy
+        self._start = start
+        self._tick = 0  # last tick processed
+        self._wheels = [[{} for _ in range(slots)] for _ in range(levels)]
+        self._timers = {}  # {key: (level, slot)}
+        self._deadlines = {}  # {key: (deadline_tick, payload)}
+
+    def __len__(self):
+        return len(self._timers)
+
+    def __contains__(self, key):
+        return key in self._timers
+
+    def _tick_for(self, when):
+        # Round up so a timer never fires early
+        ticks = (when - self._start) / self.tick
+        whole = int(ticks)
+        return whole if whole == ticks else whole + 1
+
+    def _place(self, key, deadline, payload):
+        delta = deadline - self._tick
+        if delta <= 0:
+            deadline = self._tick + 1
+            delta = 1
+        placed = deadline if delta < self._span else self._tick + self._span - 1
+        level = 0
+        while level < self.levels - 1 and (placed - self._tick) >= (1 << (self._bits * (level + 1))):
+            level += 1
+        slot = (placed >> (self._bits * level)) & self._mask
+        self._wheels[level][slot][key] = deadline
+        self._timers[key] = (level, slot)
+        self._deadlines[key] = (deadline, payload)
+
+    def schedule(self, key, when, payload=None):
+        """Fire `key` at absolute time `when` (same clock as `advance`)"""
+        self.cancel(key)
+        self._place(key, self._tick_for(when), payload)
+
+    def cancel(self, key):
+        """Remove a pending timer; returns its payload, or None if it was not pending"""
+        location = self._timers.pop(key, None)
+        if location is None:
+            return None
+        level, slot = location
+        del self._wheels[level][slot][key]
+        return self._deadlines.pop(key)[1]
+
+    def deadline(self, key):
+        """Absolute time a pending timer fires, or None"""
+        entry = self._deadlines.get(key)
+        return None if entry is None else self._start + entry[0] * self.tick
+
+    def _cascade(self, level):
+        slot = (self._tick >> (self._bits * level)) & self._mask
+        bucket = self._wheels[level][slot]
+        if not bucket:
+            return
+        self._wheels[level][slot] = {}
+        for key in bucket:
+            del self._timers[key]
+            deadline, payload = self._deadlines.pop(key)
+            self._place(key, deadline, payload)
+
+    def advance(self, now):
+        """Process every tick up to `now`; returns [(key, payload)] for expired timers"""
+        target = int((now - self._start) / self.tick)
+        expired = []
+        while self._tick < target:
+            if not self._timers:
+                self._tick = target
+                break
+            self._tick += 1
+            for level in range(self.levels - 1, 0, -1):
+                if self._tick & ((1 << (self._bits * level)) - 1) == 0:
+                    self._cascade(level)
+            slot = self._tick & self._mask
+            bucket = self._wheels[0][slot]
+            if bucket:
+                self._wheels[0][slot] = {}
+                for key in bucket:
+                    del self._timers[key]
+                    expired.append((key, self._deadlines.pop(key)[1]))
+        return expired
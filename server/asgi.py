@@ -0,0 +1,19 @@
+"""
+ASGI entry point for the asyncio server mode
+
+    uvicorn asgi:app --host 0.0.0.0 --port $PORT
+"""
+import os
+import sys
+import logging
+from dotenv import load_dotenv
+
+logging.basicConfig(level=logging.INFO)
+
+load_dotenv()
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.async_app import create_asgi_app
+
+app = create_asgi_app()
@@ -0,0 +1,187 @@
+"""Benchmark the eventlet server against the asyncio (ASGI) server side by side
+
+Starts each server in a subprocess on the same database, then from one
+asyncio client process:
+
+  1. opens N concurrent websocket connections and times how long they take
+     to be confirmed, and
+  2. pairs the connections into N/2 games played concurrently, timing each
+     make_move from emit until the mover receives its move_made.
+
+Runs against DATABASE_URL when set (use a throwaway database), otherwise
+against a temporary SQLite file.
+
+Usage: python benchmarks/bench_async.py [connections] [eventlet|asyncio ...]
+"""
+import sys
+import os
+import asyncio
+import statistics
+import subprocess
+import tempfile
+import time
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(SERVER_DIR)
+
+JWT_SECRET = 'bench-jwt-secret-for-local-runs-only'
+# X wins on the top row: five moves per game
+MOVES = [(0, 'X'), (3, 'O'), (1, 'X'), (4, 'O'), (2, 'X')]
+
+
+def serve(mode, port, sqlite_path):
+    """Subprocess entry point: run one server until killed"""
+    if mode == 'eventlet':
+        import eventlet
+        eventlet.monkey_patch()
+    if sqlite_path:
+        # Embedded backend: no DATABASE_URL, database file at SQLITE_PATH
+        os.environ.pop('DATABASE_URL', None)
+        os.environ['SQLITE_PATH'] = sqlite_path
+
+    if mode == 'eventlet':
+        from app import create_app, socketio
+        app = create_app()
+        socketio.run(app, host='127.0.0.1', port=port, log_output=False)
+    else:
+        import uvicorn
+        from app.async_app import create_asgi_app
+        uvicorn.run(create_asgi_app(), host='127.0.0.1', port=port, log_level='warning')
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize(label, samples):
+    ms = [s * 1000 for s in samples]
+    print(f"  {label:<18} n={len(ms):<6} p50={percentile(ms, 0.5):7.2f}ms  "
+          f"p95={percentile(ms, 0.95):7.2f}ms  p99={percentile(ms, 0.99):7.2f}ms  "
+          f"mean={statistics.mean(ms):7.2f}ms")
+
+
+async def wait_for_server(url, timeout=30.0):
+    import aiohttp
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(f"{url}/health") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not start")
+
+
+async def run_client_load(url, connections):
+    import aiohttp
+    import jwt
+    import socketio
+
+    def token(username):
+        return jwt.encode({'sub': username, 'type': 'access'}, JWT_SECRET, algorithm='HS256')
+
+    clients = []
+    connect_times = []
+
+    async def open_connection(i):
+        username = f"bench{i}"
+        client = socketio.AsyncClient(reconnection=False)
+        client.username = username
+        client.moves = {}
+        confirmed = asyncio.get_running_loop().create_future()
+        client.on('connection_confirmed', lambda data: confirmed.done() or confirmed.set_result(None))
+
+        def move_made(data, client=client):
+            waiter = client.moves.pop(data.get('index'), None)
+            if waiter and not waiter.done():
+                waiter.set_result(time.perf_counter())
+        client.on('move_made', move_made)
+
+        started = time.perf_counter()
+        await client.connect(url, auth={'token': token(username)}, transports=['websocket'])
+        await asyncio.wait_for(confirmed, 30)
+        connect_times.append(time.perf_counter() - started)
+        clients.append(client)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(open_connection(i) for i in range(connections)))
+    connect_wall = time.perf_counter() - started
+
+    # Pair clients into games
+    pairs = [(clients[i], clients[i + 1]) for i in range(0, len(clients) - 1, 2)]
+    async with aiohttp.ClientSession() as session:
+        async def create_game(host):
+            headers = {'Authorization': f"Bearer {token(host.username)}"}
+            async with session.post(f"{url}/api/game/create", headers=headers) as response:
+                return (await response.json())['gameId']
+        game_ids = await asyncio.gather(*(create_game(x) for x, _ in pairs))
+
+    for game_id, (x, o) in zip(game_ids, pairs):
+        await x.emit('join_room', {'room': game_id, 'player': x.username})
+        await o.emit('join_room', {'room': game_id, 'player': o.username})
+    await asyncio.sleep(1.0)
+
+    move_times = []
+
+    async def play(game_id, x, o):
+        for index, symbol in MOVES:
+            mover = x if symbol == 'X' else o
+            waiter = asyncio.get_running_loop().create_future()
+            mover.moves[index] = waiter
+            sent = time.perf_counter()
+            await mover.emit('make_move', {'room': game_id, 'index': index, 'player': mover.username})
+            received = await asyncio.wait_for(waiter, 30)
+            move_times.append(received - sent)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(play(game_id, x, o) for game_id, (x, o) in zip(game_ids, pairs)))
+    move_wall = time.perf_counter() - started
+
+    await asyncio.gather(*(client.disconnect() for client in clients))
+    return connect_wall, connect_times, move_wall, move_times
+
+
+def bench(mode, connections, port):
+    database_url = os.getenv('DATABASE_URL')
+    sqlite_path = None
+    if not database_url:
+        sqlite_path = os.path.join(tempfile.mkdtemp(prefix='bench_async_'), 'bench.db')
+
+    env = dict(os.environ, JWT_SECRET_KEY=JWT_SECRET, SECRET_KEY='bench', RATE_LIMIT_ENABLED='false',
+               LOG_LEVEL='WARNING')
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--serve', mode, str(port), sqlite_path or ''],
+        cwd=SERVER_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        asyncio.run(wait_for_server(url))
+        connect_wall, connect_times, move_wall, move_times = asyncio.run(run_client_load(url, connections))
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"{mode}: {connections} connections, {len(move_times)} moves")
+    print(f"  connected all in {connect_wall:.2f}s ({connections / connect_wall:.0f} conn/s)")
+    summarize('connect', connect_times)
+    print(f"  played all in {move_wall:.2f}s ({len(move_times) / move_wall:.0f} moves/s)")
+    summarize('make_move', move_times)
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--serve':
+        serve(sys.argv[2], int(sys.argv[3]), sys.argv[4] if len(sys.argv) > 4 else None)
+        return
+
+    connections = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    modes = sys.argv[2:] or ['eventlet', 'asyncio']
+    for offset, mode in enumerate(modes):
+        bench(mode, connections, 5600 + offset)
+
+
+if __name__ == '__main__':
+    main()
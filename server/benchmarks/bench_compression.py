@@ -0,0 +1,107 @@
+"""Benchmark CPU cost against bytes saved for response and websocket compression
+
+Builds representative `/api/game/active` and `lobby_games_update` payloads,
+then times gzip and brotli (if installed) at several levels per response,
+and permessage-deflate (raw deflate with context takeover, as negotiated by
+eventlet) over a stream of successive lobby updates.
+
+Usage: python benchmarks/bench_compression.py [games] [iterations]
+"""
+import sys
+import os
+import json
+import random
+import time
+import zlib
+from datetime import datetime, timedelta
+
+# Add the server directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.compression import brotli, compress
+
+
+def active_games_payload(count, rng):
+    """Body of GET /api/game/active"""
+    now = datetime(2026, 1, 1)
+    games = []
+    for game_id in range(count, 0, -1):
+        status = rng.choice(['waiting', 'in_progress', 'completed'])
+        games.append({
+            'id': game_id,
+            'host': f"player{rng.randrange(500)}",
+            'player_o': None if status == 'waiting' else f"player{rng.randrange(500)}",
+            'createdAt': (now - timedelta(seconds=game_id * 37)).isoformat(),
+            'playerCount': 1 if status == 'waiting' else 2,
+            'status': status,
+            'winner': rng.choice(['X', 'O', None]) if status == 'completed' else None,
+            'is_draw': False,
+            'current_turn': rng.choice(['X', 'O'])
+        })
+    return json.dumps(games).encode('utf-8')
+
+
+def lobby_update_payload(count, rng):
+    """Socket.IO frame for lobby_games_update"""
+    games = [{
+        'id': game_id,
+        'host': f"player{rng.randrange(500)}",
+        'createdAt': datetime(2026, 1, 1, 12, rng.randrange(60), rng.randrange(60)).isoformat(),
+        'playerCount': 1
+    } for game_id in range(count)]
+    return ('42' + json.dumps(['lobby_games_update', {'games': games}])).encode('utf-8')
+
+
+def time_per_call(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        result = fn()
+    return (time.perf_counter() - start) / iterations * 1e6, result
+
+
+def bench_http(name, payload, iterations):
+    print(f"\n{name}: {len(payload)} bytes")
+    print(f"{'codec':<12}{'bytes':>10}{'ratio':>8}{'us/resp':>10}{'MB/s':>8}")
+    codecs = [('gzip', level) for level in (1, 6, 9)]
+    if brotli is not None:
+        codecs += [('br', quality) for quality in (1, 4, 11)]
+    for encoding, level in codecs:
+        us, data = time_per_call(
+            lambda: compress(payload, encoding, gzip_level=level, brotli_quality=level), iterations)
+        print(f"{encoding + '-' + str(level):<12}{len(data):>10}{len(payload) / len(data):>8.1f}"
+              f"{us:>10.1f}{len(payload) / us:>8.1f}")
+
+
+def bench_websocket(frames):
+    """permessage-deflate as eventlet sends it: one compressor per connection, sync-flushed frames"""
+    raw = sum(len(frame) for frame in frames)
+    for label, takeover in (('context takeover', True), ('no context takeover', False)):
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS)
+        sent = 0
+        start = time.perf_counter()
+        for frame in frames:
+            if not takeover:
+                compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS)
+            data = compressor.compress(frame) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            sent += len(data) - 4
+        us = (time.perf_counter() - start) / len(frames) * 1e6
+        print(f"{label:<22}{sent:>10}{raw / sent:>8.1f}{us:>10.1f}")
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rng = random.Random(42)
+
+    bench_http(f"/api/game/active ({games} games)", active_games_payload(games, rng), iterations)
+    bench_http(f"lobby_games_update ({games // 4} games)", lobby_update_payload(games // 4, rng), iterations)
+
+    frames = [lobby_update_payload(rng.randrange(5, games // 4), rng) for _ in range(iterations)]
+    print(f"\npermessage-deflate over {len(frames)} lobby_games_update frames "
+          f"({sum(len(f) for f in frames)} bytes)")
+    print(f"{'mode':<22}{'bytes':>10}{'ratio':>8}{'us/frame':>10}")
+    bench_websocket(frames)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Benchmark move writes per second with one commit per move against group commit
+
+Seeds in-progress games, then writes one guarded move UPDATE per game the
+way `SQLAlchemyGameRepository.save_move` does, through
+`GroupCommitter.commit_batch`: first one transaction per write (what
+per-event commits cost), then in batches of increasing size. Commits are fsync-bound, so moves per second should grow
+with the batch size until the statements themselves dominate.
+
+Usage: python benchmarks/bench_group_commit.py [moves] [database_url]
+       (defaults to a temporary SQLite file)
+"""
+import sys
+import os
+import json
+import tempfile
+import threading
+import time
+
+from flask import Flask
+from sqlalchemy import insert, update
+
+# Add the server directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import db
+from app.models.game import Game
+from app.services.group_commit import _Write, group_commit
+
+BATCH_SIZES = [1, 8, 32, 128]
+
+
+def seed(count):
+    db.drop_all()
+    db.create_all()
+    db.session.execute(insert(Game), [
+        {'player_x': f"player{i}", 'player_o': f"player{i + count}", 'move_count': 0, 'moves': ''}
+        for i in range(count)
+    ])
+    db.session.commit()
+    return [game_id for (game_id,) in db.session.query(Game.id).order_by(Game.id)]
+
+
+def move_write(game_id, move_count):
+    board = ['X' if i == 4 else '' for i in range(9)]
+    statement = (
+        update(Game)
+        .where(Game.id == game_id, Game.move_count == move_count)
+        .values(board=json.dumps(board), current_turn='O', move_count=move_count + 1, moves='4')
+    )
+    return _Write(statement, threading.Event())
+
+
+def bench(game_ids, batch_size):
+    writes = [move_write(game_id, 0) for game_id in game_ids]
+    start = time.perf_counter()
+    for offset in range(0, len(writes), batch_size):
+        group_commit.commit_batch(writes[offset:offset + batch_size])
+    elapsed = time.perf_counter() - start
+    written = sum(write.rowcount or 0 for write in writes)
+    commits = -(-len(writes) // batch_size)
+    print(f"{batch_size:>6}{commits:>9}{written / elapsed:>12.0f}{elapsed / len(writes) * 1e3:>12.3f}")
+
+
+def main():
+    moves = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    url = sys.argv[2] if len(sys.argv) > 2 else \
+        f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_group_commit.db')}"
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    db.init_app(app)
+
+    print(f"{moves} move writes on {url.split('@')[-1]}")
+    print(f"{'batch':>6}{'commits':>9}{'moves/s':>12}{'ms/move':>12}")
+    with app.app_context():
+        for batch_size in BATCH_SIZES:
+            bench(seed(moves), batch_size)
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
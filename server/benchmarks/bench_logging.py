@@ -0,0 +1,110 @@
+"""Benchmark per-move overhead of the logging pipeline
+
+Replays full games through the same move path the socket handler uses
+(board update, winner check, to_dict) with logging disabled, with a
+synchronous stream handler, and with the queue-based pipeline.
+
+Usage: python benchmarks/bench_logging.py [moves]
+"""
+import sys
+import os
+import time
+import logging
+from logging.handlers import QueueListener
+
+# Add the server directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.game import Game
+from app.services.game_logic import check_winner, is_draw
+from app.utils.logging_config import DeferredQueueHandler, SampledLogger, LOG_FORMAT
+import queue
+
+MOVE_SEQUENCE = [4, 0, 8, 2, 1, 7, 6, 3, 5]
+
+move_log = SampledLogger(logging.getLogger('app.sockets.handlers'))
+
+
+def play_move(game, index):
+    """Apply a move the way on_make_move does, minus the DB commit"""
+    board = game.board_data
+    symbol = game.current_turn
+    board[index] = symbol
+    game.board_data = board
+    result = check_winner(board)
+    move_log.debug("Move game=%s index=%s symbol=%s winner=%s winning_line=%s",
+                   game.id, index, symbol, result['winner'], result['winning_line'])
+    if result['winner']:
+        game.winner = result['winner']
+        game.winning_line_data = result['winning_line']
+    elif is_draw(board):
+        game.is_draw = True
+    else:
+        game.current_turn = 'O' if game.current_turn == 'X' else 'X'
+    return game.to_dict()
+
+
+def run(moves):
+    """Return mean microseconds per move"""
+    played = 0
+    start = time.perf_counter()
+    while played < moves:
+        game = Game(id=played, player_x='alice', player_o='bob', current_turn='X')
+        for index in MOVE_SEQUENCE:
+            play_move(game, index)
+            played += 1
+            if game.winner or game.is_draw:
+                break
+    return (time.perf_counter() - start) / played * 1e6
+
+
+def configure(mode, sample_rate, sink):
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    SampledLogger.sample_rate = sample_rate
+
+    listener = None
+    if mode == 'off':
+        root.setLevel(logging.WARNING)
+        return None
+
+    root.setLevel(logging.DEBUG)
+    stream_handler = logging.StreamHandler(sink)
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    if mode == 'sync':
+        root.addHandler(stream_handler)
+    else:
+        log_queue = queue.SimpleQueue()
+        root.addHandler(DeferredQueueHandler(log_queue))
+        listener = QueueListener(log_queue, stream_handler)
+        listener.start()
+    return listener
+
+
+def main():
+    moves = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    scenarios = [
+        ('off', 1),
+        ('sync', 1),
+        ('queue', 1),
+        ('sync', 100),
+        ('queue', 100),
+    ]
+
+    with open(os.devnull, 'w') as sink:
+        baseline = None
+        print(f"{'mode':<8}{'sample':>8}{'us/move':>12}{'overhead':>12}")
+        for mode, sample_rate in scenarios:
+            listener = configure(mode, sample_rate, sink)
+            run(min(moves, 1000))  # warm up
+            per_move = run(moves)
+            if listener:
+                listener.stop()
+            if baseline is None:
+                baseline = per_move
+            print(f"{mode:<8}{'1/' + str(sample_rate):>8}{per_move:>12.2f}{per_move - baseline:>+12.2f}")
+
+
+if __name__ == '__main__':
+    main()
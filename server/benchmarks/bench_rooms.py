@@ -0,0 +1,90 @@
+"""Benchmark memory per room: dict-of-sets rooms against the slotted room registry
+
+Builds the same population of rooms both ways — the original
+`{game_id: {'players': set(), 'spectators': set(), 'room_name': str}}` layout
+with per-feature dicts/sets added on first use, and `RoomRegistry` with
+`RoomState` objects — and measures the heap each one holds with tracemalloc.
+Usernames are built per room, as they arrive decoded from socket payloads.
+
+Usage: python benchmarks/bench_rooms.py [rooms] [spectator_ratio]
+"""
+import sys
+import os
+import random
+import time
+import tracemalloc
+
+# Add the server directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.rooms import RoomRegistry
+
+
+def population(count, spectator_ratio, rng):
+    """(game_id, players, spectators, rematch_requests) per room"""
+    rooms = []
+    for game_id in range(1, count + 1):
+        players = (f"player{rng.randrange(5000)}", f"player{rng.randrange(5000)}")
+        spectators = [f"player{rng.randrange(5000)}" for _ in range(rng.randrange(1, 4))] \
+            if rng.random() < spectator_ratio else []
+        rematch = [players[0]] if rng.random() < 0.05 else []
+        rooms.append((game_id, players, spectators, rematch))
+    return rooms
+
+
+def fresh(name):
+    # A new string object, as each socket payload decodes to
+    return ''.join(list(name))
+
+
+def build_dicts(rooms):
+    game_rooms = {}
+    for game_id, players, spectators, rematch in rooms:
+        room = game_rooms[str(game_id)] = {
+            'players': {fresh(name) for name in players},
+            'spectators': set(),
+            'room_name': f"game_{game_id}"
+        }
+        for name in spectators:
+            room['spectators'].add(fresh(name))
+        if rematch:
+            room['rematch_requests'] = {fresh(name) for name in rematch}
+    return game_rooms
+
+
+def build_registry(rooms):
+    registry = RoomRegistry(max_rooms=len(rooms) + 1)
+    for game_id, players, spectators, rematch in rooms:
+        room = registry.ensure(game_id, tuple(fresh(name) for name in players))
+        for name in spectators:
+            room.add_to('spectators', fresh(name))
+        for name in rematch:
+            room.add_to('rematch_requests', fresh(name))
+    return registry
+
+
+def measure(label, build, rooms):
+    tracemalloc.start()
+    start = time.perf_counter()
+    held = build(rooms)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<16}{current / 1e6:>10.1f}{current / len(rooms):>12.1f}{peak / 1e6:>10.1f}{elapsed:>9.2f}")
+    return held
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    spectator_ratio = float(sys.argv[2]) if len(sys.argv) > 2 else 0.1
+    rooms = population(count, spectator_ratio, random.Random(42))
+
+    print(f"{count} rooms, {spectator_ratio:.0%} with spectators")
+    print(f"{'layout':<16}{'MB':>10}{'bytes/room':>12}{'peak MB':>10}{'seconds':>9}")
+    measure('dict of sets', build_dicts, rooms)
+    registry = measure('RoomState', build_registry, rooms)
+    print(f"\nmemory_report: {registry.memory_report()['bytes_per_room']} bytes/room (excluding shared strings)")
+
+
+if __name__ == '__main__':
+    main()
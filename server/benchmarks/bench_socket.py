@@ -0,0 +1,104 @@
+"""Benchmark the socket handlers with the database and with in-memory repositories
+
+Builds the full eventlet app in-process and drives it through the
+Flask-SocketIO test client (no network), once per repository backend, each
+in its own subprocess: N/2 games are created over HTTP, both players join,
+and the games are played concurrently, timing each make_move handler call.
+With `memory` no game or user touches the database, so the difference
+between the two runs is what storage costs per move and the `memory` run is
+the cost of our own handler code.
+
+The `sqlalchemy` run uses DATABASE_URL when set (use a throwaway database),
+otherwise a temporary SQLite file.
+
+Usage: python benchmarks/bench_socket.py [players] [sqlalchemy|memory ...]
+"""
+import sys
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(SERVER_DIR)
+
+# X wins on the top row: five moves per game
+MOVES = [(0, 'X'), (3, 'O'), (1, 'X'), (4, 'O'), (2, 'X')]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run(backend, players):
+    """Subprocess entry point: play the games on one backend and print the results"""
+    import eventlet
+    eventlet.monkey_patch()
+    if backend == 'sqlalchemy' and not os.getenv('DATABASE_URL'):
+        os.environ['SQLITE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='bench_socket_'), 'bench.db')
+
+    from flask_jwt_extended import create_access_token
+    from app import create_app, socketio
+
+    app = create_app(repository_backend=backend)
+    eventlet.sleep(0.1)  # let the background tasks (group committer) start
+
+    with app.app_context():
+        tokens = {f"bench{i}": create_access_token(identity=f"bench{i}") for i in range(players)}
+    http = app.test_client()
+
+    games = []
+    for i in range(0, players - 1, 2):
+        x, o = f"bench{i}", f"bench{i + 1}"
+        response = http.post('/api/game/create', headers={'Authorization': f"Bearer {tokens[x]}"})
+        game_id = response.get_json()['gameId']
+        clients = {}
+        for symbol, username in (('X', x), ('O', o)):
+            client = socketio.test_client(app, auth={'token': tokens[username]})
+            client.emit('join_room', {'room': game_id, 'player': username})
+            client.get_received()
+            clients[symbol] = (client, username)
+        games.append((game_id, clients))
+
+    move_times = []
+
+    def play(game_id, clients):
+        for index, symbol in MOVES:
+            client, username = clients[symbol]
+            started = time.perf_counter()
+            client.emit('make_move', {'room': game_id, 'index': index, 'player': username})
+            move_times.append(time.perf_counter() - started)
+            client.get_received()
+
+    pool = eventlet.GreenPool(len(games))
+    started = time.perf_counter()
+    for game_id, clients in games:
+        pool.spawn(play, game_id, clients)
+    pool.waitall()
+    wall = time.perf_counter() - started
+
+    ms = [sample * 1000 for sample in move_times]
+    print(f"{backend}: {len(games)} games, {len(ms)} moves")
+    print(f"  played all in {wall:.2f}s ({len(ms) / wall:.0f} moves/s)")
+    print(f"  {'make_move':<18} p50={percentile(ms, 0.5):7.2f}ms  p95={percentile(ms, 0.95):7.2f}ms  "
+          f"p99={percentile(ms, 0.99):7.2f}ms  mean={statistics.mean(ms):7.2f}ms")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--run':
+        run(sys.argv[2], int(sys.argv[3]))
+        return
+
+    players = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    backends = sys.argv[2:] or ['sqlalchemy', 'memory']
+    env = dict(os.environ, JWT_SECRET_KEY='bench-jwt-secret-for-local-runs-only', SECRET_KEY='bench',
+               RATE_LIMIT_ENABLED='false', LOG_LEVEL='WARNING')
+    for backend in backends:
+        subprocess.run([sys.executable, os.path.abspath(__file__), '--run', backend, str(players)],
+                       cwd=SERVER_DIR, env=env, check=True)
+
+
+if __name__ == '__main__':
+    main()
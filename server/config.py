@@ -5,15 +5,23 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def get_sqlite_path():
+    """File of the embedded SQLite database used when no DATABASE_URL is set"""
+    default = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'tictactoe.db')
+    return os.path.abspath(os.getenv('SQLITE_PATH', default))
+
 def get_enhanced_database_url():
     """Get enhanced database URL with production parameters"""
     database_url = os.getenv("DATABASE_URL")
     if not database_url:
-        raise ValueError("DATABASE_URL environment variable is required")
+        # Single-node installs run on an embedded SQLite file
+        return f"sqlite:///{get_sqlite_path()}"
     
     # Fix for newer SQLAlchemy versions
     if database_url.startswith("postgres://"):
         database_url = database_url.replace("postgres://", "postgresql://", 1)
+    if database_url.startswith("sqlite"):
+        return database_url
     
     # Enhance with production-specific parameters
     if not any(param in database_url for param in ['sslmode=', 'connect_timeout=', 'application_name=']):
@@ -28,22 +36,22 @@ def get_enhanced_database_url():
     
     return database_url
 
-class Config:
-    """Production configuration for Supabase deployment"""
-    
-    # Flask configuration
-    SECRET_KEY = os.getenv('SECRET_KEY')
-    
-    # Database configuration
-    try:
-        SQLALCHEMY_DATABASE_URI = get_enhanced_database_url()
-    except ValueError:
-        SQLALCHEMY_DATABASE_URI = None
-        
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
-    
+def get_engine_options(database_url):
+    """Engine options for the configured backend: pooled SSL connections for Postgres, a local file for SQLite"""
+    if database_url.startswith('sqlite'):
+        # Pragmas and the single-writer lock are applied per connection by app.utils.sqlite_backend
+        return {
+            'pool_size': int(os.getenv('SQLITE_POOL_SIZE', '8')),
+            'max_overflow': 0,
+            'pool_timeout': 30,
+            'connect_args': {
+                'check_same_thread': False,  # connections move between green threads
+                'timeout': float(os.getenv('SQLITE_BUSY_TIMEOUT', '5.0'))
+            }
+        }
+
     # Connection pool settings optimized for production deployment
-    SQLALCHEMY_ENGINE_OPTIONS = {
+    return {
         'pool_size': 3,
         'pool_recycle': 3600,
         'pool_pre_ping': True,
@@ -55,7 +63,38 @@ class Config:
             'connect_timeout': 30
         }
     }
+
+def get_replica_urls():
+    """Comma-separated read replica URLs from DATABASE_REPLICA_URLS"""
+    urls = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    return [url.replace("postgres://", "postgresql://", 1) for url in urls]
+
+class Config:
+    """Production configuration for Supabase deployment"""
+    
+    # Flask configuration
+    SECRET_KEY = os.getenv('SECRET_KEY')
+    
+    # Database configuration: DATABASE_URL (Postgres), or an embedded SQLite file at SQLITE_PATH
+    SQLALCHEMY_DATABASE_URI = get_enhanced_database_url()
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = get_engine_options(SQLALCHEMY_DATABASE_URI)
+
+    # Embedded SQLite tuning (WAL journal is always on); cache size in KiB, mmap in bytes
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', '65536'))
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+    SQLITE_BUSY_TIMEOUT = float(os.getenv('SQLITE_BUSY_TIMEOUT', '5.0'))  # also bounds waits for the writer lock
+
+    # Storage behind the game/user repositories: 'sqlalchemy' (the database) or 'memory' (tests, load tests)
+    REPOSITORY_BACKEND = os.getenv('REPOSITORY_BACKEND', 'sqlalchemy').lower()
     
+    # Read replicas are extra binds; read-only views route plain SELECTs to them
+    SQLALCHEMY_BINDS = {f'replica{i}': url for i, url in enumerate(get_replica_urls())}
+    REPLICA_MAX_LAG = float(os.getenv('REPLICA_MAX_LAG', '2.0'))  # skip replicas lagging more (seconds)
+    REPLICA_STICKY_SECONDS = float(os.getenv('REPLICA_STICKY_SECONDS', '5.0'))  # primary reads after a user's write
+    REPLICA_LAG_CHECK_INTERVAL = float(os.getenv('REPLICA_LAG_CHECK_INTERVAL', '1.0'))
+
     # JWT Configuration
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')
     JWT_ACCESS_TOKEN_EXPIRES = False
@@ -67,7 +106,104 @@ class Config:
     # CORS configuration
     CLIENT_URL = os.getenv('CLIENT_URL', 'https://tic-tac-toe-ten-murex-86.vercel.app')
     CORS_ORIGINS = [CLIENT_URL]
-    
+
+    # Chat history: recent messages per room are kept in memory and written in batches
+    CHAT_HISTORY_SIZE = int(os.getenv('CHAT_HISTORY_SIZE', '50'))
+    CHAT_FLUSH_BATCH_SIZE = int(os.getenv('CHAT_FLUSH_BATCH_SIZE', '20'))
+    CHAT_FLUSH_INTERVAL = float(os.getenv('CHAT_FLUSH_INTERVAL', '2.0'))
+    CHAT_PAGE_SIZE = int(os.getenv('CHAT_PAGE_SIZE', '50'))
+    CHAT_MESSAGE_MAX_LENGTH = int(os.getenv('CHAT_MESSAGE_MAX_LENGTH', '2000'))  # longer messages are truncated
+    CHAT_FLUSH_MAX_RETRIES = int(os.getenv('CHAT_FLUSH_MAX_RETRIES', '5'))  # failed flushes before a message is dropped
+    WORKER_NUMBER = os.getenv('WORKER_NUMBER')  # 0-1023, distinct per process; part of chat message ids (random if unset)
+
+    # Typing indicators: at most one emit per room per interval, auto-expire after timeout
+    TYPING_EMIT_INTERVAL = float(os.getenv('TYPING_EMIT_INTERVAL', '0.5'))
+    TYPING_TIMEOUT = float(os.getenv('TYPING_TIMEOUT', '5.0'))
+
+    # Response compression: gzip, or brotli when installed and accepted, above a size threshold
+    COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+    COMPRESSION_LEVEL = int(os.getenv('COMPRESSION_LEVEL', '6'))
+    BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', '4'))
+    COMPRESSION_MIMETYPES = ['application/json', 'text/plain', 'text/html', 'text/csv']
+    # permessage-deflate on the websocket transport; long-polling uses COMPRESSION_MIN_SIZE
+    WEBSOCKET_COMPRESSION = os.getenv('WEBSOCKET_COMPRESSION', 'true').lower() == 'true'
+
+    # Expiry of pending socket state, serviced by one timing wheel ticking every TIMER_TICK_INTERVAL
+    TIMER_TICK_INTERVAL = float(os.getenv('TIMER_TICK_INTERVAL', '0.1'))
+    PLAY_AGAIN_INVITE_TTL = float(os.getenv('PLAY_AGAIN_INVITE_TTL', '60'))
+    REMATCH_REQUEST_TTL = float(os.getenv('REMATCH_REQUEST_TTL', '60'))
+    PRESENCE_TTL = float(os.getenv('PRESENCE_TTL', '120'))  # how long a disconnected player keeps their seat
+
+    # Default time control for new games in seconds (0 = no limit); clocks run on the expiry timing wheel
+    GAME_TIME_TOTAL = float(os.getenv('GAME_TIME_TOTAL', '0'))
+    GAME_TIME_PER_MOVE = float(os.getenv('GAME_TIME_PER_MOVE', '0'))
+
+    # In-memory socket rooms: LRU-evicted beyond ROOM_MAX_COUNT, swept when idle for ROOM_IDLE_TTL seconds
+    ROOM_MAX_COUNT = int(os.getenv('ROOM_MAX_COUNT', '100000'))
+    ROOM_IDLE_TTL = float(os.getenv('ROOM_IDLE_TTL', '3600'))
+    ROOM_SWEEP_INTERVAL = float(os.getenv('ROOM_SWEEP_INTERVAL', '60'))
+
+    # Mid-game moves are committed in groups: writes arriving within GROUP_COMMIT_WINDOW seconds share a transaction
+    GROUP_COMMIT_ENABLED = os.getenv('GROUP_COMMIT_ENABLED', 'true').lower() == 'true'
+    GROUP_COMMIT_WINDOW = float(os.getenv('GROUP_COMMIT_WINDOW', '0.002'))
+    GROUP_COMMIT_MAX_BATCH = int(os.getenv('GROUP_COMMIT_MAX_BATCH', '128'))
+    GROUP_COMMIT_TIMEOUT = float(os.getenv('GROUP_COMMIT_TIMEOUT', '5.0'))
+
+    # In-memory game snapshots (LRU) used by resume_game and conditional GETs
+    GAME_CACHE_SIZE = int(os.getenv('GAME_CACHE_SIZE', '10000'))
+
+    # Elo ratings: written to users.rating when a game finishes; sharded workers reload the leaderboard periodically
+    ELO_K_FACTOR = int(os.getenv('ELO_K_FACTOR', '32'))
+    ELO_DEFAULT_RATING = int(os.getenv('ELO_DEFAULT_RATING', '1200'))
+    LEADERBOARD_REFRESH_INTERVAL = float(os.getenv('LEADERBOARD_REFRESH_INTERVAL', '30'))
+
+    # Quick play: rating band starts at BASE and widens by GROWTH per second waited
+    MATCHMAKING_BASE_BAND = int(os.getenv('MATCHMAKING_BASE_BAND', '100'))
+    MATCHMAKING_BAND_GROWTH = float(os.getenv('MATCHMAKING_BAND_GROWTH', '20'))
+    MATCHMAKING_MAX_BAND = int(os.getenv('MATCHMAKING_MAX_BAND', '1000'))
+    MATCHMAKING_TICK_INTERVAL = float(os.getenv('MATCHMAKING_TICK_INTERVAL', '1.0'))
+
+    # Spectators get coalesced snapshots every interval, optionally delayed
+    SPECTATOR_SNAPSHOT_INTERVAL = float(os.getenv('SPECTATOR_SNAPSHOT_INTERVAL', '1.0'))
+    SPECTATOR_BROADCAST_DELAY = float(os.getenv('SPECTATOR_BROADCAST_DELAY', '0'))
+
+    # Game-affinity sharding: each game is owned by one worker on a consistent-hash ring
+    SHARDING_ENABLED = os.getenv('SHARDING_ENABLED', 'false').lower() == 'true'
+    WORKER_ID = os.getenv('WORKER_ID')
+    WORKER_URL = os.getenv('WORKER_URL')
+    SHARD_HEARTBEAT_INTERVAL = float(os.getenv('SHARD_HEARTBEAT_INTERVAL', '5'))
+    SHARD_WORKER_TTL = float(os.getenv('SHARD_WORKER_TTL', '15'))
+    SHARD_VIRTUAL_NODES = int(os.getenv('SHARD_VIRTUAL_NODES', '64'))
+    # Optional message queue (e.g. redis://) so lobby broadcasts reach clients on every worker
+    SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE')
+
+    # Asyncio mode (asgi.py): async driver URL, derived from DATABASE_URL when unset
+    ASYNC_DATABASE_URL = os.getenv('ASYNC_DATABASE_URL')
+    ASYNC_POOL_SIZE = int(os.getenv('ASYNC_POOL_SIZE', '10'))
+    ASYNC_HTTP_WORKERS = int(os.getenv('ASYNC_HTTP_WORKERS', '10'))  # threads serving the Flask routes
+
+    # Socket event rate limits: (tokens per second, burst) per connection and per user
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    RATE_LIMITS = {
+        'move': {'sid': (4, 8), 'user': (6, 12)},
+        'chat': {'sid': (2, 10), 'user': (3, 15)},
+        'typing': {'sid': (5, 10), 'user': (8, 16)},
+        'lobby': {'sid': (0.5, 5), 'user': (1, 10)},
+    }
+
+    # Logging configuration (records are written by a background queue listener)
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_LEVELS = {
+        'app': os.getenv('APP_LOG_LEVEL', LOG_LEVEL),
+        'app.sockets': os.getenv('SOCKET_HANDLERS_LOG_LEVEL', LOG_LEVEL),
+        'socketio': os.getenv('SOCKETIO_LOG_LEVEL', 'WARNING'),
+        'engineio': os.getenv('ENGINEIO_LOG_LEVEL', 'WARNING'),
+        'sqlalchemy.engine': os.getenv('SQLALCHEMY_LOG_LEVEL', 'WARNING'),
+    }
+    # Only 1 in N per-move debug records is emitted
+    LOG_SAMPLE_RATE = int(os.getenv('LOG_SAMPLE_RATE', '100'))
+
     @classmethod
     def validate_config(cls):
         """Validate required configuration values"""
@@ -79,9 +215,6 @@ class Config:
         if not cls.JWT_SECRET_KEY:
             errors.append("JWT_SECRET_KEY environment variable is required")
             
-        if not os.getenv('DATABASE_URL'):
-            errors.append("DATABASE_URL environment variable is required")
-            
         if errors:
             raise ValueError("Configuration errors: " + "; ".join(errors))
     
@@ -90,7 +223,7 @@ class Config:
         """Log configuration details for debugging"""
         logger.info("=== Configuration Status ===")
         logger.info(f"SECRET_KEY: {'SET' if cls.SECRET_KEY else 'NOT SET'}")
-        logger.info(f"DATABASE_URL: {'SET' if os.getenv('DATABASE_URL') else 'NOT SET'}")
+        logger.info(f"DATABASE_URL: {'SET' if os.getenv('DATABASE_URL') else f'NOT SET (embedded SQLite at {get_sqlite_path()})'}")
         logger.info(f"JWT_SECRET_KEY: {'SET' if cls.JWT_SECRET_KEY else 'NOT SET'}")
         logger.info(f"CLIENT_URL: {cls.CLIENT_URL}")
         logger.info(f"SUPABASE_URL: {'SET' if cls.SUPABASE_URL else 'NOT SET'}")
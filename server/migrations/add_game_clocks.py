@@ -0,0 +1,68 @@
+"""Add time control and clock columns to the game table
+
+Revision ID: add_game_clocks
+Revises: add_user_rating
+Create Date: 2026-10-19
+
+Existing games get NULL time controls, i.e. they stay untimed.
+"""
+import sys
+import os
+
+# Add the server directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+CLOCK_COLUMNS = ('time_total', 'time_per_move', 'clock_x', 'clock_o')
+
+
+def upgrade():
+    """Add the nullable clock columns used by timed games"""
+    from app import create_app, db
+    from sqlalchemy import text
+
+    app = create_app(socket_server=False)
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+            columns = [col['name'] for col in inspector.get_columns('game')]
+
+            for column in CLOCK_COLUMNS:
+                if column not in columns:
+                    db.session.execute(text(f"ALTER TABLE game ADD COLUMN {column} FLOAT"))
+                    print(f"Successfully added {column} column to game table")
+                else:
+                    print(f"{column} column already exists in game table")
+            db.session.commit()
+
+        except Exception as e:
+            print(f"Error adding clock columns: {e}")
+            db.session.rollback()
+            raise
+
+
+def downgrade():
+    """Remove the clock columns"""
+    from app import create_app, db
+    from sqlalchemy import text
+
+    app = create_app(socket_server=False)
+    with app.app_context():
+        try:
+            for column in CLOCK_COLUMNS:
+                db.session.execute(text(f"ALTER TABLE game DROP COLUMN IF EXISTS {column}"))
+            db.session.commit()
+            print("Successfully removed clock columns from game table")
+        except Exception as e:
+            print(f"Error removing clock columns: {e}")
+            db.session.rollback()
+            raise
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "downgrade":
+        downgrade()
+    else:
+        upgrade()
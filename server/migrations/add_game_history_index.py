@@ -0,0 +1,105 @@
+"""Add move_count column and covering history indexes to game table
+
+Revision ID: add_game_history_index
+Revises: add_winning_line
+Create Date: 2026-10-19
+
+"""
+import sys
+import os
+import json
+
+# Add the server directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+BATCH_SIZE = 1000
+
+INDEXES = {
+    'ix_game_player_x_history': ('player_x', 'player_o'),
+    'ix_game_player_o_history': ('player_o', 'player_x'),
+}
+
+
+def upgrade():
+    """Add move_count (backfilled from board) and the per-player history indexes"""
+    from app import create_app, db
+    from sqlalchemy import text
+
+    app = create_app(socket_server=False)
+    with app.app_context():
+        try:
+            is_sqlite = 'sqlite' in str(db.engine.url)
+            inspector = db.inspect(db.engine)
+            columns = [col['name'] for col in inspector.get_columns('game')]
+
+            if 'move_count' not in columns:
+                db.session.execute(text("ALTER TABLE game ADD COLUMN move_count INTEGER NOT NULL DEFAULT 0"))
+                db.session.commit()
+                print("Added move_count column to game table")
+
+                # Backfill move counts from stored boards in keyset batches
+                last_id = 0
+                while True:
+                    rows = db.session.execute(
+                        text("SELECT id, board FROM game WHERE id > :last_id ORDER BY id LIMIT :limit"),
+                        {'last_id': last_id, 'limit': BATCH_SIZE}
+                    ).all()
+                    if not rows:
+                        break
+                    updates = []
+                    for row in rows:
+                        try:
+                            board = json.loads(row.board) if row.board else []
+                        except (json.JSONDecodeError, TypeError):
+                            board = []
+                        updates.append({'id': row.id, 'move_count': sum(1 for cell in board if cell)})
+                    db.session.execute(text("UPDATE game SET move_count = :move_count WHERE id = :id"), updates)
+                    db.session.commit()
+                    last_id = rows[-1].id
+                print("Backfilled move_count for existing games")
+            else:
+                print("move_count column already exists in game table")
+
+            for name, (player_column, opponent_column) in INDEXES.items():
+                if is_sqlite:
+                    sql = f"CREATE INDEX IF NOT EXISTS {name} ON game ({player_column}, created_at, id)"
+                else:
+                    sql = (f"CREATE INDEX IF NOT EXISTS {name} ON game ({player_column}, created_at, id) "
+                           f"INCLUDE ({opponent_column}, winner, is_draw, move_count)")
+                db.session.execute(text(sql))
+            db.session.commit()
+            print("Created game history indexes")
+
+        except Exception as e:
+            print(f"Error adding game history index: {e}")
+            db.session.rollback()
+            raise
+
+
+def downgrade():
+    """Remove the history indexes and move_count column"""
+    from app import create_app, db
+    from sqlalchemy import text
+
+    app = create_app(socket_server=False)
+    with app.app_context():
+        try:
+            for name in INDEXES:
+                db.session.execute(text(f"DROP INDEX IF EXISTS {name}"))
+            db.session.execute(text("ALTER TABLE game DROP COLUMN IF EXISTS move_count"))
+            db.session.commit()
+            print("Removed game history indexes and move_count column")
+        except Exception as e:
+            print(f"Error removing game history index: {e}")
+            db.session.rollback()
+            raise
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "downgrade":
+        downgrade()
+    else:
+        upgrade()
@@ -0,0 +1,71 @@
+"""Add game.moves and the position_stats table
+
+Revision ID: add_position_stats
+Revises: add_game_history_index
+Create Date: 2026-10-19
+
+Positions are only counted for games that record their moves, so existing
+games (which predate `game.moves`) are not backfilled.
+"""
+import sys
+import os
+
+# Add the server directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+
+def upgrade():
+    """Add the moves column; create_app creates position_stats"""
+    from app import create_app, db
+    from sqlalchemy import text
+
+    app = create_app(socket_server=False)
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+            columns = [col['name'] for col in inspector.get_columns('game')]
+
+            if 'moves' not in columns:
+                db.session.execute(text("ALTER TABLE game ADD COLUMN moves VARCHAR(9) NOT NULL DEFAULT ''"))
+                db.session.commit()
+                print("Added moves column to game table")
+            else:
+                print("moves column already exists")
+
+            db.create_all(bind_key=None)
+            print("position_stats table is ready")
+        except Exception as e:
+            db.session.rollback()
+            print(f"Migration failed: {e}")
+            raise
+
+
+def downgrade():
+    """Drop position_stats and the moves column"""
+    from app import create_app, db
+    from sqlalchemy import text
+
+    app = create_app(socket_server=False)
+    with app.app_context():
+        try:
+            db.session.execute(text("DROP TABLE IF EXISTS position_stats"))
+            if 'sqlite' in str(db.engine.url):
+                print("SQLite: leaving game.moves in place (DROP COLUMN unsupported on older versions)")
+            else:
+                db.session.execute(text("ALTER TABLE game DROP COLUMN IF EXISTS moves"))
+            db.session.commit()
+            print("Removed position stats")
+        except Exception as e:
+            db.session.rollback()
+            print(f"Downgrade failed: {e}")
+            raise
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "downgrade":
+        downgrade()
+    else:
+        upgrade()
@@ -0,0 +1,63 @@
+"""Add rating column to users table
+
+Revision ID: add_user_rating
+Revises: create_users_table
+Create Date: 2026-10-19
+
+"""
+import sys
+import os
+
+# Add the server directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+
+def upgrade():
+    """Add the rating column used for Elo ratings and the leaderboard"""
+    from app import create_app, db
+    from sqlalchemy import text
+
+    app = create_app(socket_server=False)
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+            columns = [col['name'] for col in inspector.get_columns('users')]
+
+            if 'rating' not in columns:
+                db.session.execute(text("ALTER TABLE users ADD COLUMN rating INTEGER NOT NULL DEFAULT 1200"))
+                db.session.commit()
+                print("Successfully added rating column to users table")
+            else:
+                print("rating column already exists in users table")
+
+        except Exception as e:
+            print(f"Error adding rating column: {e}")
+            db.session.rollback()
+            raise
+
+
+def downgrade():
+    """Remove the rating column"""
+    from app import create_app, db
+    from sqlalchemy import text
+
+    app = create_app(socket_server=False)
+    with app.app_context():
+        try:
+            db.session.execute(text("ALTER TABLE users DROP COLUMN IF EXISTS rating"))
+            db.session.commit()
+            print("Successfully removed rating column from users table")
+        except Exception as e:
+            print(f"Error removing rating column: {e}")
+            db.session.rollback()
+            raise
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "downgrade":
+        downgrade()
+    else:
+        upgrade()
@@ -0,0 +1,113 @@
+"""Create and backfill the user_stats table from existing games
+
+Walks finished games in id order with keyset batches, accumulates each
+player's counters and streaks in memory, then rewrites user_stats with
+multi-row inserts. Safe to re-run: the table is rebuilt from scratch.
+
+The rebuild is one transaction that takes the user_stats write lock before
+scanning (Postgres `LOCK TABLE ... IN EXCLUSIVE MODE`; on SQLite the DELETE
+takes the database write lock), so games finishing while it runs wait to
+record their stats and are counted exactly once, after it commits. Finishing
+games stall for the duration of the scan, and on SQLite give up after
+`SQLITE_BUSY_TIMEOUT`, so run it while the server is quiet or stopped.
+
+Revision ID: backfill_user_stats
+Create Date: 2026-10-19
+
+"""
+import sys
+import os
+
+# Add the server directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+BATCH_SIZE = 1000
+
+
+def _apply(stats, username, outcome):
+    from app.services.user_stats import WIN, LOSS
+    row = stats.setdefault(username, {
+        'username': username, 'games_played': 0, 'wins': 0, 'losses': 0,
+        'draws': 0, 'current_streak': 0, 'best_win_streak': 0
+    })
+    row['games_played'] += 1
+    if outcome == WIN:
+        row['wins'] += 1
+        row['current_streak'] = row['current_streak'] + 1 if row['current_streak'] > 0 else 1
+        row['best_win_streak'] = max(row['best_win_streak'], row['current_streak'])
+    elif outcome == LOSS:
+        row['losses'] += 1
+        row['current_streak'] = row['current_streak'] - 1 if row['current_streak'] < 0 else -1
+    else:
+        row['draws'] += 1
+        row['current_streak'] = 0
+
+
+def upgrade():
+    """Rebuild user_stats from the game table"""
+    from app import create_app, db
+    from app.models.game import Game
+    from app.models.user_stats import UserStats
+    from app.services.user_stats import game_outcomes
+    from sqlalchemy import delete, insert, select, or_, text
+
+    app = create_app(socket_server=False)
+    with app.app_context():
+        UserStats.__table__.create(db.engine, checkfirst=True)
+
+        try:
+            # Lock out stats writes before scanning so no game is missed or counted twice
+            if db.engine.dialect.name == 'postgresql':
+                db.session.execute(text('LOCK TABLE user_stats IN EXCLUSIVE MODE'))
+            db.session.execute(delete(UserStats))
+
+            stats = {}
+            last_id = 0
+            scanned = 0
+            while True:
+                rows = db.session.execute(
+                    select(Game.id, Game.player_x, Game.player_o, Game.winner, Game.is_draw)
+                    .where(Game.id > last_id, or_(Game.winner.isnot(None), Game.is_draw == True))
+                    .order_by(Game.id)
+                    .limit(BATCH_SIZE)
+                ).all()
+                if not rows:
+                    break
+                for row in rows:
+                    for username, outcome in game_outcomes(row).items():
+                        if username:
+                            _apply(stats, username, outcome)
+                last_id = rows[-1].id
+                scanned += len(rows)
+                print(f"Scanned {scanned} finished games...")
+
+            values = list(stats.values())
+            for start in range(0, len(values), BATCH_SIZE):
+                db.session.execute(insert(UserStats), values[start:start + BATCH_SIZE])
+            db.session.commit()
+            print(f"Backfilled stats for {len(values)} users from {scanned} games")
+        except Exception as e:
+            print(f"Error backfilling user_stats: {e}")
+            db.session.rollback()
+            raise
+
+
+def downgrade():
+    """Drop the user_stats table"""
+    from app import create_app, db
+    from app.models.user_stats import UserStats
+
+    app = create_app(socket_server=False)
+    with app.app_context():
+        UserStats.__table__.drop(db.engine, checkfirst=True)
+        print("Dropped user_stats table")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "downgrade":
+        downgrade()
+    else:
+        upgrade()
@@ -22,7 +22,7 @@ try:
                         result.close()
                     
                     # Create tables if connection successful
-                    db.create_all()
+                    db.create_all(bind_key=None)
                     app.logger.info("✅ Database tables created successfully")
                     return True
                     
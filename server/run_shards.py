@@ -0,0 +1,56 @@
+"""
+Run one eventlet worker per core, each owning a shard of the games.
+
+Every worker gets its own port, WORKER_ID, WORKER_NUMBER and WORKER_URL; they find each
+other through heartbeats in the shared database and build the same
+consistent-hash ring. Clients ask `GET /api/game/<id>/shard` (or follow a
+`shard_redirect` event) to connect to the worker that owns their game.
+
+Usage: python run_shards.py [workers] [base_port]
+"""
+import os
+import signal
+import subprocess
+import sys
+import time
+from dotenv import load_dotenv
+load_dotenv()
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else (os.cpu_count() or 1)
+    base_port = int(sys.argv[2]) if len(sys.argv) > 2 else int(os.getenv('PORT', 5000))
+    public_host = os.getenv('SHARD_PUBLIC_HOST', 'http://localhost')
+
+    processes = []
+    for index in range(workers):
+        port = base_port + index
+        env = dict(os.environ,
+                   SHARDING_ENABLED='true',
+                   WORKER_ID=f"shard-{index}",
+                   WORKER_NUMBER=str(index),
+                   WORKER_URL=f"{public_host}:{port}",
+                   PORT=str(port))
+        command = [
+            sys.executable, '-m', 'gunicorn',
+            '--worker-class', 'eventlet', '-w', '1',
+            '--bind', f'0.0.0.0:{port}',
+            'wsgi:app', '--timeout', '120', '--log-level', 'info'
+        ]
+        processes.append(subprocess.Popen(command, env=env, cwd=os.path.dirname(os.path.abspath(__file__))))
+        print(f"Started shard-{index} on port {port}")
+
+    def shutdown(signum, frame):
+        for process in processes:
+            process.terminate()
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    # Exit when every worker has stopped; the survivors rebalance on their next heartbeat
+    while any(process.poll() is None for process in processes):
+        time.sleep(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Stream games to a file or stdout as NDJSON or CSV
+
+Usage:
+    python scripts/export_games.py [--format ndjson|csv] [--status STATUS]
+                                   [--since DATE] [--until DATE] [--gzip] [-o FILE]
+"""
+import sys
+import os
+import argparse
+
+# Add the server directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Export games as NDJSON or CSV")
+    parser.add_argument('--format', choices=['ndjson', 'csv'], default='ndjson')
+    parser.add_argument('--status', choices=['waiting', 'in_progress', 'completed'])
+    parser.add_argument('--since', help="Only games created at or after this ISO date")
+    parser.add_argument('--until', help="Only games created before this ISO date")
+    parser.add_argument('--gzip', action='store_true', help="Gzip the output")
+    parser.add_argument('-o', '--output', help="Output file (default: stdout)")
+    return parser.parse_args(argv)
+
+
+def export(args):
+    from app import create_app
+    from app.services.game_export import batched, export_chunks, gzip_chunks, parse_datetime
+
+    app = create_app(socket_server=False)
+    with app.app_context():
+        chunks = batched(export_chunks(
+            args.format,
+            since=parse_datetime(args.since),
+            until=parse_datetime(args.until),
+            status=args.status
+        ))
+        body = gzip_chunks(chunks) if args.gzip else (chunk.encode('utf-8') for chunk in chunks)
+
+        out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+        written = 0
+        try:
+            for data in body:
+                out.write(data)
+                written += len(data)
+        finally:
+            if args.output:
+                out.close()
+        print(f"Exported {written} bytes", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    export(parse_args(sys.argv[1:]))
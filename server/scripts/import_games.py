@@ -0,0 +1,69 @@
+"""Load games from NDJSON (e.g. the output of export_games.py) into the game table
+
+Invalid records are skipped and reported as NDJSON lines
+({"line": <n>, "error": "..."}) on stderr or to --rejects.
+
+Usage:
+    python scripts/import_games.py FILE [--batch-size N] [--keep-ids] [--dry-run] [--rejects FILE]
+"""
+import sys
+import os
+import argparse
+import gzip
+import json
+
+# Add the server directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Import games from NDJSON")
+    parser.add_argument('input', help="NDJSON file ('-' for stdin, .gz is decompressed)")
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--keep-ids', action='store_true', help="Preserve game ids from the file")
+    parser.add_argument('--dry-run', action='store_true', help="Validate only, insert nothing")
+    parser.add_argument('--rejects', help="Write invalid records report here (default: stderr)")
+    return parser.parse_args(argv)
+
+
+def open_input(path):
+    if path == '-':
+        return sys.stdin
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def run_import(args):
+    from app import create_app
+    from app.services.game_import import import_games
+
+    app = create_app(socket_server=False)
+    rejects_out = open(args.rejects, 'w', encoding='utf-8') if args.rejects else sys.stderr
+
+    def on_reject(line_no, error):
+        rejects_out.write(json.dumps({'line': line_no, 'error': error}) + '\n')
+
+    with app.app_context(), open_input(args.input) as lines:
+        try:
+            inserted, rejected = import_games(
+                lines,
+                batch_size=args.batch_size,
+                keep_ids=args.keep_ids,
+                dry_run=args.dry_run,
+                on_reject=on_reject
+            )
+        finally:
+            if args.rejects:
+                rejects_out.close()
+
+    verb = "Validated" if args.dry_run else "Imported"
+    print(f"{verb} {inserted} games, rejected {rejected}", file=sys.stderr)
+    return 1 if rejected else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_import(parse_args(sys.argv[1:])))
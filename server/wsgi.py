@@ -32,7 +32,7 @@ try:
                 result.close()
 
             # Create tables if connection successful
-            db.create_all()
+            db.create_all(bind_key=None)
             logger.info("Production: Database initialized successfully")
         except Exception as e:
             logger.error(f"Production: Database initialization error: {e}")